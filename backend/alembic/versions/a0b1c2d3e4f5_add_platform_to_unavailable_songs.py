@@ -0,0 +1,33 @@
+"""Add platform to unavailable_songs
+
+Revision ID: a0b1c2d3e4f5
+Revises: f9a0b1c2d3e4
+Create Date: 2025-11-17 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a0b1c2d3e4f5'
+down_revision: Union[str, None] = 'f9a0b1c2d3e4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # 不同平台的歌曲ID可能相同，按 (platform, song_id) 匹配
+    with op.batch_alter_table('unavailable_songs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('platform', sa.String(), nullable=True))
+        batch_op.drop_index('ix_unavailable_songs_song_id')
+        batch_op.create_index('ix_unavailable_songs_platform_song_id', ['platform', 'song_id'])
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('unavailable_songs', schema=None) as batch_op:
+        batch_op.drop_index('ix_unavailable_songs_platform_song_id')
+        batch_op.create_index('ix_unavailable_songs_song_id', ['song_id'])
+        batch_op.drop_column('platform')
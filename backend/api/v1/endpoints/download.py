@@ -14,13 +14,16 @@ from schemas.download_schemas import (
     DownloadSingleRequest,
     DownloadActionResponse,
     SessionStatusResponse,
-    SearchResponse
+    SearchResponse,
+    CacheStatsResponse
 )
+from core.http_client import http_clients
 from services.settings_service import SettingsService
 from services.download.download_service import get_download_service, DownloadService
 from services.download.downloader_core import downloader
 from services.download.download_db_service import download_db_service
 from services.download.download_queue_manager import download_queue_manager
+from services.download.response_cache import response_cache
 from core.logging_config import LOGS_DIR, download_log_manager
 from core.config import settings as app_settings
 
@@ -95,19 +98,17 @@ async def save_download_settings(settings_in: DownloadSettingsCreate) -> Any:
 async def test_api_connection() -> Any:
     """测试与下载API的连接。"""
     try:
-        import httpx
-        
-        # 测试新的API连接
-        async with httpx.AsyncClient() as client:
-            response = await client.get("https://api.vkeys.cn/", timeout=10.0)
-            if response.status_code == 200:
-                response_data = response.json()
-                if response_data.get("code") == 0:
-                    return TestConnectionResponse(success=True, message="API连接成功！" + response_data.get("message", ""))
-                else:
-                    return TestConnectionResponse(success=False, message="API连接失败: " + response_data.get("message", "未知错误"))
+        # 测试新的API连接（使用下载器共享的连接池）
+        client = http_clients.get('downloader')
+        response = await client.get("https://api.vkeys.cn/", timeout=10.0)
+        if response.status_code == 200:
+            response_data = response.json()
+            if response_data.get("code") == 0:
+                return TestConnectionResponse(success=True, message="API连接成功！" + response_data.get("message", ""))
             else:
-                return TestConnectionResponse(success=False, message=f"API连接失败，状态码: {response.status_code}")
+                return TestConnectionResponse(success=False, message="API连接失败: " + response_data.get("message", "未知错误"))
+        else:
+            return TestConnectionResponse(success=False, message=f"API连接失败，状态码: {response.status_code}")
     except httpx.TimeoutException:
         return TestConnectionResponse(success=False, message="API连接超时，请检查网络连接")
     except Exception as e:
@@ -306,3 +307,7 @@ async def refresh_session_counts():
         raise HTTPException(status_code=500, detail=f"修正会话计数失败: {str(e)}")
 
 
+@router.get("/cache-stats", response_model=CacheStatsResponse)
+async def get_cache_stats():
+    """获取上游 API 响应缓存（搜索结果、歌曲链接）的命中率统计。"""
+    return CacheStatsResponse(success=True, stats=response_cache.stats())
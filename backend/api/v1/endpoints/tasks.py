@@ -6,6 +6,7 @@ from services.task_service import TaskService
 from services.sync_service import SyncService
 from services.download.download_service import get_download_service, DownloadService
 from services.log_service import LogService
+from services.sync_orchestrator import sync_orchestrator, PRIORITY_MANUAL
 from utils.scheduler import get_scheduler, TaskScheduler
 from pydantic import BaseModel, HttpUrl
 import logging
@@ -129,12 +130,22 @@ async def delete_task(task_id: int = Path(..., title="任务ID"), scheduler: Tas
         logger.error(f"删除任务失败: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"删除任务失败: {str(e)}")
 
+@router.get("/sync-queue")
+async def get_sync_queue():
+    """获取同步编排器中运行中和排队中的同步任务"""
+    return sync_orchestrator.get_status()
+
+@router.get("/tasks/{task_id}/sync/state")
+async def get_sync_state(task_id: int = Path(..., title="任务ID")):
+    """获取单个任务的同步状态（running / queued / idle）及排队位置"""
+    return sync_orchestrator.get_task_state(task_id)
+
 @router.get("/tasks/{task_id}/sync/stream")
 async def sync_task_stream(task_id: int = Path(..., title="任务ID"), download_service: DownloadService = Depends(get_download_service)):
     """
     通过 Server-Sent Events (SSE) 实时流式传输同步进度。
     """
-    # 立即在后台启动同步任务
+    # 立即将同步提交到同步队列；任务已在排队或运行时只会订阅其进度
     asyncio.create_task(run_sync_in_background(task_id, download_service))
     
     # 返回一个流式响应
@@ -148,26 +159,35 @@ async def sync_task_stream(task_id: int = Path(..., title="任务ID"), download_
     )
 
 async def run_sync_in_background(task_id: int, download_service: DownloadService):
-    """一个在后台运行同步任务的辅助函数。"""
-    try:
-        task = TaskService.get_task_by_id(task_id)
-        if not task:
-            await progress_manager.send_message(task_id, json.dumps({"status": "error", "message": "未找到任务"}), event="error")
-            return
+    """一个将手动同步提交到同步队列的辅助函数。"""
+    task = TaskService.get_task_by_id(task_id)
+    if not task:
+        await progress_manager.send_message(task_id, json.dumps({"status": "error", "message": "未找到任务"}), event="error")
+        return
+
+    async def _run():
+        try:
+            sync_service = SyncService(download_service=download_service)
+            await sync_service.sync_playlist(
+                task_id=task.id,
+                server_id=task.server_id,
+                playlist_url=task.playlist_url,
+                platform=task.platform,
+                playlist_name=task.name,
+                log_callback=lambda level, msg: LogService.log_activity(task_id, level, msg)
+            )
+        except Exception as e:
+            logger.error(f"后台同步任务 {task_id} 失败: {e}", exc_info=True)
+            error_message = f"同步时发生意外错误: {e}"
+            TaskService.update_task_status(task_id, 'failed', error_message)
+            await progress_manager.send_message(task_id, json.dumps({"status": "failed", "message": str(e)}), event="error")
 
-        sync_service = SyncService(download_service=download_service)
-        await sync_service.sync_playlist(
-            task_id=task.id,
-            server_id=task.server_id,
-            playlist_url=task.playlist_url,
-            platform=task.platform,
-            playlist_name=task.name,
-            log_callback=lambda level, msg: LogService.log_activity(task_id, level, msg)
-        )
+    try:
+        state = await sync_orchestrator.submit(task.id, task.server_id, _run, priority=PRIORITY_MANUAL, source='manual')
+        if state['coalesced'] and state['state'] == 'running':
+            await progress_manager.send_message(task_id, json.dumps({"status": "syncing", "message": "该任务正在同步中，已连接到当前同步的进度。"}), event="progress")
     except Exception as e:
-        logger.error(f"后台同步任务 {task_id} 失败: {e}", exc_info=True)
-        error_message = f"同步时发生意外错误: {e}"
-        TaskService.update_task_status(task_id, 'failed', error_message)
+        logger.error(f"提交同步任务 {task_id} 失败: {e}", exc_info=True)
         await progress_manager.send_message(task_id, json.dumps({"status": "failed", "message": str(e)}), event="error")
 
 class UnmatchedSongsResponse(BaseModel):
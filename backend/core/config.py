@@ -25,9 +25,23 @@ class Settings(BaseSettings):
     # Plex settings
     PLEX_URL: Optional[str] = None
     PLEX_TOKEN: Optional[str] = None
+    # 下载目录在 Plex 服务器上的路径（两者挂载路径不同时配置），用于请求 Plex 局部扫描
+    PLEX_DOWNLOAD_PATH: Optional[str] = None
 
     # Downloader settings
     DOWNLOADER_API_KEY: Optional[str] = None
     DOWNLOAD_PATH: str = "Downloads"
 
+    # Outbound HTTP settings
+    HTTP2_ENABLED: bool = False
+    DNS_CACHE_TTL_SECONDS: int = 300
+
+    # Sync orchestration settings
+    SYNC_MAX_CONCURRENT: int = 2
+    SYNC_MAX_CONCURRENT_PER_SERVER: int = 1
+
+    # Scheduling settings
+    SCHEDULE_SPREAD_WINDOW_MINUTES: int = 60
+    SCHEDULE_CRON_JITTER_SECONDS: int = 0
+
 settings = Settings()
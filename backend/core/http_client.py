@@ -0,0 +1,239 @@
+"""应用级共享 HTTP 客户端：按外部服务划分连接池，复用 TLS 连接和 keep-alive，并缓存 DNS 解析结果"""
+
+import asyncio
+import ipaddress
+import logging
+import socket
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpcore
+import httpx
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# 各外部服务的连接池配置。每个服务使用独立的客户端，连接数上限即为对该主机的并发连接上限
+CLIENT_PROFILES: Dict[str, Dict[str, Any]] = {
+    # 下载 API 及音频/封面文件（CDN 会重定向，下载流需要较多并发连接）
+    'downloader': {'max_connections': 32, 'max_keepalive_connections': 16, 'timeout': 30.0, 'follow_redirects': True},
+    'netease': {'max_connections': 8, 'max_keepalive_connections': 4, 'timeout': 15.0, 'follow_redirects': False},
+    'qq': {'max_connections': 8, 'max_keepalive_connections': 4, 'timeout': 15.0, 'follow_redirects': False},
+    'default': {'max_connections': 10, 'max_keepalive_connections': 5, 'timeout': 10.0, 'follow_redirects': True},
+}
+
+# 空闲连接保留时间（秒），需短于上游负载均衡器的空闲超时
+KEEPALIVE_EXPIRY_SECONDS = 30.0
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class CachingDNSBackend(httpcore.AsyncNetworkBackend):
+    """
+    在 httpcore 网络后端外层缓存 DNS 解析结果。
+    容器内通常没有本地 DNS 缓存，每次新建连接都会查询上游 DNS；TLS 的 SNI 和证书校验仍使用原始主机名。
+    """
+
+    def __init__(self, backend: httpcore.AsyncNetworkBackend, ttl: float):
+        self._backend = backend
+        self._ttl = ttl
+        self._cache: Dict[Tuple[str, int], Tuple[float, List[str]]] = {}
+
+    async def _resolve(self, host: str, port: int) -> List[str]:
+        try:
+            ipaddress.ip_address(host)
+            return [host]
+        except ValueError:
+            pass
+        cached = self._cache.get((host, port))
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
+        infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        addresses = list(dict.fromkeys(info[4][0] for info in infos))
+        self._cache[(host, port)] = (time.monotonic() + self._ttl, addresses)
+        return addresses
+
+    async def connect_tcp(self, host: str, port: int, timeout: Optional[float] = None,
+                          local_address: Optional[str] = None, socket_options=None) -> httpcore.AsyncNetworkStream:
+        try:
+            addresses = await self._resolve(host, port)
+        except OSError:
+            # 解析失败时交给原始后端处理，保持原有的异常类型
+            return await self._backend.connect_tcp(host, port, timeout=timeout, local_address=local_address,
+                                                   socket_options=socket_options)
+        last_error: Optional[Exception] = None
+        for address in addresses:
+            try:
+                return await self._backend.connect_tcp(address, port, timeout=timeout, local_address=local_address,
+                                                       socket_options=socket_options)
+            except (httpcore.ConnectError, httpcore.ConnectTimeout) as e:
+                last_error = e
+        # 所有缓存地址均无法连接，可能已失效，下次重新解析
+        self._cache.pop((host, port), None)
+        raise last_error
+
+    async def connect_unix_socket(self, path: str, timeout: Optional[float] = None,
+                                  socket_options=None) -> httpcore.AsyncNetworkStream:
+        return await self._backend.connect_unix_socket(path, timeout=timeout, socket_options=socket_options)
+
+    async def sleep(self, seconds: float) -> None:
+        await self._backend.sleep(seconds)
+
+
+# httpcore 异常到 httpx 异常的映射，与 httpx.AsyncHTTPTransport 的行为保持一致（子类在前，优先匹配）
+_HTTPCORE_EXCEPTIONS: List[Tuple[type, type]] = [
+    (httpcore.ConnectTimeout, httpx.ConnectTimeout),
+    (httpcore.ReadTimeout, httpx.ReadTimeout),
+    (httpcore.WriteTimeout, httpx.WriteTimeout),
+    (httpcore.PoolTimeout, httpx.PoolTimeout),
+    (httpcore.TimeoutException, httpx.TimeoutException),
+    (httpcore.ConnectError, httpx.ConnectError),
+    (httpcore.ReadError, httpx.ReadError),
+    (httpcore.WriteError, httpx.WriteError),
+    (httpcore.NetworkError, httpx.NetworkError),
+    (httpcore.ProxyError, httpx.ProxyError),
+    (httpcore.UnsupportedProtocol, httpx.UnsupportedProtocol),
+    (httpcore.LocalProtocolError, httpx.LocalProtocolError),
+    (httpcore.RemoteProtocolError, httpx.RemoteProtocolError),
+    (httpcore.ProtocolError, httpx.ProtocolError),
+]
+
+
+def _map_httpcore_error(error: Exception) -> Exception:
+    for source, target in _HTTPCORE_EXCEPTIONS:
+        if isinstance(error, source):
+            mapped = target(str(error))
+            mapped.__cause__ = error
+            return mapped
+    return error
+
+
+class _ResponseStream(httpx.AsyncByteStream):
+    def __init__(self, stream):
+        self._stream = stream
+
+    async def __aiter__(self):
+        try:
+            async for part in self._stream:
+                yield part
+        except Exception as e:
+            raise _map_httpcore_error(e)
+
+    async def aclose(self):
+        if hasattr(self._stream, 'aclose'):
+            await self._stream.aclose()
+
+
+class CachingDNSTransport(httpx.AsyncBaseTransport):
+    """
+    使用 CachingDNSBackend 的 httpx 传输层。
+    连接池通过 httpcore 公开的 network_backend 参数自行创建，不依赖 httpx 传输层的内部属性。
+    """
+
+    def __init__(self, limits: httpx.Limits, http2: bool, retries: int, dns_ttl: float):
+        self._pool = httpcore.AsyncConnectionPool(
+            ssl_context=httpx.create_ssl_context(),
+            max_connections=limits.max_connections,
+            max_keepalive_connections=limits.max_keepalive_connections,
+            keepalive_expiry=limits.keepalive_expiry,
+            http1=True,
+            http2=http2,
+            retries=retries,
+            network_backend=CachingDNSBackend(httpcore.AnyIOBackend(), dns_ttl),
+        )
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        core_request = httpcore.Request(
+            method=request.method,
+            url=httpcore.URL(
+                scheme=request.url.raw_scheme,
+                host=request.url.raw_host,
+                port=request.url.port,
+                target=request.url.raw_path,
+            ),
+            headers=request.headers.raw,
+            content=request.stream,
+            extensions=request.extensions,
+        )
+        try:
+            response = await self._pool.handle_async_request(core_request)
+        except Exception as e:
+            raise _map_httpcore_error(e)
+        return httpx.Response(
+            status_code=response.status,
+            headers=response.headers,
+            stream=_ResponseStream(response.stream),
+            extensions=response.extensions,
+        )
+
+    async def aclose(self) -> None:
+        await self._pool.aclose()
+
+
+class HttpClientRegistry:
+    """
+    按名称管理共享的 httpx.AsyncClient。客户端在首次使用时创建（应用启动时由 lifespan 预先创建），
+    应用关闭时统一关闭。
+    """
+
+    def __init__(self):
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._http2_warned = False
+
+    def _create(self, name: str) -> httpx.AsyncClient:
+        profile = CLIENT_PROFILES.get(name, CLIENT_PROFILES['default'])
+        http2 = settings.HTTP2_ENABLED
+        if http2 and not _http2_available():
+            if not self._http2_warned:
+                logger.warning("已启用 HTTP/2，但未安装 h2 包，将使用 HTTP/1.1。")
+                self._http2_warned = True
+            http2 = False
+
+        limits = httpx.Limits(
+            max_connections=profile['max_connections'],
+            max_keepalive_connections=profile['max_keepalive_connections'],
+            keepalive_expiry=KEEPALIVE_EXPIRY_SECONDS
+        )
+        # 连接建立失败（而非请求失败）时自动重试一次
+        if settings.DNS_CACHE_TTL_SECONDS > 0:
+            transport = CachingDNSTransport(limits, http2, retries=1, dns_ttl=settings.DNS_CACHE_TTL_SECONDS)
+        else:
+            transport = httpx.AsyncHTTPTransport(limits=limits, http2=http2, retries=1)
+
+        return httpx.AsyncClient(
+            transport=transport,
+            timeout=profile['timeout'],
+            follow_redirects=profile['follow_redirects'],
+            max_redirects=5
+        )
+
+    def get(self, name: str = 'default') -> httpx.AsyncClient:
+        client = self._clients.get(name)
+        if client is None or client.is_closed:
+            client = self._create(name)
+            self._clients[name] = client
+        return client
+
+    def start(self):
+        """在应用启动时预先创建所有客户端"""
+        for name in CLIENT_PROFILES:
+            self.get(name)
+        logger.info(f"共享 HTTP 客户端已创建: {', '.join(CLIENT_PROFILES)}")
+
+    async def aclose(self):
+        clients, self._clients = self._clients, {}
+        for name, client in clients.items():
+            try:
+                await client.aclose()
+            except Exception as e:
+                logger.warning(f"关闭 HTTP 客户端 '{name}' 时出错: {e}")
+
+
+http_clients = HttpClientRegistry()
@@ -10,8 +10,10 @@ import logging
 from api.v1.api import api_router
 from api.v1.endpoints import auth
 from core.config import settings
+from core.http_client import http_clients
 from utils.scheduler import set_scheduler, TaskScheduler
 from services.download.download_service import set_download_service, DownloadService, get_download_service
+from services.download.downloader_core import downloader
 from services.settings_service import SettingsService
 from services.sync_service import SyncService
 from core.logging_config import setup_logging
@@ -45,6 +47,9 @@ async def lifespan(app: FastAPI):
     # 启动时的初始化代码
     check_security_prerequisites()
     setup_logging()
+
+    # 0. 创建应用级共享的 HTTP 客户端（连接池在各服务之间复用）
+    http_clients.start()
     
     # 1. 创建服务实例 (依赖顺序: Download -> Sync -> Scheduler)
     settings_service = SettingsService()
@@ -71,6 +76,8 @@ async def lifespan(app: FastAPI):
     
     # 关闭时的清理代码
     scheduler_instance.shutdown()
+    await downloader.close()
+    await http_clients.aclose()
     logger.info("应用已关闭。")
 
 app = FastAPI(
@@ -1,9 +1,18 @@
 
 from pydantic import BaseModel, Field, field_validator
-from typing import Optional, Literal, Union
+from typing import Optional, Literal, Union, List
 from datetime import datetime
 import re
 
+class BandwidthScheduleRule(BaseModel):
+    """
+    按时间段生效的限速规则，结束时间早于开始时间表示跨越午夜
+    """
+    start: str = Field(..., pattern=r"^([01]\d|2[0-3]):[0-5]\d$", title="开始时间", description="格式 HH:MM")
+    end: str = Field(..., pattern=r"^([01]\d|2[0-3]):[0-5]\d$", title="结束时间", description="格式 HH:MM")
+    limit_kbps: int = Field(0, ge=0, title="限速（KB/s）", description="该时间段内的总下载速度上限，0 表示不限速")
+
+
 class DownloadSettingsBase(BaseModel):
     """
     下载设置的基础模型
@@ -15,6 +24,16 @@ class DownloadSettingsBase(BaseModel):
     max_concurrent_downloads: int = Field(3, ge=1, le=10, title="最大并发下载数", description="同时进行的最大下载任务数量")
     log_retention_days: int = Field(30, ge=1, title="日志保留天数", description="下载日志文件保留的最长天数")
     scan_interval_minutes: int = Field(30, ge=5, le=1440, title="扫描间隔（分钟）", description="定期扫描新音乐的间隔时间（分钟）")
+    download_chunk_size_kb: int = Field(256, ge=8, le=8192, title="下载块大小（KB）", description="流式下载时每次读取并写入磁盘的数据块大小")
+    segmented_download_enabled: bool = Field(False, title="分段并行下载", description="服务器支持 Range 请求时，将大文件拆分为多个分段并行下载")
+    segmented_min_size_mb: int = Field(20, ge=1, le=2048, title="分段下载阈值（MB）", description="文件大小超过该值时才启用分段下载")
+    segments_per_file: int = Field(4, ge=2, le=16, title="单文件分段数", description="每个文件同时下载的分段数量")
+    max_concurrent_segments: int = Field(8, ge=1, le=64, title="全局最大分段数", description="所有下载任务合计同时进行的分段数量上限")
+    bandwidth_limit_kbps: int = Field(0, ge=0, title="全局限速（KB/s）", description="所有下载任务共享的总下载速度上限，0 表示不限速")
+    bandwidth_schedules: List[BandwidthScheduleRule] = Field(default_factory=list, title="分时段限速", description="在指定时间段内覆盖全局限速，按顺序匹配第一条规则")
+    cover_max_dimension_px: int = Field(0, ge=0, le=4096, title="封面最大边长（像素）", description="嵌入前将超过该尺寸的封面缩小（需要安装 Pillow），0 表示保持原图")
+    post_process_mode: Literal['thread', 'process'] = Field('thread', title="后处理执行方式", description="质量校验和写入标签在线程池（thread）还是进程池（process）中执行")
+    post_process_workers: int = Field(2, ge=1, le=16, title="后处理工作者数量", description="同时进行后处理的文件数量上限")
 
 class DownloadSettingsCreate(DownloadSettingsBase):
     """
@@ -68,7 +87,7 @@ class DownloadActionResponse(BaseModel):
     message: str
 
 
-from typing import Optional, List, Any
+from typing import Optional, List, Any, Dict
 
 class DownloadQueueItem(BaseModel):
     id: int
@@ -160,3 +179,8 @@ class SessionStatusResponse(BaseModel):
     success: bool
     sessions: List[DownloadSession] = []
 
+
+class CacheStatsResponse(BaseModel):
+    """上游 API 响应缓存的命中统计"""
+    success: bool
+    stats: Dict[str, Dict[str, Any]] = Field({}, title="命中统计", description="按缓存类型（search / song_url 等）分组的命中次数与命中率")
@@ -171,10 +171,12 @@ class AutoPlaylistService:
             for playlist_name, tracks in tracks_to_add.items():
                 if tracks:
                     logger.info(f"[Task {task_id}] Adding {len(tracks)} tracks to playlist '{playlist_name}'")
-                    success = await self.plex_service.create_or_update_playlist(
+                    # 只追加新匹配的音轨，不能用完整列表覆盖，否则会移除播放列表中的其他歌曲
+                    success = await self.plex_service.apply_playlist_delta(
                         playlist_name, 
                         tracks, 
-                        lambda level, msg: logger.log(getattr(logging, level.upper()), f"[Task {task_id}] {msg}")
+                        set(),
+                        lambda level, msg: logger.log(getattr(logging, level.upper(), logging.INFO), f"[Task {task_id}] {msg}")
                     )
                     if success:
                         logger.info(f"[Task {task_id}] Successfully added tracks to playlist '{playlist_name}'")
@@ -184,7 +186,9 @@ class AutoPlaylistService:
             # 5. 更新任务状态
             if matched_songs_info:
                 # 提取匹配的缺失歌曲信息用于更新任务
-                matched_missing_songs = [info['missing_song'] for info in matched_songs_info]
+                matched_missing_songs = [
+                    {**info['missing_song'], 'rating_key': info['plex_track'].ratingKey} for info in matched_songs_info
+                ]
                 logger.info(f"[Task {task_id}] Updating task status, removing {len(matched_missing_songs)} matched songs")
                 
                 # 调用TaskService的方法来更新任务状态
@@ -238,7 +242,7 @@ class AutoPlaylistService:
                             # 记录需要更新的任务
                             if task.id not in task_updates:
                                 task_updates[task.id] = []
-                            task_updates[task.id].append(song)
+                            task_updates[task.id].append({**song, 'rating_key': track.ratingKey})
                             
                             # 记录需要添加到播放列表的音轨
                             playlist_key = (task.id, task.name)
@@ -251,10 +255,12 @@ class AutoPlaylistService:
             for (task_id, playlist_name), tracks in tracks_to_add.items():
                 if tracks:
                     logger.info(f"[Task {task_id}] Adding {len(tracks)} tracks to playlist '{playlist_name}'")
-                    success = await self.plex_service.create_or_update_playlist(
+                    # 只追加新匹配的音轨，不能用完整列表覆盖，否则会移除播放列表中的其他歌曲
+                    success = await self.plex_service.apply_playlist_delta(
                         playlist_name, 
                         tracks, 
-                        lambda level, msg: logger.log(getattr(logging, level.upper()), f"[Task {task_id}] {msg}")
+                        set(),
+                        lambda level, msg: logger.log(getattr(logging, level.upper(), logging.INFO), f"[Task {task_id}] {msg}")
                     )
                     if success:
                         logger.info(f"[Task {task_id}] Successfully added tracks to playlist '{playlist_name}'")
@@ -0,0 +1,76 @@
+"""所有下载任务共享的全局带宽限速器（令牌桶）"""
+
+import asyncio
+import time
+from datetime import datetime
+from typing import List, Optional
+
+from schemas.download_schemas import BandwidthScheduleRule
+
+
+def _to_minutes(hhmm: str) -> int:
+    hours, minutes = hhmm.split(':')
+    return int(hours) * 60 + int(minutes)
+
+
+class BandwidthLimiter:
+    """
+    令牌桶限速器。每个传输在写入一块数据前按字节数申请令牌；
+    申请通过锁按先来后到排队，使并发的传输轮流获得带宽，从而平均分配总速度。
+    """
+
+    def __init__(self):
+        self.default_limit_kbps = 0
+        self.schedules: List[BandwidthScheduleRule] = []
+        self._tokens = 0.0
+        self._last_refill = time.monotonic()
+        self._lock: Optional[asyncio.Lock] = None
+
+    def configure(self, limit_kbps: int, schedules: List[BandwidthScheduleRule]):
+        """更新全局限速和分时段规则"""
+        self.default_limit_kbps = limit_kbps
+        self.schedules = list(schedules)
+
+    def current_limit_kbps(self, now: Optional[datetime] = None) -> int:
+        """返回当前时刻生效的限速（KB/s），0 表示不限速"""
+        now = now or datetime.now()
+        minute_of_day = now.hour * 60 + now.minute
+        for rule in self.schedules:
+            start, end = _to_minutes(rule.start), _to_minutes(rule.end)
+            if start <= end:
+                in_window = start <= minute_of_day < end
+            else:
+                # 跨越午夜的时间段，例如 23:00-07:00
+                in_window = minute_of_day >= start or minute_of_day < end
+            if in_window:
+                return rule.limit_kbps
+        return self.default_limit_kbps
+
+    def _refill(self, rate: float):
+        now = time.monotonic()
+        # 桶容量为一秒的流量，避免空闲后出现过大的突发
+        self._tokens = min(rate, self._tokens + (now - self._last_refill) * rate)
+        self._last_refill = now
+
+    async def throttle(self, nbytes: int):
+        """为即将写入的 nbytes 字节申请令牌，令牌不足时等待"""
+        rate = self.current_limit_kbps() * 1024
+        if rate <= 0:
+            return
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        async with self._lock:
+            remaining = nbytes
+            while remaining > 0:
+                # 大块数据按桶容量拆分申请，防止单个请求超过桶容量而永远无法满足
+                piece = min(remaining, rate)
+                self._refill(rate)
+                if self._tokens < piece:
+                    await asyncio.sleep((piece - self._tokens) / rate)
+                    self._refill(rate)
+                self._tokens -= piece
+                remaining -= piece
+
+
+bandwidth_limiter = BandwidthLimiter()
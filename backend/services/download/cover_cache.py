@@ -0,0 +1,172 @@
+"""按内容寻址的封面图片磁盘缓存，同一张封面在多首歌曲之间只下载一次"""
+
+import asyncio
+import hashlib
+import io
+import logging
+import os
+from pathlib import Path
+from typing import Dict, Optional
+
+import httpx
+
+from services.download.download_constants import COVER_CACHE_DIR, COVER_CACHE_MAX_MB
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow 是可选依赖，未安装时不进行缩放
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+
+class CoverCache:
+    """
+    封面缓存的磁盘布局：
+    - urls/<sha256(url)>：记录该 URL 对应图片内容的 sha256
+    - blobs/<内容sha256>[_<边长>].jpg：图片数据（缩放后的版本带边长后缀）
+    同一内容只存一份；总大小超过上限时按最近使用时间淘汰。
+    并发请求同一 URL 时只发出一次下载，其余请求等待其结果。
+    磁盘读写和图片缩放都在线程池中执行，不阻塞事件循环。
+    """
+
+    def __init__(self, cache_dir: str = COVER_CACHE_DIR, max_bytes: int = COVER_CACHE_MAX_MB * 1024 * 1024):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.max_dimension = 0
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._pillow_warned = False
+
+    def configure(self, max_dimension: int):
+        self.max_dimension = max_dimension
+
+    # --- 磁盘布局 ---
+
+    def _url_index_path(self, url: str) -> Path:
+        return self.cache_dir / "urls" / hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+    def _blob_path(self, content_hash: str) -> Path:
+        suffix = f"_{self.max_dimension}" if self.max_dimension and Image is not None else ""
+        return self.cache_dir / "blobs" / f"{content_hash}{suffix}.jpg"
+
+    def _lookup(self, url: str) -> Optional[bytes]:
+        try:
+            content_hash = self._url_index_path(url).read_text().strip()
+            blob = self._blob_path(content_hash)
+            data = blob.read_bytes()
+        except (FileNotFoundError, OSError):
+            return None
+        # 更新访问时间，供 LRU 淘汰使用
+        try:
+            os.utime(blob)
+        except OSError:
+            pass
+        return data
+
+    def _store(self, url: str, content_hash: str, data: bytes):
+        blob = self._blob_path(content_hash)
+        blob.parent.mkdir(parents=True, exist_ok=True)
+        if not blob.exists():
+            tmp = blob.with_name(blob.name + ".tmp")
+            tmp.write_bytes(data)
+            os.replace(tmp, blob)
+        index = self._url_index_path(url)
+        index.parent.mkdir(parents=True, exist_ok=True)
+        index.write_text(content_hash)
+        self._evict()
+
+    def _evict(self):
+        blobs_dir = self.cache_dir / "blobs"
+        entries = []
+        total = 0
+        for entry in os.scandir(blobs_dir):
+            if entry.is_file():
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+        if total <= self.max_bytes:
+            return
+        # URL 索引指向已淘汰的图片时会被视为未命中，无需同步清理
+        for _, size, path in sorted(entries):
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def _process(self, data: bytes, log: logging.Logger) -> bytes:
+        """按配置缩小过大的封面，缩放结果会被缓存复用"""
+        if not self.max_dimension:
+            return data
+        if Image is None:
+            if not self._pillow_warned:
+                log.warning("已配置封面最大边长，但未安装 Pillow，封面将保持原图。")
+                self._pillow_warned = True
+            return data
+        try:
+            with Image.open(io.BytesIO(data)) as image:
+                if max(image.size) <= self.max_dimension:
+                    return data
+                image = image.convert('RGB')
+                image.thumbnail((self.max_dimension, self.max_dimension))
+                output = io.BytesIO()
+                image.save(output, format='JPEG', quality=90)
+                log.info(f"封面已缩小至 {image.size[0]}x{image.size[1]}。")
+                return output.getvalue()
+        except Exception as e:
+            log.warning(f"缩放封面失败，将使用原图: {e}")
+            return data
+
+    # --- 公共接口 ---
+
+    async def get(self, url: str, http_client: httpx.AsyncClient, log: logging.Logger) -> Optional[bytes]:
+        """获取封面图片数据：优先读取缓存，否则使用共享的异步客户端下载、处理并写入缓存。下载失败时返回 None。"""
+        cached = await asyncio.to_thread(self._lookup, url)
+        if cached is not None:
+            log.info(f"封面命中缓存，大小: {len(cached)} bytes。")
+            return cached
+
+        task = self._inflight.get(url)
+        if task is not None:
+            log.info("相同封面正在由其他任务下载，等待其结果...")
+        else:
+            # 下载在独立的任务中进行，任一等待者被取消（例如其歌曲下载失败）都不会影响其他等待者
+            task = asyncio.create_task(self._fetch_shared(url, http_client, log))
+            self._inflight[url] = task
+
+            def _on_done(done: asyncio.Task):
+                if self._inflight.get(url) is done:
+                    del self._inflight[url]
+
+            task.add_done_callback(_on_done)
+        return await asyncio.shield(task)
+
+    async def _fetch_shared(self, url: str, http_client: httpx.AsyncClient, log: logging.Logger) -> Optional[bytes]:
+        try:
+            return await self._fetch(url, http_client, log)
+        except Exception as e:
+            log.warning(f"获取封面图片时出错: {e}")
+            return None
+
+    async def _fetch(self, url: str, http_client: httpx.AsyncClient, log: logging.Logger) -> Optional[bytes]:
+        log.info(f"正在从 {url} 下载封面图片...")
+        try:
+            response = await http_client.get(url, timeout=15.0)
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            log.warning(f"下载封面图片失败: {e}")
+            return None
+        original = response.content
+        log.info(f"封面图片下载成功，大小: {len(original)} bytes。")
+
+        data = await asyncio.to_thread(self._process, original, log)
+        try:
+            await asyncio.to_thread(self._store, url, hashlib.sha256(original).hexdigest(), data)
+        except OSError as e:
+            log.warning(f"写入封面缓存失败: {e}")
+        return data
+
+
+cover_cache = CoverCache()
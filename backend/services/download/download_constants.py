@@ -20,4 +20,51 @@ MIN_DURATION_SECONDS = 90.0
 
 # API响应验证阈值
 API_VALIDATION_TITLE_THRESHOLD = 75
-API_VALIDATION_ARTIST_THRESHOLD = 75
\ No newline at end of file
+API_VALIDATION_ARTIST_THRESHOLD = 75
+
+# 下载中的临时文件后缀（Plex 不会扫描该扩展名）
+PART_FILE_SUFFIX = ".part"
+
+# 流式下载默认块大小（单位：KB）
+DEFAULT_DOWNLOAD_CHUNK_SIZE_KB = 256
+
+# 断点续传：每接收这么多字节就把下载进度写入数据库一次
+RESUME_CHECKPOINT_BYTES = 4 * 1024 * 1024
+
+# 下载 API 的自适应并发控制（AIMD）：初始/最小/最大并发请求数
+API_INITIAL_CONCURRENCY = 4
+API_MIN_CONCURRENCY = 1
+API_MAX_CONCURRENCY = 16
+# 服务器返回 Retry-After 时最多等待的秒数；未返回时的默认冷却时间
+API_MAX_RETRY_AFTER_SECONDS = 120
+API_DEFAULT_COOLDOWN_SECONDS = 2
+
+# 上游 API 响应缓存：内存 LRU 容量与各类响应的有效期（秒）
+RESPONSE_CACHE_MEMORY_ENTRIES = 1024
+SEARCH_CACHE_TTL_SECONDS = 6 * 60 * 60
+SONG_URL_CACHE_TTL_SECONDS = 10 * 60
+LYRICS_CACHE_TTL_SECONDS = 30 * 24 * 60 * 60
+QQ_DETAIL_CACHE_TTL_SECONDS = 30 * 24 * 60 * 60
+# 带签名的下载链接在过期前预留的安全时间（秒）
+SIGNED_URL_EXPIRY_MARGIN_SECONDS = 60
+
+# 全平台均无可用版本的歌曲：首次复查间隔与最长复查间隔（小时），每失败一次间隔翻倍
+UNAVAILABLE_RECHECK_BASE_HOURS = 12
+UNAVAILABLE_RECHECK_MAX_HOURS = 14 * 24
+
+# 本地下载目录索引：识别为音频的扩展名，以及并行读取标签的线程数
+AUDIO_FILE_EXTENSIONS = ('.flac', '.mp3', '.m4a', '.mp4', '.ogg')
+CATALOG_SCAN_WORKERS = 8
+
+# 封面缓存：存放目录与磁盘占用上限（MB）
+COVER_CACHE_DIR = "./data/cover_cache"
+COVER_CACHE_MAX_MB = 200
+
+# 下载后处理（质量校验 + 写入标签）默认使用的工作者数量
+DEFAULT_POST_PROCESS_WORKERS = 2
+
+# 边下载边检测时长：最多缓存响应开头的这么多字节用于解析（需跳过可能嵌有封面的 ID3 标签）
+STREAM_PROBE_MAX_BYTES = 1024 * 1024
+
+# QQ音乐多曲目详情接口每次请求的歌曲数量
+QQ_DETAIL_BATCH_SIZE = 50
@@ -693,6 +693,83 @@ class DownloadDBService:
         else:
             return self._execute_in_thread(_get_download_lyrics, session_id)
 
+    def record_downloaded_file(self, item_id: int, file_path: str, match_key: str):
+        """记录队列项目对应的本地文件路径和歌曲匹配键，供后续去重使用。"""
+        def _record(conn: sqlite3.Connection):
+            cursor = conn.cursor()
+            cursor.execute(
+                "UPDATE download_queue SET file_path = ?, match_key = ? WHERE id = ?",
+                (file_path, match_key, item_id)
+            )
+            conn.commit()
+        self._execute_in_thread(_record)
+
+    def find_downloaded_file(self, platform: Optional[str], song_id: Optional[str], match_key: str) -> Optional[str]:
+        """查找同一首歌曲（相同平台歌曲ID或相同标题/艺术家）最近一次成功下载的文件路径。"""
+        def _find(conn: sqlite3.Connection) -> Optional[str]:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT file_path FROM download_queue
+                WHERE status = 'success' AND file_path IS NOT NULL
+                  AND (match_key = ? OR (song_id IS NOT NULL AND song_id = ? AND platform = ?))
+                ORDER BY updated_at DESC
+                LIMIT 1
+                """,
+                (match_key, song_id, platform)
+            )
+            row = cursor.fetchone()
+            return row['file_path'] if row else None
+        return self._execute_in_thread(_find)
+
+    def get_partial_download(self, item_id: int) -> Optional[dict]:
+        """获取队列项目已记录的断点续传状态，没有记录时返回 None。"""
+        def _get_partial(conn: sqlite3.Connection, item_id: int) -> Optional[dict]:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT partial_path, COALESCE(bytes_received, 0) as bytes_received, total_bytes, resume_validator
+                FROM download_queue WHERE id = ?
+                """,
+                (item_id,)
+            )
+            row = cursor.fetchone()
+            if row and row['partial_path']:
+                return dict(row)
+            return None
+        return self._execute_in_thread(_get_partial, item_id)
+
+    def save_partial_download(self, item_id: int, partial_path: str, bytes_received: int,
+                              total_bytes: Optional[int], resume_validator: Optional[str]):
+        """记录队列项目的断点续传状态（临时文件路径、已接收字节数和校验标识）。"""
+        def _save_partial(conn: sqlite3.Connection):
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                UPDATE download_queue
+                SET partial_path = ?, bytes_received = ?, total_bytes = ?, resume_validator = ?
+                WHERE id = ?
+                """,
+                (partial_path, bytes_received, total_bytes, resume_validator, item_id)
+            )
+            conn.commit()
+        self._execute_in_thread(_save_partial)
+
+    def clear_partial_download(self, item_id: int):
+        """清除队列项目的断点续传状态。"""
+        def _clear_partial(conn: sqlite3.Connection, item_id: int):
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                UPDATE download_queue
+                SET partial_path = NULL, bytes_received = 0, total_bytes = NULL, resume_validator = NULL
+                WHERE id = ?
+                """,
+                (item_id,)
+            )
+            conn.commit()
+        self._execute_in_thread(_clear_partial, item_id)
+
     def refresh_all_session_counts(self):
         """修正所有会话的计数，通过重新计算每个会话中的实际项目状态"""
         def _refresh_all_counts(conn: sqlite3.Connection):
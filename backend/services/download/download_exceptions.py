@@ -4,4 +4,12 @@ class APIError(Exception):
     """自定义 API 异常"""
     def __init__(self, message, status_code=None):
         super().__init__(message)
-        self.status_code = status_code
\ No newline at end of file
+        self.status_code = status_code
+
+class SongUnavailableError(APIError):
+    """所有平台上都找不到可下载的版本"""
+    pass
+
+class LowQualityStreamError(APIError):
+    """下载过程中已能确定文件过小或时长过短，提前中止传输"""
+    pass
@@ -1,5 +1,6 @@
 
 import asyncio
+import os
 import sqlite3
 from typing import List, Optional, Dict
 from datetime import datetime, timedelta
@@ -8,8 +9,11 @@ from services.download.download_db_service import download_db_service
 from schemas.download import DownloadQueueItem, DownloadQueueItemCreate
 from core.logging_config import download_log_manager
 from services.download.downloader_core import downloader as downloader_core
+from services.download.download_exceptions import SongUnavailableError
+from services.download.unavailable_song_service import unavailable_song_service, normalize_song_key
 from services.settings_service import SettingsService
 from services.auto_playlist_service import AutoPlaylistService
+from utils.background_tasks import BackgroundTasks
 import logging
 
 logger = logging.getLogger(__name__)
@@ -25,6 +29,10 @@ class DownloadQueueManager:
         self.active_downloads: Dict[int, asyncio.Task] = {}
         self._is_processing = False
         self._downloader_initialized = False
+        # 正在进行中的下载（去重键 -> 下载结果），相同歌曲的并发请求共享同一次下载
+        self._inflight: Dict[str, asyncio.Future] = {}
+        # 后台预取任务
+        self._background_tasks = BackgroundTasks()
 
     async def add_to_queue(self, task_id: int, session_type: str, items: List[DownloadQueueItemCreate], download_lrc: bool = False, conn: Optional[sqlite3.Connection] = None) -> int:
         """
@@ -101,6 +109,9 @@ class DownloadQueueManager:
 
         logger.info(f"[DEBUG] QueueManager: 会话 {session_id} 已更新/创建，并添加了 {count} 个项目到队列。")
 
+        # 在项目进入下载阶段之前批量补全QQ音乐歌曲详情（先于队列处理器调度，逐首补全时直接命中）
+        self._background_tasks.run(downloader_core.prefetch_enrichment(items), '预取QQ音乐歌曲详情')
+
         logger.info(f"[DEBUG] QueueManager: 准备启动队列处理")
         self.start_processing()
         logger.info(f"[DEBUG] QueueManager: 队列处理已启动，返回session_id={session_id}")
@@ -162,6 +173,77 @@ class DownloadQueueManager:
                 logger.debug("队列中没有待处理的项目，等待5秒...")
                 await asyncio.sleep(5)
 
+    @staticmethod
+    def _dedup_keys(item: DownloadQueueItem) -> List[str]:
+        """歌曲的去重键：优先使用平台歌曲ID，同时附带规范化的标题/艺术家以便跨平台去重"""
+        keys = []
+        if item.song_id and item.platform:
+            keys.append(f"id:{item.platform}:{item.song_id}")
+        keys.append(f"meta:{normalize_song_key(item.title, item.artist)}")
+        return keys
+
+    async def _download_deduplicated(self, item: DownloadQueueItem, preferred_quality: str,
+                                     download_lyrics: bool, session_logger: logging.Logger) -> str:
+        """
+        下载歌曲，并对跨任务的重复请求去重：
+        已经下载过且文件仍在的歌曲直接返回已有文件；正在下载的相同歌曲则等待那次下载的结果。
+        """
+        loop = asyncio.get_running_loop()
+        keys = self._dedup_keys(item)
+
+        existing_path = await loop.run_in_executor(
+            None, download_db_service.find_downloaded_file, item.platform, item.song_id,
+            normalize_song_key(item.title, item.artist)
+        )
+        if existing_path and os.path.exists(existing_path):
+            session_logger.info(f"歌曲 '{item.title}' 已由之前的下载保存在 {existing_path}，跳过重复下载。")
+            return existing_path
+
+        while True:
+            shared = next((self._inflight[key] for key in keys if key in self._inflight), None)
+            if shared is None:
+                break
+            session_logger.info(f"歌曲 '{item.title}' 正在由其他任务下载，等待其结果...")
+            try:
+                return await asyncio.shield(shared)
+            except asyncio.CancelledError:
+                if not shared.cancelled():
+                    raise
+                # 被等待的下载被取消（例如其会话被暂停），由当前任务自行下载
+                session_logger.info(f"共享的下载已被取消，改为自行下载 '{item.title}'。")
+
+        future = loop.create_future()
+        for key in keys:
+            self._inflight[key] = future
+        try:
+            file_path = await downloader_core.download(item, preferred_quality, download_lyrics, session_logger)
+            future.set_result(file_path)
+            return file_path
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except SongUnavailableError as e:
+            # 只由实际执行搜索的这次尝试记录负缓存，等待同一结果的其他队列项目不重复计数
+            try:
+                await loop.run_in_executor(
+                    None, unavailable_song_service.record_unavailable,
+                    item.title, item.artist, item.platform, item.song_id, str(e)
+                )
+            except Exception as record_err:
+                session_logger.warning(f"记录歌曲 '{item.title}' 的不可用状态失败: {record_err}")
+            future.set_exception(e)
+            future.exception()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # 标记异常已被读取，避免没有等待者时产生警告
+            future.exception()
+            raise
+        finally:
+            for key in keys:
+                if self._inflight.get(key) is future:
+                    del self._inflight[key]
+
     async def _download_worker(self, item: DownloadQueueItem):
         queue_id = item.id
         session_id = item.session_id
@@ -181,19 +263,28 @@ class DownloadQueueManager:
             # 获取当前的全局歌词下载设置（而不是会话创建时的设置）
             # 这样用户更改设置后，新的下载会立即生效
             download_lyrics = settings.download_lyrics if settings else False
+            if settings:
+                downloader_core.apply_settings(settings)
             
             session_logger.info(f"使用下载设置: 音质='{preferred_quality}', 下载歌词={download_lyrics}")
 
-            # 调用真实的下载器逻辑,并增加300秒超时
+            # 调用真实的下载器逻辑（带去重与合并）,并增加300秒超时
             file_path = await asyncio.wait_for(
-                downloader_core.download(item, preferred_quality, download_lyrics, session_logger), 
+                self._download_deduplicated(item, preferred_quality, download_lyrics, session_logger),
                 timeout=300.0
             )
 
+            await loop.run_in_executor(
+                None, download_db_service.record_downloaded_file, queue_id, file_path,
+                normalize_song_key(item.title, item.artist)
+            )
             await asyncio.get_running_loop().run_in_executor(
                 None, download_db_service.update_queue_item_status, queue_id, "success"
             )
             session_logger.info(f"下载成功: {title} (ID: {queue_id})。文件保存在: {file_path}")
+            await loop.run_in_executor(
+                None, unavailable_song_service.clear, item.title, item.artist, item.platform, item.song_id
+            )
             
         except Exception as e:
             error_msg = str(e)
@@ -1,8 +1,11 @@
 
 import asyncio
 import logging
+import os
+import re
 from typing import List, Dict, Any, Optional
 
+from core.config import settings as app_settings
 from core.database import get_db_connection
 from services.settings_service import SettingsService
 from services.download.download_queue_manager import download_queue_manager
@@ -10,6 +13,10 @@ from schemas.download import DownloadQueueItemCreate
 from schemas.download_schemas import DownloadSingleRequest, SearchResultItem, SearchResponse
 from services.task_service import TaskService
 from services.download.downloader_core import DownloaderCore, downloader
+from services.download.unavailable_song_service import unavailable_song_service
+from services.download.local_catalog import local_catalog_service
+from services.auto_playlist_service import AutoPlaylistService
+from utils.background_tasks import BackgroundTasks
 
 logger = logging.getLogger(__name__)
 
@@ -28,6 +35,8 @@ class DownloadService:
         self.queue_manager = download_queue_manager
         self.settings_service = settings_service
         self.task_service = TaskService()
+        # 后台任务（目录索引、Plex 局部扫描）
+        self._background_tasks = BackgroundTasks()
 
     async def initialize_downloader(self):
         """
@@ -45,9 +54,84 @@ class DownloadService:
         self.downloader.initialize(download_path=settings.download_path)
         logger.info("下载器初始化成功。")
 
-    async def download_all_missing(self, task_id: int, db=None) -> int:
+        # 在后台建立/刷新下载目录索引，不阻塞启动
+        self._background_tasks.run(self._refresh_local_catalog(settings.download_path), '扫描下载目录')
+
+    async def _refresh_local_catalog(self, download_path: str):
+        try:
+            await local_catalog_service.scan(download_path)
+        except Exception as e:
+            logger.error(f"扫描下载目录 '{download_path}' 时出错: {e}", exc_info=True)
+
+    async def _request_plex_rescan(self, file_paths: List[str]):
+        """
+        请求 Plex 扫描这些文件所在的目录，使已下载但尚未入库的文件被识别。
+        目录需换算为 Plex 服务器上的路径；无法换算时改为扫描整个音乐库。
+        """
+        try:
+            plex_service = AutoPlaylistService.get_instance().plex_service
+        except RuntimeError:
+            logger.info("AutoPlaylistService 未初始化，跳过 Plex 局部扫描。")
+            return
+        if not plex_service:
+            return
+        try:
+            library = await plex_service.get_music_library()
+            if not library:
+                return
+            loop = asyncio.get_running_loop()
+            download_settings = await loop.run_in_executor(None, self.settings_service.get_download_settings)
+            download_root = download_settings.download_path if download_settings else None
+
+            plex_directories = set()
+            for directory in {os.path.dirname(path) for path in file_paths}:
+                plex_directory = self._map_to_plex_path(directory, download_root, library.locations)
+                if plex_directory is None:
+                    logger.info(f"无法将下载目录 '{directory}' 对应到 Plex 服务器上的路径，改为扫描整个音乐库。")
+                    await plex_service.scan_and_refresh(library)
+                    return
+                plex_directories.add(plex_directory)
+            for plex_directory in sorted(plex_directories):
+                await plex_service.scan_and_refresh(library, file_path=plex_directory)
+        except Exception as e:
+            logger.error(f"请求 Plex 局部扫描时出错: {e}", exc_info=True)
+
+    @staticmethod
+    def _map_to_plex_path(directory: str, download_root: Optional[str], locations: List[str]) -> Optional[str]:
+        """
+        将下载目录下的本地路径换算为 Plex 服务器上的路径。
+        下载根目录在 Plex 上的位置优先取 PLEX_DOWNLOAD_PATH 配置，否则在音乐库的文件夹中查找
+        与下载根目录路径相同、或末级目录名相同且唯一的一个。无法确定时返回 None。
+        """
+        if not download_root:
+            return None
+        local_root = os.path.normpath(download_root)
+        relative = os.path.relpath(os.path.normpath(directory), local_root)
+        if relative == os.pardir or relative.startswith(os.pardir + os.sep):
+            return None
+
+        plex_root = app_settings.PLEX_DOWNLOAD_PATH
+        if not plex_root:
+            stripped = [location.rstrip('/\\') for location in locations or []]
+            if local_root in stripped:
+                plex_root = local_root
+            else:
+                root_name = os.path.basename(local_root)
+                candidates = [location for location in stripped if re.split(r'[/\\]', location)[-1] == root_name]
+                if len(candidates) != 1:
+                    return None
+                plex_root = candidates[0]
+
+        if relative == os.curdir:
+            return plex_root
+        # Plex 服务器可能运行在 Windows 上，按其路径中的分隔符拼接
+        separator = '\\' if '\\' in plex_root and '/' not in plex_root else '/'
+        return plex_root.rstrip('/\\') + separator + relative.replace(os.sep, separator)
+
+    async def download_all_missing(self, task_id: int, db=None, songs: Optional[List[Dict[str, Any]]] = None) -> int:
         """
         下载指定同步任务中所有缺失的歌曲。
+        :param songs: 可选，直接指定缺失的歌曲（同步过程中尚未写入任务时使用），默认读取任务的未匹配歌曲
         """
         logger.info(f"[DEBUG] DownloadService: 开始处理批量下载请求，task_id={task_id}")
         
@@ -59,11 +143,14 @@ class DownloadService:
 
         logger.info(f"[DEBUG] DownloadService: 任务 {task_id} 验证成功，platform={task.platform}")
         loop = asyncio.get_running_loop()
-        unmatched_songs = await loop.run_in_executor(
-            None,
-            self.task_service.get_unmatched_songs_for_task,
-            task_id
-        )
+        if songs is not None:
+            unmatched_songs = songs
+        else:
+            unmatched_songs = await loop.run_in_executor(
+                None,
+                self.task_service.get_unmatched_songs_for_task,
+                task_id
+            )
         
         logger.info(f"[DEBUG] DownloadService: 找到 {len(unmatched_songs) if unmatched_songs else 0} 首未匹配歌曲")
         
@@ -71,6 +158,29 @@ class DownloadService:
             logger.info(f"[DEBUG] DownloadService: 任务 {task_id}: 没有找到未匹配的歌曲可供下载。")
             return 0
         
+        # 跳过下载目录中已经存在的歌曲（可能是之前下载但 Plex 尚未扫描入库），只让 Plex 重新扫描这些路径
+        existing = await loop.run_in_executor(None, local_catalog_service.find_existing, unmatched_songs)
+        present_paths = [path for _, path in existing if path]
+        if present_paths:
+            logger.info(f"任务 {task_id}: {len(present_paths)} 首歌曲已存在于下载目录中，跳过下载并请求 Plex 扫描其所在目录。")
+            self._background_tasks.run(self._request_plex_rescan(present_paths), 'Plex 局部扫描')
+            unmatched_songs = [song for song, path in existing if not path]
+            if not unmatched_songs:
+                return 0
+
+        # 跳过近期确认在所有平台都不可用的歌曲；已到复查时间的排在最后
+        fresh_songs, recheck_songs, skipped_songs = await loop.run_in_executor(
+            None, unavailable_song_service.partition_songs, unmatched_songs, task.platform
+        )
+        if skipped_songs:
+            logger.info(f"任务 {task_id}: 跳过 {len(skipped_songs)} 首近期在所有平台均不可用的歌曲。")
+        if recheck_songs:
+            logger.info(f"任务 {task_id}: {len(recheck_songs)} 首之前不可用的歌曲已到复查时间，将排在最后下载。")
+        unmatched_songs = fresh_songs + recheck_songs
+        if not unmatched_songs:
+            logger.info(f"任务 {task_id}: 所有未匹配歌曲都处于不可用冷却期，本次不创建下载会话。")
+            return 0
+
         logger.info(f"[DEBUG] DownloadService: 开始构建下载项目列表")
         download_items = [
             DownloadQueueItemCreate(
@@ -171,11 +281,12 @@ class DownloadService:
         loop = asyncio.get_running_loop()
         return await loop.run_in_executor(None, db_calls)
 
-    async def auto_download_missing(self, task_id: int) -> int:
+    async def auto_download_missing(self, task_id: int, songs: Optional[List[Dict[str, Any]]] = None) -> int:
         """
-        在一个同步任务完成后，自动下载所有缺失的歌曲。
+        在一个同步任务完成匹配后，自动下载所有缺失的歌曲。
         只有在该任务和全局都启用了自动下载时才会触发。
         :param task_id: 同步任务的 ID
+        :param songs: 可选，本次匹配确定缺失的歌曲，默认读取任务的未匹配歌曲
         :return: 创建的下载会话 ID，如果没有创建则返回 0
         """
         logger.info(f"任务 {task_id}: 检查是否需要自动下载。")
@@ -187,7 +298,7 @@ class DownloadService:
             # 在新线程中，我们需要确保数据库操作使用正确的会话
             db = get_db_connection()
             try:
-                return await self.download_all_missing(task_id, db=db)
+                return await self.download_all_missing(task_id, db=db, songs=songs)
             finally:
                 db.close()
         else:
@@ -229,10 +340,7 @@ class DownloadService:
                 # 否则搜索所有平台
                 platforms_to_search = self.downloader.platform_service.get_platforms_to_search()
             
-            all_results = []
-            
-            # 遍历所有平台进行搜索
-            for plat in platforms_to_search:
+            async def _search_on_platform(plat: str) -> List[SearchResultItem]:
                 try:
                     logger.info(f"在平台 '{plat}' 上搜索关键词: '{keyword}'")
                     # 调用更新后的 search_platform 方法
@@ -245,6 +353,7 @@ class DownloadService:
                         songs_list = []
 
                     # 转换为SearchResultItem格式
+                    platform_results = []
                     for song in songs_list:
                         result_item = SearchResultItem(
                             song_id=str(song.get('id') or song.get('mid', '')),
@@ -256,9 +365,10 @@ class DownloadService:
                             quality=song.get('quality'),
                             score=None
                         )
-                        all_results.append(result_item)
+                        platform_results.append(result_item)
 
                     logger.info(f"在平台 '{plat}' 上找到 {len(songs_list)} 首歌曲")
+                    return platform_results
 
                 except Exception as e:
                     logger.error(f"在平台 '{plat}' 上搜索时出错: {e}")
@@ -270,7 +380,11 @@ class DownloadService:
                         logger.error(f"重试错误详情: {e}")
                         if hasattr(e, 'last_attempt') and e.last_attempt:
                             logger.error(f"最后一次尝试的异常: {e.last_attempt.exception()}")
-                    continue
+                    return []
+
+            # 并发搜索所有平台，结果仍按平台优先级顺序合并
+            per_platform_results = await asyncio.gather(*(_search_on_platform(plat) for plat in platforms_to_search))
+            all_results = [result for results in per_platform_results for result in results]
             
             # 如果没有结果，返回空结果
             if not all_results:
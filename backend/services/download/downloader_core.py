@@ -1,47 +1,85 @@
 """音乐下载器核心模块"""
 
 import asyncio
-import os
 import re
 import json
 from pathlib import Path
 from typing import Optional, Tuple, Dict, Any, List
 import httpx
 import tenacity
-from tenacity import retry, stop_after_attempt, wait_exponential
+from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_not_exception_type
 
+from core.http_client import http_clients
 from schemas.download import DownloadQueueItem
 import logging
 
 # Import services
 from services.download.metadata_handler import MetadataHandler
 from services.download.platform_service import PlatformService
-from services.download.quality_checker import QualityChecker
 from services.download.qq_music_service import QQMusicService
-from services.download.download_constants import QUALITY_ORDER, API_VALIDATION_TITLE_THRESHOLD, API_VALIDATION_ARTIST_THRESHOLD
-from services.download.download_exceptions import APIError
+from services.download.download_constants import QUALITY_ORDER, API_VALIDATION_TITLE_THRESHOLD, API_VALIDATION_ARTIST_THRESHOLD, DEFAULT_DOWNLOAD_CHUNK_SIZE_KB, RESUME_CHECKPOINT_BYTES, PART_FILE_SUFFIX, SEARCH_CACHE_TTL_SECONDS, SONG_URL_CACHE_TTL_SECONDS, LYRICS_CACHE_TTL_SECONDS
+from services.download.download_exceptions import APIError, SongUnavailableError, LowQualityStreamError
+from services.download.quality_checker import QualityChecker
+from services.download.stream_probe import DurationProbe
+from services.download.download_db_service import download_db_service
+from services.download.bandwidth_limiter import bandwidth_limiter
+from services.download.request_governor import request_governor, parse_retry_after
+from services.download.response_cache import response_cache, signed_url_ttl
+from services.download.local_catalog import local_catalog_service
+from services.download.cover_cache import cover_cache
+from services.download.post_processor import post_processor
+from services.download.part_file import AsyncFileWriter, part_path_for, commit_part_file, discard_part_file, prepare_resume, allocate_part_file
+from schemas.download_schemas import DownloadSettings
+from utils.background_tasks import BackgroundTasks
 
 # 添加模糊匹配库
 from thefuzz import fuzz
 
 logger = logging.getLogger(__name__)
 
+def _is_transient_status(status_code: Optional[int]) -> bool:
+    """限流（429）和服务端错误（5xx）属于暂时性错误，值得退避后重试"""
+    return status_code is not None and (status_code == 429 or 500 <= status_code < 600)
+
+
 class MusicDownloader:
     """
     一个用于与 api.vkeys.cn 交互的音乐下载器核心。
     """
     def __init__(self):
         self.base_url = "https://api.vkeys.cn"
-        # 使用 httpx.AsyncClient 替代 requests，配置允许重定向
-        self.http_client = httpx.AsyncClient(
-            timeout=30.0,
-            follow_redirects=True,  # 明确启用重定向跟随
-            max_redirects=5  # 设置最大重定向次数
-        )
+        self.chunk_size = DEFAULT_DOWNLOAD_CHUNK_SIZE_KB * 1024
+        # 分段并行下载（默认关闭，由 configure() 根据下载设置开启）
+        self.segmented_enabled = False
+        self.segmented_min_bytes = 0
+        self.segments_per_file = 1
+        self._max_concurrent_segments = 0
+        self._segment_semaphore: Optional[asyncio.Semaphore] = None
+        self._background_tasks = BackgroundTasks()
+
+    def configure(self, settings: DownloadSettings):
+        """根据最新的下载设置调整传输参数"""
+        self.chunk_size = settings.download_chunk_size_kb * 1024
+        self.segmented_enabled = settings.segmented_download_enabled
+        self.segmented_min_bytes = settings.segmented_min_size_mb * 1024 * 1024
+        self.segments_per_file = settings.segments_per_file
+        if settings.max_concurrent_segments != self._max_concurrent_segments:
+            # 信号量无法调整容量，上限变化时重新创建（进行中的分段仍使用旧信号量直至完成）
+            self._max_concurrent_segments = settings.max_concurrent_segments
+            self._segment_semaphore = asyncio.Semaphore(settings.max_concurrent_segments)
+        bandwidth_limiter.configure(settings.bandwidth_limit_kbps, settings.bandwidth_schedules)
+        cover_cache.configure(settings.cover_max_dimension_px)
+        post_processor.configure(settings.post_process_mode, settings.post_process_workers)
+
+    @property
+    def http_client(self) -> httpx.AsyncClient:
+        """应用级共享的下载客户端（跟随重定向，连接池由 HttpClientRegistry 管理）"""
+        return http_clients.get('downloader')
 
     async def close(self):
-        """关闭HTTP客户端"""
-        await self.http_client.aclose()
+        """等待后台歌词请求结束并关闭后处理执行器；共享的 HTTP 客户端由应用在关闭时统一关闭"""
+        await self._background_tasks.wait()
+        post_processor.shutdown()
 
     def _format_lrc_time(self, time_val) -> str:
         """
@@ -62,8 +100,18 @@ class MusicDownloader:
         except (ValueError, TypeError):
             return f"[{time_val}]"
 
+    @staticmethod
+    def _is_unknown_error_response(response: httpx.Response) -> bool:
+        """API 在过载时常以 '未知异常' 作为错误消息返回"""
+        try:
+            body = response.json()
+        except ValueError:
+            return False
+        return isinstance(body, dict) and body.get('code') != 200 and "未知异常" in str(body.get('message', ''))
+
     @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=6),
-           retry=tenacity.retry_if_exception_type((httpx.RequestError, httpx.HTTPStatusError, ValueError)))
+           retry=(tenacity.retry_if_exception_type((httpx.RequestError, httpx.HTTPStatusError, ValueError))
+                  | tenacity.retry_if_exception(lambda e: isinstance(e, APIError) and _is_transient_status(e.status_code))))
     async def _request(self, method: str, endpoint: str, params: dict = None, data: dict = None) -> dict:
         """
         一个私有的方法，用于发送 HTTP 请求。
@@ -74,12 +122,23 @@ class MusicDownloader:
             all_params.update(params)
 
         try:
-            if method.upper() == 'GET':
-                response = await self.http_client.get(url, params=all_params)
-            elif method.upper() == 'POST':
-                response = await self.http_client.post(url, params=all_params, data=data)
-            else:
-                raise ValueError(f"不支持的 HTTP 方法: {method}")
+            # 通过按主机的并发调度器发出请求，服务器过载时自动降低并发并遵守 Retry-After
+            async with request_governor.slot(url) as slot:
+                try:
+                    if method.upper() == 'GET':
+                        response = await self.http_client.get(url, params=all_params)
+                    elif method.upper() == 'POST':
+                        response = await self.http_client.post(url, params=all_params, data=data)
+                    else:
+                        raise ValueError(f"不支持的 HTTP 方法: {method}")
+                except httpx.TimeoutException:
+                    slot.mark_overloaded()
+                    raise
+
+                if _is_transient_status(response.status_code):
+                    slot.mark_overloaded(parse_retry_after(response.headers.get('retry-after')))
+                elif self._is_unknown_error_response(response):
+                    slot.mark_overloaded()
 
             response.raise_for_status()
             
@@ -165,9 +224,15 @@ class MusicDownloader:
         params = {"word": text, "page": page, "num": size}
         logger.debug(f"开始搜索 - 平台: {platform}, 关键词: '{text}', 页码: {page}, 大小: {size}")
         logger.debug(f"请求端点: {endpoint}, 参数: {params}")
+        cached = await response_cache.get('search', platform, text, page, size)
+        if cached is not None:
+            logger.debug(f"搜索命中缓存 - 平台: {platform}, 关键词: '{text}'")
+            return cached
         try:
             result = await self._request("GET", endpoint, params=params)
             logger.debug(f"搜索成功 - 平台: {platform}, 结果: {result}")
+            if result.get('code') == 200 and isinstance(result.get('data'), list):
+                await response_cache.set('search', (platform, text, page, size), result, SEARCH_CACHE_TTL_SECONDS)
             return result
         except APIError as e:
             logger.error(f"API错误 - 平台: {platform}, 关键词: '{text}', 错误: {e}")
@@ -197,10 +262,21 @@ class MusicDownloader:
             quality_mapping = {'无损': 5, '高品': 3, '标准': 1}
             params['quality'] = quality_mapping.get(quality, 5)  # 默认最高音质
         
+        cached = await response_cache.get('song_url', platform, music_id, quality)
+        if cached is not None:
+            logger.debug(f"歌曲URL命中缓存 - 平台: {platform}, 音乐ID: {music_id}, 音质: {quality}")
+            return cached
+
         # 新API的点歌模式似乎总会返回详细信息，因此 info 参数可能不再需要
         # 但我们仍然可以保留它，以备将来使用
         try:
-            return await self._request("GET", endpoint, params=params)
+            result = await self._request("GET", endpoint, params=params)
+            data = result.get('data')
+            if result.get('code') == 200 and isinstance(data, dict) and data.get('url'):
+                # 下载链接通常带签名，缓存时间不能超过链接本身的有效期
+                ttl = signed_url_ttl(data['url'], SONG_URL_CACHE_TTL_SECONDS)
+                await response_cache.set('song_url', (platform, music_id, quality), result, ttl)
+            return result
         except APIError as e:
             logger.error(f"获取歌曲URL失败 - 平台: {platform}, 音乐ID: {music_id}, 错误: {e}")
             # 如果是API错误，返回空结果而不是抛出异常
@@ -238,6 +314,12 @@ class MusicDownloader:
                 session_logger.warning(f"不支持的平台: {platform}，无法获取歌词")
                 return None
             
+            cached = await response_cache.get('lyrics', platform, song_id)
+            if cached is not None:
+                session_logger.info("歌词命中缓存")
+                # 空字符串表示此前已确认该歌曲没有歌词
+                return cached or None
+
             session_logger.info(f"正在获取 {platform} 平台歌曲 ID {song_id} 的歌词...")
             
             # 调用现有的 _request() 方法发送 GET 请求
@@ -252,9 +334,12 @@ class MusicDownloader:
                 
                 if lrc_content:
                     session_logger.info("歌词获取成功")
+                    await response_cache.set('lyrics', (platform, song_id), lrc_content, LYRICS_CACHE_TTL_SECONDS)
                     return lrc_content
                 else:
                     session_logger.warning(f"API 响应中未找到歌词内容。返回的数据: {data}")
+                    # 同样缓存“没有歌词”的结果，重试时不再重复请求
+                    await response_cache.set('lyrics', (platform, song_id), "", LYRICS_CACHE_TTL_SECONDS)
                     return None
             else:
                 session_logger.warning(f"获取歌词失败，API 返回错误: {response.get('message', '未知错误')}")
@@ -271,6 +356,242 @@ class MusicDownloader:
             session_logger.debug(f"未知错误详情 - 平台: {platform}, 歌曲ID: {song_id}, 错误: {str(e)}")
             return None
 
+    @staticmethod
+    def _resume_validator(response: httpx.Response) -> Optional[str]:
+        """提取可用于 If-Range 的校验标识：优先使用强 ETag，其次 Last-Modified。"""
+        etag = response.headers.get('etag')
+        if etag and not etag.startswith('W/'):
+            return etag
+        return response.headers.get('last-modified')
+
+    @staticmethod
+    def _content_range_start(response: httpx.Response) -> Optional[int]:
+        """解析 206 响应 Content-Range 头中的起始偏移量"""
+        match = re.match(r'bytes\s+(\d+)-', response.headers.get('content-range', ''))
+        return int(match.group(1)) if match else None
+
+    async def _save_resume_state(self, item: DownloadQueueItem, part_filepath: Path, bytes_received: int,
+                                 total_bytes: Optional[int], validator: Optional[str], log: logging.Logger):
+        try:
+            await asyncio.to_thread(download_db_service.save_partial_download, item.id, str(part_filepath),
+                                    bytes_received, total_bytes, validator)
+        except Exception as e:
+            log.warning(f"保存断点续传状态失败: {e}")
+
+    async def _clear_resume_state(self, item: DownloadQueueItem, log: logging.Logger):
+        try:
+            await asyncio.to_thread(download_db_service.clear_partial_download, item.id)
+        except Exception as e:
+            log.warning(f"清除断点续传状态失败: {e}")
+
+    @staticmethod
+    def _real_suffix(part_filepath: Path) -> str:
+        """临时文件 'a.flac.part' 对应的真实扩展名 '.flac'"""
+        return Path(part_filepath.name[:-len(PART_FILE_SUFFIX)]).suffix
+
+    async def _iter_chunks(self, response: httpx.Response):
+        """按配置的块大小读取响应体，并在每块之后接受全局限速"""
+        async for chunk in response.aiter_bytes(chunk_size=self.chunk_size):
+            await bandwidth_limiter.throttle(len(chunk))
+            yield chunk
+
+    def _can_segment(self, response: httpx.Response, total_bytes: Optional[int], validator: Optional[str]) -> bool:
+        """判断当前响应是否满足分段下载条件：已开启、服务器支持 Range 且文件足够大"""
+        return (
+            self.segmented_enabled
+            and self._segment_semaphore is not None
+            and validator is not None
+            and response.headers.get('accept-ranges', '').lower() == 'bytes'
+            and total_bytes is not None
+            and total_bytes >= self.segmented_min_bytes
+        )
+
+    async def _download_segment(self, song_url: str, part_filepath: Path, start: int, end: int, validator: str):
+        """下载 [start, end] 字节范围并写入临时文件的对应位置"""
+        async with self._segment_semaphore:
+            headers = {'Range': f"bytes={start}-{end}", 'If-Range': validator}
+            async with self.http_client.stream("GET", song_url, headers=headers, timeout=180.0) as response:
+                response.raise_for_status()
+                if response.status_code != 206 or self._content_range_start(response) != start:
+                    raise APIError("服务器未按请求返回分段数据，文件可能已发生变化。")
+
+                expected = end - start + 1
+                writer = await AsyncFileWriter(part_filepath, 'r+b', offset=start).open()
+                try:
+                    async for chunk in self._iter_chunks(response):
+                        if writer.bytes_written + len(chunk) > expected:
+                            raise APIError(f"分段 {start}-{end} 返回的数据超出请求范围。")
+                        await writer.write(chunk)
+                finally:
+                    # 提交临时文件时会统一 fsync，这里无需逐段刷写
+                    await writer.close(fsync=False)
+
+                if writer.bytes_written != expected:
+                    raise APIError(f"分段 {start}-{end} 数据不完整（{writer.bytes_written}/{expected} 字节）。")
+
+    async def _download_segmented(self, song_url: str, part_filepath: Path, total_bytes: int,
+                                  validator: str, log: logging.Logger) -> int:
+        """将文件按字节范围拆分为多个分段并发下载，写入预先分配好大小的临时文件"""
+        segment_size = -(-total_bytes // self.segments_per_file)
+        ranges = [(start, min(start + segment_size, total_bytes) - 1) for start in range(0, total_bytes, segment_size)]
+        log.info(f"文件大小 {total_bytes} 字节，启用分段并行下载（{len(ranges)} 个分段）。")
+
+        await allocate_part_file(part_filepath, total_bytes)
+        tasks = [
+            asyncio.create_task(self._download_segment(song_url, part_filepath, start, end, validator))
+            for start, end in ranges
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            # 任一分段失败时取消其余分段
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+        log.info(f"分段下载完成，共 {total_bytes} 字节。")
+        return total_bytes
+
+    async def _stream_to_part_file(self, item: DownloadQueueItem, song_url: str, part_filepath: Path,
+                                   log: logging.Logger, allow_segmented: bool = True) -> int:
+        """
+        将歌曲流式写入临时文件，支持基于 HTTP Range 的断点续传。
+        传输中断时保留临时文件并记录进度，下次重试只需下载缺失的部分。返回文件总字节数。
+        """
+        resume_from = 0
+        validator = None
+        state = await asyncio.to_thread(download_db_service.get_partial_download, item.id)
+        if state:
+            if state['partial_path'] == str(part_filepath) and state['resume_validator']:
+                resume_from = await prepare_resume(part_filepath, state['bytes_received'])
+                validator = state['resume_validator']
+            elif state['partial_path'] != str(part_filepath):
+                # 目标文件已经变化（例如换了平台或音质），旧的临时文件不再可用
+                await discard_part_file(Path(state['partial_path']))
+
+        headers = {}
+        if resume_from > 0:
+            headers['Range'] = f"bytes={resume_from}-"
+            headers['If-Range'] = validator
+            log.info(f"发现未完成的下载，尝试从第 {resume_from} 字节处续传...")
+
+        writer = None
+        resumable = False
+        segmented = False
+        total_bytes = None
+        quality_checker = QualityChecker()
+        try:
+            # 使用GET请求下载文件，httpx会自动处理重定向
+            async with self.http_client.stream("GET", song_url, headers=headers, timeout=180.0) as response:
+                if response.status_code in (301, 302, 303, 307, 308):
+                    log.info(f"收到重定向响应 {response.status_code}，httpx将自动跟随重定向...")
+
+                if response.status_code == 416 and resume_from > 0:
+                    # 记录的偏移量已超出文件范围，放弃续传
+                    log.info("服务器拒绝了续传范围，将从头开始下载。")
+                    resume_from = 0
+                else:
+                    response.raise_for_status()
+                    if resume_from > 0 and response.status_code == 206 and self._content_range_start(response) == resume_from:
+                        mode = 'ab'
+                        log.info("服务器支持断点续传，继续下载剩余部分。")
+                    else:
+                        if resume_from > 0:
+                            log.info("服务器未接受续传请求（文件可能已变化），将从头开始下载。")
+                        resume_from = 0
+                        mode = 'wb'
+                        validator = None
+
+                    validator = self._resume_validator(response) or validator
+                    resumable = validator is not None and response.headers.get('accept-ranges', '').lower() != 'none'
+                    content_length = response.headers.get('content-length', '')
+                    total_bytes = resume_from + int(content_length) if content_length.isdigit() else None
+
+                    # 预检：根据 Content-Length 判断文件过小时不读取响应体
+                    if total_bytes is not None and not quality_checker.check_file_size(str(part_filepath), total_bytes, log):
+                        raise LowQualityStreamError("文件大小低于阈值，已在下载前中止。")
+
+                    if mode == 'wb' and allow_segmented and self._can_segment(response, total_bytes, validator):
+                        # 不读取当前响应体，改为按字节范围分段并行下载
+                        segmented = True
+                    else:
+                        writer = await AsyncFileWriter(part_filepath, mode).open()
+                        next_checkpoint = RESUME_CHECKPOINT_BYTES
+                        # 从头下载时解析开头数据中的时长，确定过短后立即中止传输
+                        probe = DurationProbe(self._real_suffix(part_filepath), total_bytes) if mode == 'wb' else None
+                        try:
+                            async for chunk in self._iter_chunks(response):
+                                await writer.write(chunk)
+                                if probe is not None and not probe.done:
+                                    duration = probe.feed(chunk)
+                                    if duration is not None and not quality_checker.check_duration_seconds(str(part_filepath), duration, log):
+                                        raise LowQualityStreamError(f"音频时长仅 {duration:.0f} 秒，已在接收 {writer.bytes_written} 字节后中止下载。")
+                                if resumable and writer.bytes_written >= next_checkpoint:
+                                    next_checkpoint += RESUME_CHECKPOINT_BYTES
+                                    await self._save_resume_state(item, part_filepath, resume_from + writer.bytes_written,
+                                                                  total_bytes, validator, log)
+                        finally:
+                            await writer.close()
+        except BaseException as e:
+            if isinstance(e, LowQualityStreamError):
+                # 文件注定会被丢弃，不保留临时文件和续传进度
+                await discard_part_file(part_filepath)
+                await self._clear_resume_state(item, log)
+            elif writer is None and resume_from > 0:
+                # 续传请求本身失败，已有的临时文件和进度保持不变
+                pass
+            elif writer is not None and resumable and resume_from + writer.bytes_written > 0:
+                received = resume_from + writer.bytes_written
+                await self._save_resume_state(item, part_filepath, received, total_bytes, validator, log)
+                log.info(f"下载中断，已保留 {received} 字节的临时文件，下次重试时将断点续传。")
+            else:
+                await discard_part_file(part_filepath)
+                await self._clear_resume_state(item, log)
+            if isinstance(e, httpx.RequestError):
+                raise APIError(f"下载歌曲时出错: {e}")
+            if isinstance(e, IOError):
+                raise APIError(f"保存歌曲文件时出错: {e}")
+            raise
+
+        if segmented:
+            try:
+                return await self._download_segmented(song_url, part_filepath, total_bytes, validator, log)
+            except asyncio.CancelledError:
+                await discard_part_file(part_filepath)
+                raise
+            except (APIError, httpx.HTTPError, OSError) as e:
+                log.warning(f"分段下载失败: {e}。将改用单连接重新下载。")
+                await discard_part_file(part_filepath)
+                return await self._stream_to_part_file(item, song_url, part_filepath, log, allow_segmented=False)
+
+        if writer is None:
+            # 416：清除失效的进度后重新完整下载
+            await discard_part_file(part_filepath)
+            await self._clear_resume_state(item, log)
+            return await self._stream_to_part_file(item, song_url, part_filepath, log)
+
+        size = resume_from + writer.bytes_written
+        if resume_from > 0:
+            log.info(f"歌曲下载完成，共 {size} 字节（本次续传 {writer.bytes_written} 字节）。")
+        else:
+            log.info(f"歌曲下载完成，共 {size} 字节。")
+        return size
+
+    def _abandon_side_tasks(self, cover_task: Optional[asyncio.Task], lyrics_task: Optional[asyncio.Task],
+                            error: BaseException):
+        """
+        音频下载失败时处理并行任务：封面直接取消；歌词请求继续完成以写入缓存，
+        这样重试时无需再次请求（下载本身被取消时一并取消）。
+        """
+        if cover_task:
+            cover_task.cancel()
+        if lyrics_task:
+            if isinstance(error, asyncio.CancelledError):
+                lyrics_task.cancel()
+            elif not lyrics_task.done():
+                self._background_tasks.track(lyrics_task, '获取歌词')
+
     async def download_song(self, item: DownloadQueueItem, music_id: str, music_type: str,
                            download_dir: str, preferred_quality: str = '无损',
                            download_lyrics: bool = True, session_logger: Optional[logging.Logger] = None,
@@ -313,47 +634,56 @@ class MusicDownloader:
         download_path.mkdir(parents=True, exist_ok=True)
 
         song_filepath = download_path / f"{file_basename}.{file_format}"
+        # 先写入 .part 临时文件，全部处理完成后再原子重命名，避免 Plex 扫描到不完整的文件
+        part_filepath = part_path_for(song_filepath)
         log.info(f"选择音质: {actual_quality}。正在下载到: {song_filepath}")
 
+        # 封面与音频并行下载，使用同一个异步客户端的连接池
+        pic_url = MetadataHandler.resolve_cover_url(data, cover_url)
+        log.info(f"API返回的封面URL: {pic_url}")
+        cover_task = asyncio.create_task(cover_cache.get(pic_url, self.http_client, log)) if pic_url else None
+        # 歌词同样与音频并行获取，但只有音频通过质量检查后才写入 .lrc 文件
+        lyrics_task = asyncio.create_task(self.get_lyrics(music_type, music_id, log)) if download_lyrics else None
+
         try:
-            # 使用GET请求下载文件，httpx会自动处理重定向
-            async with self.http_client.stream("GET", song_url, timeout=180.0) as response:
-                if response.status_code in (301, 302, 303, 307, 308):
-                    log.info(f"收到重定向响应 {response.status_code}，httpx将自动跟随重定向...")
+            await self._stream_to_part_file(item, song_url, part_filepath, log)
+        except BaseException as e:
+            self._abandon_side_tasks(cover_task, lyrics_task, e)
+            if isinstance(e, httpx.HTTPStatusError):
+                # 链接可能已过期或失效，避免后续重试继续使用缓存中的旧链接
+                await response_cache.invalidate('song_url', music_type, music_id, preferred_quality)
+            raise
+
+        try:
+            cover_data = None
+            if cover_task:
+                try:
+                    cover_data = await cover_task
+                except Exception as e:
+                    log.warning(f"获取封面图片失败: {e}")
+
+            # 文件只打开一次：校验大小和时长、写入标签与封面、保存，在后处理线程池/进程池中完成
+            if not await post_processor.process(str(part_filepath), item, data, cover_data, log):
+                raise APIError(f"下载的文件 '{song_filepath}' 被标记为低质量或广告。")
+
+            await commit_part_file(part_filepath, song_filepath)
+        except BaseException as e:
+            self._abandon_side_tasks(cover_task, lyrics_task, e)
+            await discard_part_file(part_filepath)
+            log.info(f"已删除临时文件: {part_filepath}")
+            raise
+        finally:
+            await self._clear_resume_state(item, log)
+
+        try:
+            # 新文件写入后立即加入本地目录索引
+            await asyncio.to_thread(local_catalog_service.index_file, str(song_filepath))
+        except Exception as e:
+            log.warning(f"更新本地文件索引失败: {e}")
+
+        if lyrics_task:
+            lrc_content = await lyrics_task
 
-                response.raise_for_status()
-                with open(song_filepath, 'wb') as f:
-                    async for chunk in response.aiter_bytes(chunk_size=8192):
-                        f.write(chunk)
-            log.info("歌曲下载完成。")
-        except httpx.RequestError as e:
-            raise APIError(f"下载歌曲时出错: {e}")
-        except IOError as e:
-            raise APIError(f"保存歌曲文件时出错: {e}")
-
-        # 下载完成后，先进行低质量文件检测
-        quality_checker = QualityChecker()
-        if not quality_checker.is_file_acceptable(str(song_filepath), log):
-            try:
-                os.remove(str(song_filepath))
-                log.info(f"已删除低质量文件: {song_filepath}")
-            except OSError as e:
-                log.warning(f"删除低质量文件 '{song_filepath}' 时出错: {e}")
-            raise APIError(f"下载的文件 '{song_filepath}' 被标记为低质量或广告。")
-
-        # 文件质量合格，继续嵌入 ID3 标签
-        # 注意：我们需要确保 song_info_details 仍然可用或调整它
-        song_info_details = data  # 使用整个 data 字典作为 song_info_details
-        metadata_handler = MetadataHandler()
-        # 传递封面URL到metadata_handler
-        metadata_handler.embed_metadata(str(song_filepath), item, song_info_details, log, cover_url=cover_url)
-
-        if download_lyrics:
-            log.info("正在下载歌词...")
-            
-            # 调用 get_lyrics 方法获取歌词数据
-            lrc_content = await self.get_lyrics(music_type, music_id, log)
-            
             # 检查是否获取到歌词
             if lrc_content and lrc_content.strip():
                 # 创建与歌曲文件同名但扩展名为 .lrc 的文件路径
@@ -361,8 +691,7 @@ class MusicDownloader:
                 
                 try:
                     # 将获取到的歌词内容以 UTF-8 编码写入文件
-                    with open(lyrics_filepath, 'w', encoding='utf-8') as f:
-                        f.write(lrc_content)
+                    await asyncio.to_thread(lyrics_filepath.write_text, lrc_content, encoding='utf-8')
                     log.info(f"歌词下载成功并保存至 {lyrics_filepath}")
                 except IOError as e:
                     log.warning(f"保存歌词文件时出错: {e}")
@@ -381,7 +710,6 @@ class DownloaderCore:
         # 服务实例
         self.platform_service = PlatformService()
         self.qq_music_service = QQMusicService()
-        self.quality_checker = QualityChecker()
 
     def initialize(self, download_path: str):
         """初始化下载器，配置下载路径。"""
@@ -391,6 +719,34 @@ class DownloaderCore:
         Path(self.download_path).mkdir(parents=True, exist_ok=True)
         logger.info(f"下载器核心 (DownloaderCore) 初始化成功。下载路径: {self.download_path}")
 
+    async def close(self):
+        """应用关闭时释放下载器持有的资源"""
+        if self.downloader:
+            await self.downloader.close()
+
+    def apply_settings(self, settings: DownloadSettings):
+        """将最新的下载设置应用到下载器（每次下载前调用，使设置修改立即生效）。"""
+        if self.downloader:
+            self.downloader.configure(settings)
+
+    @staticmethod
+    def _needs_enrichment(item) -> bool:
+        return (not item.album or item.album == '未知专辑') and item.platform == 'qq' and bool(item.song_id)
+
+    async def prefetch_enrichment(self, items: List[Any], session_logger: Optional[logging.Logger] = None):
+        """
+        在项目进入下载阶段之前，批量获取需要补全信息的QQ音乐歌曲详情，
+        之后 _enrich_track_info 逐首补全时直接命中缓存。
+        """
+        log = session_logger or logger
+        song_ids = [item.song_id for item in items if self._needs_enrichment(item)]
+        if not song_ids:
+            return
+        try:
+            await self.qq_music_service.prefetch_song_details(song_ids, log)
+        except Exception as e:
+            log.warning(f"批量预取QQ音乐歌曲详情失败: {e}")
+
     async def _enrich_track_info(self, item: DownloadQueueItem, session_logger: logging.Logger) -> DownloadQueueItem:
         """
         补全歌曲信息（如果缺失）
@@ -399,7 +755,7 @@ class DownloaderCore:
         :return: 补全后的下载队列项
         """
         # 只有当信息缺失时才尝试补全
-        if (not item.album or item.album == '未知专辑') and item.platform == 'qq' and item.song_id:
+        if self._needs_enrichment(item):
             # QQ音乐的song_id格式是 "songid-songmid"
             parts = item.song_id.split('-', 1)
             if len(parts) == 2:
@@ -441,7 +797,43 @@ class DownloaderCore:
         # 如果不需要补全或补全失败，返回原始项
         return item
 
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10))
+    async def _search_platform_candidates(self, item: DownloadQueueItem, platform: str, search_term: str,
+                                          session_logger: logging.Logger) -> Optional[List[Dict[str, Any]]]:
+        """在单个平台上搜索并返回高匹配度（score > 70）的候选列表，搜索出错时返回 None。"""
+        try:
+            session_logger.info(f"正在平台 '{platform}' 上搜索 '{search_term}'...")
+            search_results = await self.downloader.search_platform(platform, search_term, 1, 10)
+            if not isinstance(search_results, dict) or search_results.get('code') != 200:
+                # search_platform 会把接口错误转换为非 200 的空结果，这里必须视为搜索失败而不是“无结果”
+                code = search_results.get('code') if isinstance(search_results, dict) else None
+                session_logger.warning(f"在平台 '{platform}' 上搜索失败（code={code}），本次结果不可信。")
+                return None
+
+            # 新API直接在 'data' 键下返回列表
+            songs_list = search_results.get('data', [])
+            if not isinstance(songs_list, list):
+                session_logger.warning(f"平台 '{platform}' 的API响应格式不符合预期（'data' 不是列表）。")
+                songs_list = []
+
+            if not songs_list:
+                return []
+            # 这里的 filter_and_score_candidates 可能需要根据新API的字段进行调整
+            # 我们假设它能处理 'song', 'singer', 'album' 等通用字段
+            # 并且能从候选对象中提取 'id' 或 'mid' 作为 song_id
+            candidates = self.platform_service.filter_and_score_candidates(item, songs_list, platform)
+            return [c for c in candidates if c['score'] > 70]
+        except APIError as e:
+            session_logger.warning(f"在平台 '{platform}' 上搜索时出错: {e}")
+        except Exception as e:
+            session_logger.warning(f"在平台 '{platform}' 上搜索时发生未知错误: {e}")
+        return None
+
+    @retry(
+        stop=stop_after_attempt(3),
+        wait=wait_exponential(multiplier=1, min=2, max=10),
+        # 歌曲确实不存在时重试没有意义，直接交给调用方记录为不可用
+        retry=retry_if_not_exception_type(SongUnavailableError)
+    )
     async def _find_song_id(self, item: DownloadQueueItem, session_logger: logging.Logger, 
                            exclude_platforms: Optional[List[str]] = None) -> Tuple[Optional[str], Optional[str], List[Dict[str, Any]]]:
         """使用歌曲信息搜索并返回最佳匹配的歌曲ID、平台和候选列表。"""
@@ -460,44 +852,35 @@ class DownloaderCore:
             exclude_platforms=[self.platform_service.map_platform_name(p) if p else p for p in exclude_platforms]
         )
         
-        # 遍历平台，逐一搜索
-        for platform in platforms_to_search:
-            try:
-                session_logger.info(f"正在平台 '{platform}' 上搜索 '{search_term}'...")
-                search_results = await self.downloader.search_platform(platform, search_term, 1, 10)
-
-                # 新API直接在 'data' 键下返回列表
-                songs_list = search_results.get('data', [])
-                if not isinstance(songs_list, list):
-                    session_logger.warning(f"平台 '{platform}' 的API响应格式不符合预期（'data' 不是列表）。")
-                    songs_list = []
-
-                if songs_list:
-                    # 这里的 filter_and_score_candidates 可能需要根据新API的字段进行调整
-                    # 我们假设它能处理 'song', 'singer', 'album' 等通用字段
-                    # 并且能从候选对象中提取 'id' 或 'mid' 作为 song_id
-                    candidates = self.platform_service.filter_and_score_candidates(item, songs_list, platform)
-
-                    # Filter candidates with score > 70 for this platform
-                    high_score_candidates = [c for c in candidates if c['score'] > 70]
-
-                    # 如果当前平台找到了高匹配度的候选结果，则返回这些结果
-                    if high_score_candidates:
-                        session_logger.info(f"在平台 '{platform}' 上找到 {len(high_score_candidates)} 个高匹配度候选结果。")
-                        best_candidate = high_score_candidates[0]
-                        session_logger.debug(f"返回平台 '{platform}' 的最佳候选: {best_candidate}")
-                        return best_candidate.get('song_id'), best_candidate.get('platform'), high_score_candidates
+        # 并发搜索所有平台，再按平台优先级依次取结果：
+        # 优先级最高的平台一旦给出高匹配度结果，立即取消其余平台的搜索
+        search_tasks = [
+            asyncio.create_task(self._search_platform_candidates(item, platform, search_term, session_logger))
+            for platform in platforms_to_search
+        ]
+        search_failed = False
+        try:
+            for platform, task in zip(platforms_to_search, search_tasks):
+                high_score_candidates = await task
+                if high_score_candidates is None:
+                    search_failed = True
+                    continue
+                # 如果当前平台找到了高匹配度的候选结果，则返回这些结果
+                if high_score_candidates:
+                    session_logger.info(f"在平台 '{platform}' 上找到 {len(high_score_candidates)} 个高匹配度候选结果。")
+                    best_candidate = high_score_candidates[0]
+                    session_logger.debug(f"返回平台 '{platform}' 的最佳候选: {best_candidate}")
+                    return best_candidate.get('song_id'), best_candidate.get('platform'), high_score_candidates
+        finally:
+            for task in search_tasks:
+                task.cancel()
 
-            except APIError as e:
-                session_logger.warning(f"在平台 '{platform}' 上搜索时出错: {e}")
-                continue
-            except Exception as e:
-                session_logger.warning(f"在平台 '{platform}' 上搜索时发生未知错误: {e}")
-                continue
-        
         session_logger.warning(f"在所有可用平台上都未能为 '{item.title}' 找到高匹配度的结果。")
         # 如果所有平台都搜索完毕仍未找到，则抛出异常
-        raise APIError(f"在所有平台上都未能找到 '{search_term}' 的高匹配度可下载版本。")
+        if search_failed:
+            # 部分平台搜索出错，结果不可信，不能据此判定歌曲不可用
+            raise APIError(f"在所有平台上都未能找到 '{search_term}' 的高匹配度可下载版本（部分平台搜索失败）。")
+        raise SongUnavailableError(f"在所有平台上都未能找到 '{search_term}' 的高匹配度可下载版本。")
 
     def _validate_api_response(self, music_info: dict, item: DownloadQueueItem) -> Tuple[bool, str]:
         """验证API响应与请求信息的一致性
@@ -624,23 +1007,10 @@ class DownloaderCore:
                             download_lyrics,
                             session_logger
                         )
-                        # Check if this file is acceptable (质量合格)
-                        if self.quality_checker.is_file_acceptable(file_path, session_logger):
-                            session_logger.info(f"下载成功且文件合格: {file_path}")
-                            return file_path
-                        else:
-                            # If not acceptable, delete the file
-                            try:
-                                os.remove(file_path)
-                                session_logger.info(f"已删除低质量文件: {file_path}")
-                            except OSError as remove_err:
-                                session_logger.warning(f"删除低质量文件 '{file_path}' 时出错: {remove_err}")
-                            
-                            # 将产生低质量文件的平台加入排除列表，以便下次搜索时跳过
-                            if platform not in failed_platforms:
-                                failed_platforms.append(platform)
-                            session_logger.info(f"来自平台 '{platform}' 的结果因质量不合格被排除，将继续搜索其他平台。")
-                            
+                        # download_song 已在提交文件前完成质量检查，低质量文件会以 APIError 抛出并在下方排除该平台
+                        session_logger.info(f"下载成功且文件合格: {file_path}")
+                        return file_path
+
                     except APIError as e:
                         # 特别处理"未知异常"错误
                         if "未知异常" in str(e):
@@ -654,6 +1024,13 @@ class DownloaderCore:
                             failed_platforms.append(platform)
                         # 继续循环，尝试下一个平台
                     
+                except tenacity.RetryError as retry_err:
+                    # _find_song_id 的重试次数用尽，取出原始异常，保留其类型（例如 SongUnavailableError）
+                    original_err = retry_err.last_attempt.exception()
+                    session_logger.error(f"下载 '{enriched_item.title}' 失败: {original_err}")
+                    if isinstance(original_err, APIError):
+                        raise original_err
+                    raise APIError(f"下载 '{enriched_item.title}' 时发生未知错误: {original_err}") from original_err
                 except APIError as e:
                     # 如果 _find_song_id 抛出异常，说明在所有剩余平台上都未能找到高匹配度结果
                     session_logger.error(f"下载 '{enriched_item.title}' 失败: {e}")
@@ -682,20 +1059,10 @@ class DownloaderCore:
                         download_lyrics,
                         session_logger
                     )
-                    # Check if this file is acceptable
-                    if self.quality_checker.is_file_acceptable(file_path, session_logger):
-                        session_logger.info(f"直接下载成功且文件合格: {file_path}")
-                        return file_path
-                    else:
-                        # If not acceptable, delete the file
-                        try:
-                            os.remove(file_path)
-                            session_logger.info(f"已删除低质量的直接下载文件: {file_path}")
-                        except OSError as remove_err:
-                            session_logger.warning(f"删除低质量直接下载文件 '{file_path}' 时出错: {remove_err}")
-                        # 如果初始ID下载得到的文件质量不合格，也应该失败
-                        raise APIError(f"使用初始ID下载的文件质量不合格。")
-                
+                    # 质量检查已在 download_song 中完成，不合格时会抛出 APIError
+                    session_logger.info(f"直接下载成功且文件合格: {file_path}")
+                    return file_path
+
                 except APIError as e:
                     session_logger.error(f"使用初始ID下载 '{enriched_item.title}' 失败: {e}")
                     raise e
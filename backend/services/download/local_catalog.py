@@ -0,0 +1,180 @@
+"""下载目录中已有音频文件的索引，用于在下载前跳过本地已存在的歌曲"""
+
+import asyncio
+import os
+import re
+import sqlite3
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from mutagen import File
+
+from core.database import get_db_connection
+from services.download.download_constants import AUDIO_FILE_EXTENSIONS, CATALOG_SCAN_WORKERS
+from services.download.unavailable_song_service import normalize_song_key
+
+logger = logging.getLogger(__name__)
+
+# 与下载器生成文件名时移除的字符保持一致
+_UNSAFE_FILENAME_CHARS = re.compile(r'[\\/*?:"<>|]')
+
+
+def _filename_key_for(title: str, artist: str) -> str:
+    """按下载器的命名规则（"艺术家 - 标题.扩展名"）计算文件名匹配键"""
+    return normalize_song_key(_UNSAFE_FILENAME_CHARS.sub("", title or ''), _UNSAFE_FILENAME_CHARS.sub("", artist or ''))
+
+
+def _filename_key_from_path(path: str) -> Optional[str]:
+    stem = Path(path).stem
+    if ' - ' not in stem:
+        return None
+    artist, title = stem.split(' - ', 1)
+    return normalize_song_key(title, artist)
+
+
+def _first_tag(tags: Any, name: str) -> Optional[str]:
+    value = tags.get(name) if tags else None
+    if isinstance(value, list):
+        value = value[0] if value else None
+    return str(value) if value else None
+
+
+def _read_file_entry(path: str, size: int, mtime: float) -> Dict[str, Any]:
+    """读取单个文件的时长和标签（在线程池中执行）"""
+    entry = {
+        'path': path, 'size': size, 'mtime': mtime, 'duration': None,
+        'title': None, 'artist': None, 'album': None,
+        'match_key': None, 'filename_key': _filename_key_from_path(path),
+    }
+    try:
+        audio = File(path, easy=True)
+        if audio is not None:
+            if audio.info and getattr(audio.info, 'length', None):
+                entry['duration'] = int(audio.info.length)
+            entry['title'] = _first_tag(audio.tags, 'title')
+            entry['artist'] = _first_tag(audio.tags, 'artist')
+            entry['album'] = _first_tag(audio.tags, 'album')
+    except Exception as e:
+        logger.debug(f"读取文件标签失败 '{path}': {e}")
+    if entry['title'] and entry['artist']:
+        entry['match_key'] = normalize_song_key(entry['title'], entry['artist'])
+    return entry
+
+
+class LocalCatalogService:
+    """
+    维护 local_files 表：记录下载目录中每个音频文件的路径、大小、时长和标签。
+    全量扫描只重新解析新增或发生变化的文件，下载完成时单独更新对应条目。
+    """
+
+    def __init__(self):
+        self._scan_lock: Optional[asyncio.Lock] = None
+
+    @staticmethod
+    def _list_audio_files(root: str) -> Dict[str, Tuple[int, float]]:
+        found = {}
+        for dirpath, _, filenames in os.walk(root):
+            for filename in filenames:
+                if not filename.lower().endswith(AUDIO_FILE_EXTENSIONS):
+                    continue
+                full_path = os.path.join(dirpath, filename)
+                try:
+                    stat = os.stat(full_path)
+                except OSError:
+                    continue
+                found[full_path] = (stat.st_size, stat.st_mtime)
+        return found
+
+    @staticmethod
+    def _load_index() -> Dict[str, Tuple[int, float]]:
+        conn = get_db_connection()
+        try:
+            rows = conn.execute("SELECT path, size, mtime FROM local_files").fetchall()
+            return {row['path']: (row['size'], row['mtime']) for row in rows}
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _save_entries(entries: List[Dict[str, Any]], removed_paths: List[str]):
+        conn = get_db_connection()
+        try:
+            conn.executemany(
+                """
+                INSERT INTO local_files (path, size, mtime, duration, title, artist, album, match_key, filename_key, indexed_at)
+                VALUES (:path, :size, :mtime, :duration, :title, :artist, :album, :match_key, :filename_key, CURRENT_TIMESTAMP)
+                ON CONFLICT(path) DO UPDATE SET
+                    size = excluded.size, mtime = excluded.mtime, duration = excluded.duration,
+                    title = excluded.title, artist = excluded.artist, album = excluded.album,
+                    match_key = excluded.match_key, filename_key = excluded.filename_key,
+                    indexed_at = CURRENT_TIMESTAMP
+                """,
+                entries
+            )
+            conn.executemany("DELETE FROM local_files WHERE path = ?", [(path,) for path in removed_paths])
+            conn.commit()
+        finally:
+            conn.close()
+
+    async def scan(self, root: str) -> Dict[str, int]:
+        """增量扫描下载目录：并行读取新增/变化文件的标签，并移除已不存在的文件。"""
+        if self._scan_lock is None:
+            self._scan_lock = asyncio.Lock()
+        async with self._scan_lock:
+            loop = asyncio.get_running_loop()
+            on_disk, indexed = await asyncio.gather(
+                asyncio.to_thread(self._list_audio_files, root),
+                asyncio.to_thread(self._load_index)
+            )
+            changed = [(path, size, mtime) for path, (size, mtime) in on_disk.items() if indexed.get(path) != (size, mtime)]
+            removed = [path for path in indexed if path not in on_disk]
+
+            with ThreadPoolExecutor(max_workers=CATALOG_SCAN_WORKERS) as executor:
+                entries = await asyncio.gather(*(
+                    loop.run_in_executor(executor, _read_file_entry, path, size, mtime)
+                    for path, size, mtime in changed
+                ))
+            await asyncio.to_thread(self._save_entries, list(entries), removed)
+
+            logger.info(f"下载目录索引完成：共 {len(on_disk)} 个音频文件，更新 {len(changed)} 个，移除 {len(removed)} 个。")
+            return {'total': len(on_disk), 'updated': len(changed), 'removed': len(removed)}
+
+    def index_file(self, path: str):
+        """新文件写入后立即更新其索引条目（同步方法，应在线程池中调用）"""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return
+        self._save_entries([_read_file_entry(path, stat.st_size, stat.st_mtime)], [])
+
+    def find_existing(self, songs: List[Dict[str, Any]]) -> List[Tuple[Dict[str, Any], Optional[str]]]:
+        """
+        为每首歌查找下载目录中已存在的文件，返回 (歌曲, 文件路径或 None) 列表。
+        先按标签匹配，再按下载器的文件命名规则匹配。
+        """
+        def _find(conn: sqlite3.Connection):
+            by_match_key: Dict[str, str] = {}
+            by_filename_key: Dict[str, str] = {}
+            for row in conn.execute("SELECT path, match_key, filename_key FROM local_files").fetchall():
+                if row['match_key']:
+                    by_match_key.setdefault(row['match_key'], row['path'])
+                if row['filename_key']:
+                    by_filename_key.setdefault(row['filename_key'], row['path'])
+
+            results = []
+            for song in songs:
+                title, artist = song.get('title'), song.get('artist')
+                path = by_match_key.get(normalize_song_key(title, artist)) or by_filename_key.get(_filename_key_for(title, artist))
+                # 索引可能落后于磁盘，确认文件仍然存在
+                results.append((song, path if path and os.path.exists(path) else None))
+            return results
+
+        conn = get_db_connection()
+        try:
+            return _find(conn)
+        finally:
+            conn.close()
+
+
+local_catalog_service = LocalCatalogService()
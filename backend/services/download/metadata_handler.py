@@ -1,13 +1,12 @@
 """音频文件元数据处理服务"""
 
 import logging
-import requests
 from pathlib import Path
 from typing import Dict, Any, Optional
 from mutagen.id3 import ID3, TIT2, TPE1, TALB, APIC
-from mutagen import File
 from mutagen.flac import Picture, FLAC
 from mutagen.mp3 import MP3
+from mutagen.mp4 import MP4, MP4Cover
 
 from schemas.download import DownloadQueueItem
 
@@ -16,15 +15,24 @@ logger = logging.getLogger(__name__)
 class MetadataHandler:
     """处理音频文件的元数据嵌入"""
     
-    def embed_metadata(self, file_path: str, item: DownloadQueueItem, 
-                      song_api_info: dict, log: logging.Logger, cover_url: Optional[str] = None):
+    @staticmethod
+    def resolve_cover_url(song_api_info: dict, cover_url: Optional[str] = None) -> Optional[str]:
+        """确定封面URL：优先使用直接传入的 cover_url，其次是 API 响应中的 'cover'，最后是 'pic'"""
+        if cover_url:
+            return cover_url
+        if not song_api_info:
+            return None
+        return song_api_info.get('cover') or song_api_info.get('pic')
+
+    def apply_metadata(self, audio, item: DownloadQueueItem, song_api_info: dict,
+                       log: logging.Logger, cover_data: Optional[bytes] = None):
         """
-        将元数据和封面图片嵌入到音频文件中。
+        将元数据和封面写入已加载的 mutagen 对象，不保存文件，由调用方统一保存一次。
         """
-        log.info(f"开始为文件 '{Path(file_path).name}' 嵌入元数据...")
+        log.info(f"开始为文件 '{Path(audio.filename).name}' 嵌入元数据...")
         try:
-            self._embed_basic_metadata(file_path, item, song_api_info, log)
-            self._embed_cover_art(file_path, song_api_info, log, cover_url=cover_url)
+            self._embed_basic_metadata(audio, item, song_api_info, log)
+            self._embed_cover_art(audio, cover_data, log)
             log.info("元数据处理流程完成。")
         except Exception as e:
             log.error(f"嵌入元数据时发生未知错误: {e}", exc_info=True)
@@ -46,14 +54,9 @@ class MetadataHandler:
                 return str_value
         return None
 
-    def _embed_basic_metadata(self, file_path: str, item: DownloadQueueItem,
+    def _embed_basic_metadata(self, audio, item: DownloadQueueItem,
                              song_api_info: dict, log: logging.Logger):
         """嵌入基础元数据（标题、艺术家、专辑）"""
-        audio = File(file_path, easy=True)
-        if audio is None:
-            log.error("Mutagen无法加载音频文件，可能是不支持的格式或文件已损坏。")
-            raise ValueError("无法加载音频文件，可能是不支持的格式。")
-
         # 处理元数据值
         title = self._extract_string_value(song_api_info.get('name')) or \
                 self._extract_string_value(item.title) or ""
@@ -62,57 +65,48 @@ class MetadataHandler:
         album = self._extract_string_value(song_api_info.get('album')) or \
                 self._extract_string_value(item.album) or "未知专辑"
 
-        audio['title'] = title
-        audio['artist'] = artist
-        audio['album'] = album
-        
-        log.info(f"基础元数据待写入: Title='{audio['title']}', Artist='{audio['artist']}', Album='{audio['album']}'")
-        audio.save()
-        log.info("基础元数据写入成功。")
-
-    def _embed_cover_art(self, file_path: str, song_api_info: dict, log: logging.Logger, cover_url: Optional[str] = None):
+        if audio.tags is None:
+            audio.add_tags()
+
+        # 文件只打开一次（非 easy 模式），因此按格式写入各自的标签键
+        if isinstance(audio, MP3):
+            audio.tags.setall('TIT2', [TIT2(encoding=3, text=title)])
+            audio.tags.setall('TPE1', [TPE1(encoding=3, text=artist)])
+            audio.tags.setall('TALB', [TALB(encoding=3, text=album)])
+        elif isinstance(audio, MP4):
+            audio.tags['\xa9nam'] = [title]
+            audio.tags['\xa9ART'] = [artist]
+            audio.tags['\xa9alb'] = [album]
+        else:
+            # FLAC / Ogg Vorbis 使用 Vorbis Comment
+            audio.tags['title'] = title
+            audio.tags['artist'] = artist
+            audio.tags['album'] = album
+
+        log.info(f"基础元数据待写入: Title='{title}', Artist='{artist}', Album='{album}'")
+
+    def _embed_cover_art(self, audio, cover_data: Optional[bytes], log: logging.Logger):
         """嵌入封面图片"""
-        audio = File(file_path)
-        
-        # 优先使用直接传入的cover_url参数
-        pic_url = cover_url
-        
-        # 如果cover_url为空，则尝试从song_api_info中获取
-        if not pic_url:
-            # 新API使用'cover'字段，作为后备尝试'pic'字段
-            pic_url = song_api_info.get('cover') if song_api_info else None
-        if not pic_url:
-            pic_url = song_api_info.get('pic') if song_api_info else None
-            
-        log.info(f"API返回的封面URL: {pic_url}")
-
-        if not pic_url:
-            log.info("未找到有效的封面图片URL，跳过封面嵌入。")
+        if not cover_data:
+            log.info("没有可用的封面图片数据，跳过封面嵌入。")
             return
 
-        log.info(f"正在从 {pic_url} 下载封面图片...")
         try:
-            cover_response = requests.get(pic_url, timeout=15)
-            cover_response.raise_for_status()
-            cover_data = cover_response.content
-            log.info(f"封面图片下载成功，大小: {len(cover_data)} bytes。")
-
             if isinstance(audio, FLAC):
                 log.info("检测到FLAC文件，使用 add_picture 方法。")
                 self._embed_flac_cover(audio, cover_data, log)
             elif isinstance(audio, MP3):
                 log.info("检测到MP3文件，使用 APIC 帧。")
                 self._embed_mp3_cover(audio, cover_data, log)
+            elif isinstance(audio, MP4):
+                log.info("检测到MP4文件，使用 covr 标签。")
+                audio.tags['covr'] = [MP4Cover(cover_data, imageformat=MP4Cover.FORMAT_JPEG)]
             else:
                 log.warning(f"文件类型 {type(audio)} 可能不支持封面嵌入，将尝试使用APIC。")
                 self._embed_generic_cover(audio, cover_data, log)
 
-            log.info("封面数据帧创建成功，准备保存。")
-            audio.save()
-            log.info("封面图片嵌入并保存成功。")
+            log.info("封面数据帧创建成功。")
 
-        except requests.exceptions.RequestException as e:
-            log.warning(f"下载封面图片失败: {e}")
         except Exception as e_mutagen_apic:
             log.error(f"使用Mutagen嵌入封面时出错: {e_mutagen_apic}", exc_info=True)
 
@@ -0,0 +1,147 @@
+"""下载临时文件（.part）的异步写入与原子提交"""
+
+import asyncio
+import os
+from pathlib import Path
+from typing import Optional, BinaryIO
+
+from mutagen import File
+from mutagen.flac import FLAC
+from mutagen.mp3 import MP3, EasyMP3
+from mutagen.mp4 import MP4
+from mutagen.easymp4 import EasyMP4
+from mutagen.oggvorbis import OggVorbis
+
+from services.download.download_constants import PART_FILE_SUFFIX
+
+# .part 文件无法通过扩展名识别格式，按真实扩展名显式选择 mutagen 类型
+_AUDIO_TYPES = {'.flac': FLAC, '.mp3': MP3, '.m4a': MP4, '.mp4': MP4, '.ogg': OggVorbis}
+_EASY_AUDIO_TYPES = {'.flac': FLAC, '.mp3': EasyMP3, '.m4a': EasyMP4, '.mp4': EasyMP4, '.ogg': OggVorbis}
+
+
+def part_path_for(final_path: Path) -> Path:
+    """返回最终文件对应的临时文件路径，例如 'a.flac' -> 'a.flac.part'。"""
+    return final_path.with_name(final_path.name + PART_FILE_SUFFIX)
+
+
+def load_audio(file_path: str, easy: bool = False):
+    """
+    加载音频文件，兼容 .part 临时文件。
+    对于 .part 文件，根据去掉后缀后的真实扩展名选择解析器。
+    """
+    if not file_path.endswith(PART_FILE_SUFFIX):
+        return File(file_path, easy=easy)
+
+    real_suffix = Path(file_path[:-len(PART_FILE_SUFFIX)]).suffix.lower()
+    audio_type = (_EASY_AUDIO_TYPES if easy else _AUDIO_TYPES).get(real_suffix)
+    if audio_type is None:
+        return File(file_path, easy=easy)
+    return audio_type(file_path)
+
+
+class AsyncFileWriter:
+    """
+    将阻塞的磁盘写入转移到线程池执行的文件写入器，避免阻塞事件循环。
+    """
+
+    def __init__(self, path: Path, mode: str = 'wb', offset: int = 0):
+        self.path = path
+        self.mode = mode
+        self.offset = offset
+        self._file: Optional[BinaryIO] = None
+        self.bytes_written = 0
+
+    def _sync_open(self) -> BinaryIO:
+        file_obj = open(self.path, self.mode)
+        if self.offset:
+            file_obj.seek(self.offset)
+        return file_obj
+
+    async def open(self) -> "AsyncFileWriter":
+        self._file = await asyncio.to_thread(self._sync_open)
+        return self
+
+    async def write(self, data: bytes):
+        """写入一块数据"""
+        await asyncio.to_thread(self._file.write, data)
+        self.bytes_written += len(data)
+
+    def _sync_close(self, fsync: bool):
+        try:
+            if fsync:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+        finally:
+            self._file.close()
+
+    async def close(self, fsync: bool = True):
+        """关闭文件，默认在关闭前将数据刷写到磁盘。"""
+        if self._file is None:
+            return
+        try:
+            await asyncio.to_thread(self._sync_close, fsync)
+        finally:
+            self._file = None
+
+
+def _sync_commit(part_path: Path, final_path: Path):
+    # 标签写入等操作可能在 fsync 之后修改了文件，提交前再次刷写
+    fd = os.open(part_path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+    os.replace(part_path, final_path)
+    # 刷写目录项，确保重命名在断电后依然有效（部分平台不支持对目录 fsync）
+    try:
+        dir_fd = os.open(final_path.parent, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(dir_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(dir_fd)
+
+
+async def commit_part_file(part_path: Path, final_path: Path):
+    """将临时文件原子地重命名为最终文件名。"""
+    await asyncio.to_thread(_sync_commit, part_path, final_path)
+
+
+def _sync_allocate(part_path: Path, size: int):
+    with open(part_path, 'wb') as f:
+        f.truncate(size)
+
+
+async def allocate_part_file(part_path: Path, size: int):
+    """创建指定大小的临时文件，供多个分段按偏移量并发写入。"""
+    await asyncio.to_thread(_sync_allocate, part_path, size)
+
+
+def _sync_prepare_resume(part_path: Path, recorded_bytes: int) -> int:
+    try:
+        size = os.path.getsize(part_path)
+    except FileNotFoundError:
+        return 0
+    # 进程崩溃时数据库中的进度可能落后于磁盘，断电时则可能相反，取两者较小值并截断
+    offset = min(size, recorded_bytes)
+    if size != offset:
+        os.truncate(part_path, offset)
+    return offset
+
+
+async def prepare_resume(part_path: Path, recorded_bytes: int) -> int:
+    """校正已有临时文件的长度，返回可以续传的起始偏移量（0 表示需要从头下载）。"""
+    return await asyncio.to_thread(_sync_prepare_resume, part_path, recorded_bytes)
+
+
+async def discard_part_file(part_path: Path):
+    """删除临时文件（若存在）。"""
+    def _remove():
+        try:
+            os.remove(part_path)
+        except FileNotFoundError:
+            pass
+    await asyncio.to_thread(_remove)
@@ -0,0 +1,136 @@
+"""下载后处理：一次打开音频文件完成质量校验、标签和封面写入，在可配置的线程池或进程池中执行"""
+
+import asyncio
+import logging
+import os
+import traceback
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional, Tuple
+
+from schemas.download import DownloadQueueItem
+from services.download.download_constants import DEFAULT_POST_PROCESS_WORKERS
+from services.download.download_exceptions import APIError
+from services.download.metadata_handler import MetadataHandler
+from services.download.part_file import load_audio
+from services.download.quality_checker import QualityChecker
+
+logger = logging.getLogger(__name__)
+
+
+class _JobLog:
+    """
+    在工作线程/进程中收集日志。会话日志记录器带有文件处理器，无法跨进程传递，
+    因此先记录下来，回到事件循环后再按原顺序写入会话日志。
+    """
+
+    def __init__(self):
+        self.records: List[Tuple[int, str]] = []
+
+    def _add(self, level: int, msg: str, exc_info: bool = False):
+        if exc_info:
+            msg = f"{msg}\n{traceback.format_exc().rstrip()}"
+        self.records.append((level, msg))
+
+    def debug(self, msg: str, exc_info: bool = False):
+        self._add(logging.DEBUG, msg, exc_info)
+
+    def info(self, msg: str, exc_info: bool = False):
+        self._add(logging.INFO, msg, exc_info)
+
+    def warning(self, msg: str, exc_info: bool = False):
+        self._add(logging.WARNING, msg, exc_info)
+
+    def error(self, msg: str, exc_info: bool = False):
+        self._add(logging.ERROR, msg, exc_info)
+
+
+def _post_process_job(file_path: str, item: DownloadQueueItem, song_api_info: Dict[str, Any],
+                      cover_data: Optional[bytes]) -> Dict[str, Any]:
+    """
+    后处理任务本体（模块级函数，可被进程池序列化）：
+    检查大小 -> 打开文件一次 -> 检查时长 -> 写入标签与封面 -> 保存一次。
+    """
+    log = _JobLog()
+    result: Dict[str, Any] = {'acceptable': False, 'error': None, 'records': log.records}
+    quality_checker = QualityChecker()
+    try:
+        if not quality_checker.check_file_size(file_path, os.path.getsize(file_path), log):
+            return result
+        try:
+            audio = load_audio(file_path)
+        except Exception as e:
+            quality_checker.report_duration_error(file_path, e, log)
+            return result
+        if not quality_checker.check_duration(file_path, audio, log):
+            return result
+
+        MetadataHandler().apply_metadata(audio, item, song_api_info, log, cover_data)
+        audio.save()
+        log.info("元数据与封面已保存。")
+        result['acceptable'] = True
+    except Exception as e:
+        log.error(f"后处理文件 '{file_path}' 时出错: {e}", exc_info=True)
+        result['error'] = str(e)
+    return result
+
+
+class PostProcessor:
+    """
+    管理后处理执行器。默认使用线程池（mutagen 的解析和写入大部分时间在做文件 I/O）；
+    下载并发较高、CPU 成为瓶颈时可切换为进程池。
+    """
+
+    def __init__(self):
+        self.mode = 'thread'
+        self.workers = DEFAULT_POST_PROCESS_WORKERS
+        self._executor: Optional[Executor] = None
+
+    def configure(self, mode: str, workers: int):
+        if mode == self.mode and workers == self.workers:
+            return
+        self.mode = mode
+        self.workers = workers
+        # 旧执行器中进行中的任务会继续完成，之后的任务使用新执行器
+        self._discard_executor()
+        logger.info(f"后处理执行器已切换为 {'进程池' if mode == 'process' else '线程池'}，工作者数量: {workers}")
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.mode == 'process':
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='post-process')
+        return self._executor
+
+    def _discard_executor(self):
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    async def process(self, file_path: str, item: DownloadQueueItem, song_api_info: Dict[str, Any],
+                      cover_data: Optional[bytes], log: logging.Logger) -> bool:
+        """
+        对下载完成的文件执行后处理。文件质量不合格时返回 False，写入元数据失败时抛出 APIError。
+        """
+        loop = asyncio.get_running_loop()
+        try:
+            result = await loop.run_in_executor(
+                self._get_executor(), _post_process_job, file_path, item, song_api_info, cover_data
+            )
+        except BrokenProcessPool as e:
+            # 工作进程意外退出，丢弃进程池以便下次重新创建
+            self._discard_executor()
+            raise APIError(f"后处理进程异常退出: {e}") from e
+
+        for level, msg in result['records']:
+            log.log(level, msg)
+        if result['error']:
+            raise APIError(f"写入元数据失败: {result['error']}")
+        return result['acceptable']
+
+    def shutdown(self):
+        self._discard_executor()
+
+
+post_processor = PostProcessor()
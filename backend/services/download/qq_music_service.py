@@ -1,18 +1,40 @@
 """QQ音乐信息补全服务"""
 
+import asyncio
 import logging
-from typing import Optional, Dict
-import httpx
+from typing import Optional, Dict, List, Tuple
+
+from core.http_client import http_clients
+from services.download.download_constants import QQ_DETAIL_CACHE_TTL_SECONDS, QQ_DETAIL_BATCH_SIZE
+from services.download.response_cache import response_cache
 
 logger = logging.getLogger(__name__)
 
+_QQ_HEADERS = {
+    'Referer': 'https://y.qq.com/',
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+
+def parse_qq_song_id(song_id: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    """QQ音乐的 song_id 格式是 "songid-songmid"，返回 (songid, songmid)"""
+    if not song_id or '-' not in song_id:
+        return None, None
+    songid, songmid = song_id.split('-', 1)
+    return songid or None, songmid or None
+
+
 class QQMusicService:
-    """处理QQ音乐相关信息的获取和缓存"""
-    
+    """
+    处理QQ音乐相关信息的获取和缓存。
+    歌曲详情缓存在响应缓存的 'qq_song_detail' 命名空间中（容量受限的内存 LRU + 带过期时间的 SQLite），
+    重启后依然有效；批量预取与单曲查询共享进行中的请求，避免同一首歌被重复请求。
+    """
+
     def __init__(self):
-        # 缓存QQ音乐歌曲详情，避免重复请求
-        self._qq_song_detail_cache: Dict[str, Dict] = {}
-    
+        # 进行中的详情请求（songmid -> 结果），批量预取期间到达的单曲查询直接等待其结果
+        self._inflight: Dict[str, asyncio.Future] = {}
+
     async def fetch_song_detail(self, songmid: str, session_logger: logging.Logger) -> Optional[Dict]:
         """
         获取QQ音乐歌曲详情（用于补全缺失信息）
@@ -21,44 +43,118 @@ class QQMusicService:
         :return: 包含歌曲详情的字典，如果获取失败则返回None
         """
         # 检查缓存
-        if songmid in self._qq_song_detail_cache:
+        cached = await response_cache.get('qq_song_detail', songmid)
+        if cached is not None:
             session_logger.debug(f"从缓存中获取QQ音乐歌曲详情 (songmid: {songmid})")
-            return self._qq_song_detail_cache[songmid]
-        
+            return cached
+
+        pending = self._inflight.get(songmid)
+        if pending is not None:
+            session_logger.debug(f"QQ音乐歌曲详情正在批量获取中，等待结果 (songmid: {songmid})")
+            detail = await asyncio.shield(pending)
+            if detail is not None:
+                return detail
+            # 批量接口未返回该歌曲，改用单曲接口
+
         url = "https://c.y.qq.com/v8/fcg-bin/fcg_play_single_song.fcg"
         params = {
             'songmid': songmid,
             'platform': 'yqq',
             'format': 'json'
         }
-        headers = {
-            'Referer': 'https://y.qq.com/',
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        
+
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(url, headers=headers, params=params, timeout=10.0)
-                response.raise_for_status()
-                data = response.json()
-                
-                if data.get('code') == 0 and data.get('data'):
-                    song_data = data['data'][0] if isinstance(data['data'], list) else data['data']
-                    # 缓存结果
-                    self._qq_song_detail_cache[songmid] = song_data
-                    session_logger.debug(f"成功获取QQ音乐歌曲详情 (songmid: {songmid})")
-                    return song_data
-                else:
-                    session_logger.warning(f"QQ音乐歌曲详情API返回错误 (songmid: {songmid}, code: {data.get('code')})")
+            client = http_clients.get('qq')
+            response = await client.get(url, headers=_QQ_HEADERS, params=params, timeout=10.0)
+            response.raise_for_status()
+            data = response.json()
+
+            if data.get('code') == 0 and data.get('data'):
+                song_data = data['data'][0] if isinstance(data['data'], list) else data['data']
+                # 缓存结果
+                await response_cache.set('qq_song_detail', (songmid,), song_data, QQ_DETAIL_CACHE_TTL_SECONDS)
+                session_logger.debug(f"成功获取QQ音乐歌曲详情 (songmid: {songmid})")
+                return song_data
+            else:
+                session_logger.warning(f"QQ音乐歌曲详情API返回错误 (songmid: {songmid}, code: {data.get('code')})")
         except Exception as e:
             session_logger.warning(f"获取QQ音乐歌曲详情失败 (songmid: {songmid}): {e}")
-        
+
         return None
-    
-    def get_cached_detail(self, songmid: str) -> Optional[Dict]:
-        """获取缓存的歌曲详情"""
-        return self._qq_song_detail_cache.get(songmid)
-    
-    def clear_cache(self):
-        """清空缓存"""
-        self._qq_song_detail_cache.clear()
\ No newline at end of file
+
+    async def _fetch_detail_batch(self, batch: List[Tuple[int, str]]) -> Dict[str, Dict]:
+        """通过多曲目详情接口一次获取一批歌曲，返回 songmid -> 详情"""
+        payload = {
+            'comm': {'ct': 24, 'cv': 0},
+            'songinfo': {
+                'module': 'track_info.UniformRuleCtrlServer',
+                'method': 'GetTrackInfo',
+                'param': {'ids': [songid for songid, _ in batch], 'types': [0] * len(batch)}
+            }
+        }
+        client = http_clients.get('qq')
+        response = await client.post(
+            "https://u.y.qq.com/cgi-bin/musicu.fcg",
+            headers=_QQ_HEADERS,
+            json=payload,
+            timeout=15.0
+        )
+        response.raise_for_status()
+        data = response.json()
+        songinfo = data.get('songinfo') or {}
+        if songinfo.get('code') != 0:
+            raise ValueError(f"接口返回错误 (code: {songinfo.get('code')})")
+        tracks = (songinfo.get('data') or {}).get('tracks') or []
+        return {track['mid']: track for track in tracks if isinstance(track, dict) and track.get('mid')}
+
+    async def prefetch_song_details(self, song_ids: List[str], session_logger: logging.Logger) -> int:
+        """
+        批量预取一组歌曲（"songid-songmid" 格式）的详情并写入缓存，返回新获取的数量。
+        在下载开始前调用，之后逐首补全信息时直接命中缓存。
+        """
+        wanted: Dict[str, int] = {}
+        for song_id in song_ids:
+            songid, songmid = parse_qq_song_id(song_id)
+            if songmid and songid and songid.isdigit() and songmid not in self._inflight:
+                wanted[songmid] = int(songid)
+
+        if not wanted:
+            return 0
+
+        # 先登记进行中的请求（在第一次 await 之前），同时开始的逐首补全会等待批量结果
+        loop = asyncio.get_running_loop()
+        futures = {songmid: loop.create_future() for songmid in wanted}
+        self._inflight.update(futures)
+
+        missing = []
+        fetched = 0
+        try:
+            for songmid, songid in wanted.items():
+                cached = await response_cache.get('qq_song_detail', songmid)
+                if cached is None:
+                    missing.append((songid, songmid))
+                else:
+                    futures[songmid].set_result(cached)
+
+            for i in range(0, len(missing), QQ_DETAIL_BATCH_SIZE):
+                batch = missing[i:i + QQ_DETAIL_BATCH_SIZE]
+                try:
+                    details = await self._fetch_detail_batch(batch)
+                except Exception as e:
+                    session_logger.warning(f"批量获取QQ音乐歌曲详情失败 (batch starting at {i}): {e}")
+                    details = {}
+                for _, songmid in batch:
+                    detail = details.get(songmid)
+                    if detail is not None:
+                        await response_cache.set('qq_song_detail', (songmid,), detail, QQ_DETAIL_CACHE_TTL_SECONDS)
+                        fetched += 1
+                    futures[songmid].set_result(detail)
+        finally:
+            for songmid, future in futures.items():
+                if not future.done():
+                    future.set_result(None)
+                self._inflight.pop(songmid, None)
+
+        if missing:
+            session_logger.info(f"已批量预取 {fetched}/{len(missing)} 首QQ音乐歌曲的详情。")
+        return fetched
@@ -0,0 +1,127 @@
+"""按主机自适应调整并发的请求调度器（AIMD）"""
+
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+from services.download.download_constants import (
+    API_INITIAL_CONCURRENCY, API_MIN_CONCURRENCY, API_MAX_CONCURRENCY,
+    API_MAX_RETRY_AFTER_SECONDS, API_DEFAULT_COOLDOWN_SECONDS
+)
+
+logger = logging.getLogger(__name__)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """解析 Retry-After 头（秒数或 HTTP 日期），返回需要等待的秒数"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        seconds = float(value)
+    else:
+        try:
+            retry_at = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if retry_at.tzinfo is None:
+            retry_at = retry_at.replace(tzinfo=timezone.utc)
+        seconds = (retry_at - datetime.now(timezone.utc)).total_seconds()
+    return max(0.0, min(seconds, API_MAX_RETRY_AFTER_SECONDS))
+
+
+class RequestSlot:
+    """一次请求占用的并发名额，请求方通过它报告服务器是否过载"""
+
+    def __init__(self):
+        self.overloaded = False
+        self.retry_after: Optional[float] = None
+
+    def mark_overloaded(self, retry_after: Optional[float] = None):
+        self.overloaded = True
+        if retry_after is not None:
+            self.retry_after = retry_after
+
+
+class HostGovernor:
+    """
+    单个主机的并发控制：连续成功时并发上限加一（加性增），
+    遇到限流或服务端错误时上限减半（乘性减），并在冷却期内暂停发出新请求。
+    """
+
+    def __init__(self, host: str):
+        self.host = host
+        self.limit = float(API_INITIAL_CONCURRENCY)
+        self.in_flight = 0
+        self._successes = 0
+        self._blocked_until = 0.0
+        self._condition: Optional[asyncio.Condition] = None
+
+    async def acquire(self):
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        async with self._condition:
+            while True:
+                delay = self._blocked_until - time.monotonic()
+                if delay > 0:
+                    try:
+                        await asyncio.wait_for(self._condition.wait(), timeout=delay)
+                    except asyncio.TimeoutError:
+                        pass
+                elif self.in_flight < int(self.limit):
+                    self.in_flight += 1
+                    return
+                else:
+                    await self._condition.wait()
+
+    async def release(self, slot: Optional[RequestSlot], succeeded: bool):
+        async with self._condition:
+            self.in_flight -= 1
+            if slot is not None and slot.overloaded:
+                self.limit = max(float(API_MIN_CONCURRENCY), self.limit / 2)
+                self._successes = 0
+                cooldown = slot.retry_after if slot.retry_after is not None else API_DEFAULT_COOLDOWN_SECONDS
+                self._blocked_until = max(self._blocked_until, time.monotonic() + cooldown)
+                logger.warning(f"主机 {self.host} 出现限流或服务端错误，并发上限降为 {int(self.limit)}，暂停 {cooldown:.1f} 秒。")
+            elif succeeded:
+                self._successes += 1
+                # 每成功完成一轮（与当前上限相同数量的请求）后上限加一
+                if self._successes >= int(self.limit) and self.limit < API_MAX_CONCURRENCY:
+                    self.limit += 1
+                    self._successes = 0
+                    logger.debug(f"主机 {self.host} 请求持续成功，并发上限提升为 {int(self.limit)}。")
+            self._condition.notify_all()
+
+
+class RequestGovernor:
+    """按主机名管理 HostGovernor 的注册表"""
+
+    def __init__(self):
+        self._hosts: Dict[str, HostGovernor] = {}
+
+    def for_url(self, url: str) -> HostGovernor:
+        host = urlparse(url).netloc
+        if host not in self._hosts:
+            self._hosts[host] = HostGovernor(host)
+        return self._hosts[host]
+
+    @asynccontextmanager
+    async def slot(self, url: str):
+        """在目标主机的并发名额内执行一次请求"""
+        governor = self.for_url(url)
+        await governor.acquire()
+        slot = RequestSlot()
+        succeeded = False
+        try:
+            yield slot
+            succeeded = True
+        finally:
+            await governor.release(slot, succeeded)
+
+
+request_governor = RequestGovernor()
@@ -0,0 +1,174 @@
+"""上游 API 响应的两级缓存（内存 LRU + SQLite），带过期时间和命中率统计"""
+
+import asyncio
+import copy
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlparse, parse_qs
+
+from core.database import get_db_connection
+from services.download.download_constants import (
+    RESPONSE_CACHE_MEMORY_ENTRIES, SIGNED_URL_EXPIRY_MARGIN_SECONDS
+)
+
+logger = logging.getLogger(__name__)
+
+# 常见的签名链接过期时间参数（值为 Unix 时间戳）
+_URL_EXPIRY_PARAMS = ('expires', 'expire', 'x-expires', 'e', 'deadline')
+
+# 每写入这么多次执行一次过期记录清理
+_PURGE_EVERY_WRITES = 200
+
+
+def signed_url_ttl(url: str, default_ttl: int) -> int:
+    """
+    根据下载链接中的过期时间参数计算可缓存的秒数，不超过 default_ttl。
+    链接即将过期时返回 0，表示不应缓存。
+    """
+    try:
+        query = parse_qs(urlparse(url).query)
+    except ValueError:
+        return default_ttl
+    now = time.time()
+    for name, values in query.items():
+        if name.lower() in _URL_EXPIRY_PARAMS and values and values[0].isdigit():
+            expires_at = int(values[0])
+            # 只认可合理范围内的时间戳，避免把其他数字参数误当作过期时间
+            if now < expires_at < now + 30 * 24 * 3600:
+                return max(0, min(default_ttl, int(expires_at - now - SIGNED_URL_EXPIRY_MARGIN_SECONDS)))
+    return default_ttl
+
+
+class ResponseCache:
+    """
+    API 响应缓存。先查内存 LRU，未命中再查 SQLite（命中后回填内存），
+    按命名空间分别统计内存命中、数据库命中和未命中次数。
+    """
+
+    def __init__(self, max_memory_entries: int = RESPONSE_CACHE_MEMORY_ENTRIES):
+        self.max_memory_entries = max_memory_entries
+        self._memory: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._writes = 0
+
+    @staticmethod
+    def make_key(namespace: str, *parts: Any) -> str:
+        return namespace + ':' + json.dumps(parts, ensure_ascii=False)
+
+    def _count(self, namespace: str, field: str):
+        stats = self._stats.setdefault(namespace, {'memory_hits': 0, 'db_hits': 0, 'misses': 0})
+        stats[field] += 1
+
+    def _remember(self, key: str, expires_at: float, value: Any):
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    # --- 数据库操作（在线程池中执行） ---
+
+    @staticmethod
+    def _db_get(key: str) -> Optional[Tuple[float, str]]:
+        conn = get_db_connection()
+        try:
+            row = conn.execute(
+                "SELECT expires_at, payload FROM api_response_cache WHERE cache_key = ?", (key,)
+            ).fetchone()
+            return (row['expires_at'], row['payload']) if row else None
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _db_set(key: str, namespace: str, payload: str, expires_at: float, purge: bool):
+        conn = get_db_connection()
+        try:
+            conn.execute(
+                """
+                INSERT INTO api_response_cache (cache_key, namespace, payload, expires_at) VALUES (?, ?, ?, ?)
+                ON CONFLICT(cache_key) DO UPDATE SET payload = excluded.payload, expires_at = excluded.expires_at,
+                    created_at = CURRENT_TIMESTAMP
+                """,
+                (key, namespace, payload, expires_at)
+            )
+            if purge:
+                conn.execute("DELETE FROM api_response_cache WHERE expires_at < ?", (time.time(),))
+            conn.commit()
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _db_delete(key: str):
+        conn = get_db_connection()
+        try:
+            conn.execute("DELETE FROM api_response_cache WHERE cache_key = ?", (key,))
+            conn.commit()
+        finally:
+            conn.close()
+
+    # --- 公共接口 ---
+
+    async def get(self, namespace: str, *parts: Any) -> Optional[Any]:
+        """读取缓存，返回值的副本；未命中或已过期时返回 None"""
+        key = self.make_key(namespace, *parts)
+        now = time.time()
+
+        entry = self._memory.get(key)
+        if entry is not None:
+            if entry[0] > now:
+                self._memory.move_to_end(key)
+                self._count(namespace, 'memory_hits')
+                return copy.deepcopy(entry[1])
+            del self._memory[key]
+
+        try:
+            row = await asyncio.to_thread(self._db_get, key)
+        except Exception as e:
+            logger.warning(f"读取响应缓存失败: {e}")
+            row = None
+        if row is not None and row[0] > now:
+            value = json.loads(row[1])
+            self._remember(key, row[0], value)
+            self._count(namespace, 'db_hits')
+            return copy.deepcopy(value)
+
+        self._count(namespace, 'misses')
+        return None
+
+    async def set(self, namespace: str, parts: Tuple[Any, ...], value: Any, ttl: int):
+        """写入缓存，ttl 小于等于 0 时不缓存"""
+        if ttl <= 0:
+            return
+        key = self.make_key(namespace, *parts)
+        expires_at = time.time() + ttl
+        self._remember(key, expires_at, copy.deepcopy(value))
+
+        self._writes += 1
+        purge = self._writes % _PURGE_EVERY_WRITES == 0
+        try:
+            await asyncio.to_thread(self._db_set, key, namespace, json.dumps(value, ensure_ascii=False), expires_at, purge)
+        except Exception as e:
+            logger.warning(f"写入响应缓存失败: {e}")
+
+    async def invalidate(self, namespace: str, *parts: Any):
+        """删除一条缓存（例如缓存的下载链接已失效）"""
+        key = self.make_key(namespace, *parts)
+        self._memory.pop(key, None)
+        try:
+            await asyncio.to_thread(self._db_delete, key)
+        except Exception as e:
+            logger.warning(f"删除响应缓存失败: {e}")
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """返回各命名空间的命中统计"""
+        result = {}
+        for namespace, counts in self._stats.items():
+            total = counts['memory_hits'] + counts['db_hits'] + counts['misses']
+            hits = counts['memory_hits'] + counts['db_hits']
+            result[namespace] = dict(counts, requests=total, hit_rate=round(hits / total, 4) if total else 0.0)
+        return result
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,138 @@
+"""从下载流开头的少量数据中解析音频时长，用于在传输过程中尽早识别过短的文件"""
+
+import struct
+from typing import Optional
+
+from services.download.download_constants import STREAM_PROBE_MAX_BYTES
+
+# MPEG Layer III 比特率表（kbps），按 [MPEG1, MPEG2/2.5] 区分
+_MP3_BITRATES = {
+    1: [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    2: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+# 采样率表，按版本位（3=MPEG1，2=MPEG2，0=MPEG2.5）区分
+_MP3_SAMPLE_RATES = {3: [44100, 48000, 32000], 2: [22050, 24000, 16000], 0: [11025, 12000, 8000]}
+
+# 在 ID3 标签之后查找第一个 MPEG 帧头的最大范围（部分文件会有填充字节）
+_MP3_SYNC_SEARCH_BYTES = 4096
+
+
+class _NeedMoreData(Exception):
+    """已接收的数据还不足以得出结论"""
+
+
+def _require(data: bytes, end: int):
+    if len(data) < end:
+        raise _NeedMoreData()
+
+
+def _skip_id3v2(data: bytes) -> int:
+    """返回 ID3v2 标签之后的偏移量（没有标签时为 0）"""
+    _require(data, 10)
+    if data[:3] != b'ID3':
+        return 0
+    size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+    footer = 10 if data[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def _flac_duration(data: bytes, offset: int) -> Optional[float]:
+    """读取 STREAMINFO 块中的采样率和总采样数"""
+    _require(data, offset + 4 + 4 + 18)
+    block_type = data[offset + 4] & 0x7F
+    if block_type != 0:
+        return None
+    # STREAMINFO 第 10~17 字节：采样率(20 位) | 声道数(3) | 位深(5) | 总采样数(36)
+    packed = struct.unpack('>Q', data[offset + 8 + 10:offset + 8 + 18])[0]
+    sample_rate = packed >> 44
+    total_samples = packed & ((1 << 36) - 1)
+    if not sample_rate or not total_samples:
+        return None
+    return total_samples / sample_rate
+
+
+def _mp3_duration(data: bytes, offset: int, total_bytes: Optional[int]) -> Optional[float]:
+    """优先使用 Xing/Info 或 VBRI 头中的总帧数，否则按首帧比特率和文件大小估算"""
+    search_end = offset + _MP3_SYNC_SEARCH_BYTES
+    position = offset
+    while True:
+        if position >= search_end:
+            return None
+        _require(data, position + 4)
+        b0, b1, b2, b3 = data[position:position + 4]
+        if b0 == 0xFF and (b1 & 0xE0) == 0xE0:
+            version = (b1 >> 3) & 0x03
+            layer = (b1 >> 1) & 0x03
+            bitrate_index = b2 >> 4
+            sample_rate_index = (b2 >> 2) & 0x03
+            if version != 1 and layer == 1 and bitrate_index not in (0, 15) and sample_rate_index != 3:
+                break
+        position += 1
+
+    mpeg1 = version == 3
+    bitrate = _MP3_BITRATES[1 if mpeg1 else 2][bitrate_index] * 1000
+    sample_rate = _MP3_SAMPLE_RATES[version][sample_rate_index]
+    samples_per_frame = 1152 if mpeg1 else 576
+    mono = (b3 >> 6) == 3
+
+    side_info = (17 if mono else 32) if mpeg1 else (9 if mono else 17)
+    xing = position + 4 + side_info
+    _require(data, xing + 12)
+    if data[xing:xing + 4] in (b'Xing', b'Info'):
+        flags = struct.unpack('>I', data[xing + 4:xing + 8])[0]
+        if flags & 0x01:
+            frames = struct.unpack('>I', data[xing + 8:xing + 12])[0]
+            return frames * samples_per_frame / sample_rate
+
+    vbri = position + 4 + 32
+    _require(data, vbri + 18)
+    if data[vbri:vbri + 4] == b'VBRI':
+        frames = struct.unpack('>I', data[vbri + 14:vbri + 18])[0]
+        return frames * samples_per_frame / sample_rate
+
+    # 没有 VBR 头，视为固定码率
+    if total_bytes is None:
+        return None
+    return (total_bytes - position) * 8 / bitrate
+
+
+def _parse_duration(data: bytes, extension: str, total_bytes: Optional[int]) -> Optional[float]:
+    offset = _skip_id3v2(data)
+    _require(data, offset + 4)
+    if data[offset:offset + 4] == b'fLaC':
+        return _flac_duration(data, offset)
+    if extension == '.mp3':
+        return _mp3_duration(data, offset, total_bytes)
+    # 其他格式（m4a/ogg）的时长信息可能位于文件末尾，交给下载完成后的检查
+    return None
+
+
+class DurationProbe:
+    """
+    累积下载流开头的数据，直到能够解析出时长或确定无法解析为止。
+    ID3 标签中可能嵌有较大的封面，因此所需字节数不固定，最多缓存 STREAM_PROBE_MAX_BYTES。
+    """
+
+    def __init__(self, extension: str, total_bytes: Optional[int]):
+        self.extension = extension.lower()
+        self.total_bytes = total_bytes
+        self.done = False
+        self._buffer = bytearray()
+
+    def feed(self, chunk: bytes) -> Optional[float]:
+        """追加一块数据；首次解析出时长时返回秒数，其余情况返回 None"""
+        if self.done:
+            return None
+        self._buffer += chunk[:STREAM_PROBE_MAX_BYTES - len(self._buffer)]
+        try:
+            duration = _parse_duration(bytes(self._buffer), self.extension, self.total_bytes)
+        except _NeedMoreData:
+            if len(self._buffer) >= STREAM_PROBE_MAX_BYTES:
+                self._finish()
+            return None
+        self._finish()
+        return duration
+
+    def _finish(self):
+        self.done = True
+        self._buffer = bytearray()
@@ -0,0 +1,114 @@
+"""记录在所有平台上都无法下载的歌曲（负缓存），并按指数退避安排复查"""
+
+import re
+import sqlite3
+import logging
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from core.database import get_db_connection
+from services.download.download_constants import UNAVAILABLE_RECHECK_BASE_HOURS, UNAVAILABLE_RECHECK_MAX_HOURS
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_song_key(title: str, artist: str) -> str:
+    """生成 (标题, 艺术家) 的规范化匹配键：忽略大小写和多余空白"""
+    clean_title = re.sub(r'\s+', ' ', (title or '').strip().lower())
+    clean_artist = re.sub(r'\s+', ' ', (artist or '').strip().lower())
+    return f"{clean_title}|{clean_artist}"
+
+
+class UnavailableSongService:
+    """
+    封装 unavailable_songs 表的读写。
+    所有方法都是同步的，调用方应通过 run_in_executor 在线程池中执行。
+    """
+
+    def _execute(self, func: Callable[..., Any], *args) -> Any:
+        conn = get_db_connection()
+        try:
+            return func(conn, *args)
+        finally:
+            conn.close()
+
+    def record_unavailable(self, title: str, artist: str, platform: Optional[str], song_id: Optional[str], error: str):
+        """
+        记录一次“全平台无可用版本”，失败次数越多，下次复查间隔越长。
+        每次调用都计为一次独立的失败：调用方只应在真正执行了搜索的那次下载尝试中调用，
+        合并等待同一次下载结果的其他队列项目不应重复记录。
+        """
+        def _record(conn: sqlite3.Connection):
+            match_key = normalize_song_key(title, artist)
+            cursor = conn.cursor()
+            cursor.execute("SELECT failure_count FROM unavailable_songs WHERE match_key = ?", (match_key,))
+            row = cursor.fetchone()
+            failure_count = (row['failure_count'] if row else 0) + 1
+            hours = min(UNAVAILABLE_RECHECK_BASE_HOURS * (2 ** (failure_count - 1)), UNAVAILABLE_RECHECK_MAX_HOURS)
+            cursor.execute(
+                """
+                INSERT INTO unavailable_songs (match_key, platform, song_id, title, artist, failure_count, last_error, last_checked_at, next_check_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP, datetime('now', ?))
+                ON CONFLICT(match_key) DO UPDATE SET
+                    platform = CASE WHEN excluded.song_id IS NOT NULL THEN excluded.platform ELSE unavailable_songs.platform END,
+                    song_id = COALESCE(excluded.song_id, unavailable_songs.song_id),
+                    failure_count = excluded.failure_count,
+                    last_error = excluded.last_error,
+                    last_checked_at = CURRENT_TIMESTAMP,
+                    next_check_at = excluded.next_check_at
+                """,
+                (match_key, platform if song_id else None, song_id, title, artist, failure_count, error, f"+{hours} hours")
+            )
+            conn.commit()
+            logger.info(f"歌曲 '{title} - {artist}' 在所有平台均不可用（第 {failure_count} 次），{hours} 小时后再复查。")
+        self._execute(_record)
+
+    def clear(self, title: str, artist: str, platform: Optional[str] = None, song_id: Optional[str] = None):
+        """歌曲下载成功后移除其负缓存记录。"""
+        def _clear(conn: sqlite3.Connection):
+            conn.execute(
+                """
+                DELETE FROM unavailable_songs
+                WHERE match_key = ? OR (song_id IS NOT NULL AND song_id = ? AND platform = ?)
+                """,
+                (normalize_song_key(title, artist), song_id, platform)
+            )
+            conn.commit()
+        self._execute(_clear)
+
+    def partition_songs(self, songs: List[Dict[str, Any]], platform: Optional[str] = None) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        歌曲自身没有 platform 字段时使用传入的 platform 匹配歌曲ID。
+        将待下载歌曲分为三组：
+        - 从未记录过的歌曲
+        - 已记录但已到复查时间的歌曲（排在最后下载）
+        - 仍在冷却期内、应当跳过的歌曲
+        """
+        def _partition(conn: sqlite3.Connection):
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT match_key, platform, song_id, next_check_at <= CURRENT_TIMESTAMP as is_due FROM unavailable_songs"
+            )
+            by_key: Dict[str, bool] = {}
+            by_song_id: Dict[Tuple[str, str], bool] = {}
+            for row in cursor.fetchall():
+                by_key[row['match_key']] = bool(row['is_due'])
+                if row['song_id'] and row['platform']:
+                    by_song_id[(row['platform'], row['song_id'])] = bool(row['is_due'])
+
+            fresh, due, skipped = [], [], []
+            for song in songs:
+                is_due = by_key.get(normalize_song_key(song.get('title'), song.get('artist')))
+                song_platform = song.get('platform') or platform
+                if is_due is None and song.get('song_id') and song_platform:
+                    is_due = by_song_id.get((song_platform, str(song['song_id'])))
+                if is_due is None:
+                    fresh.append(song)
+                elif is_due:
+                    due.append(song)
+                else:
+                    skipped.append(song)
+            return fresh, due, skipped
+        return self._execute(_partition)
+
+
+unavailable_song_service = UnavailableSongService()
@@ -1,13 +1,79 @@
 import httpx
 import re
 import json
+import time
 import asyncio
-from typing import Dict, List, Optional
+from collections import OrderedDict
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 from enum import Enum
 import logging
+from tenacity import AsyncRetrying, stop_after_attempt, wait_exponential
+
+from core.http_client import http_clients
+from services.song_catalog_service import song_catalog_service
 
 logger = logging.getLogger(__name__)
 
+# 网易云歌曲详情接口：每批歌曲数量、同时进行的批次数、每批最多尝试次数
+NETEASE_DETAIL_BATCH_SIZE = 500
+NETEASE_DETAIL_CONCURRENCY = 3
+NETEASE_DETAIL_RETRY_ATTEMPTS = 3
+
+# 解析后歌单的短时缓存：预览、创建任务和首次同步通常会在几分钟内先后解析同一个歌单
+PLAYLIST_CACHE_TTL_SECONDS = 300
+PLAYLIST_CACHE_MAX_ENTRIES = 32
+
+
+class ParsedPlaylistCache:
+    """
+    按 (平台, 歌单ID) 缓存解析后的完整歌单，并合并并发的解析请求。
+    缓存的歌单在调用方之间共享，调用方不应修改其内容。有歌曲详情获取失败的结果不缓存。
+    """
+
+    def __init__(self):
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, Dict]]" = OrderedDict()
+        self._inflight: Dict[Tuple[str, str], asyncio.Future] = {}
+
+    def get(self, key: Tuple[str, str]) -> Optional[Dict]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    async def get_or_wait(self, key: Tuple[str, str]) -> Optional[Dict]:
+        """返回缓存的歌单；同一歌单正在解析时等待其结果，解析失败时返回 None"""
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+        pending = self._inflight.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+        return None
+
+    def begin(self, key: Tuple[str, str]) -> asyncio.Future:
+        """登记一个进行中的解析，之后到达的调用方会等待它的结果"""
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        return future
+
+    def finish(self, key: Tuple[str, str], future: asyncio.Future, playlist: Optional[Dict]):
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+        if not future.done():
+            future.set_result(playlist)
+        if playlist is not None and not playlist.get('failed_song_ids'):
+            self._entries[key] = (time.monotonic() + PLAYLIST_CACHE_TTL_SECONDS, playlist)
+            self._entries.move_to_end(key)
+            while len(self._entries) > PLAYLIST_CACHE_MAX_ENTRIES:
+                self._entries.popitem(last=False)
+
+
+playlist_cache = ParsedPlaylistCache()
+
 class Platform(Enum):
     NETEASE = "netease"
     QQ = "qq"
@@ -52,11 +118,88 @@ class PlaylistService:
         return None
     
     @staticmethod
-    async def fetch_netease_playlist(playlist_id: str) -> Dict:
+    def _netease_track_to_dict(track: Dict) -> Dict:
+        """将网易云歌曲详情转换为统一的曲目格式"""
+        artists = ', '.join([a.get('name', '未知歌手') for a in track.get('ar', [])])
+        album = (track.get('al') or {}).get('name', '未知专辑')
+        duration_ms = track.get('dt')
+        return {
+            'title': track.get('name', '未知歌名'),
+            'artist': artists,
+            'album': album,
+            'song_id': str(track.get('id', '')),  # 网易云音乐直接使用id字段
+            'platform': 'netease',
+            'duration': duration_ms // 1000 if isinstance(duration_ms, int) else None
+        }
+
+    @staticmethod
+    async def iter_netease_song_details(song_ids: List[str], headers: Dict[str, str]) -> AsyncIterator[Tuple[Dict[str, Dict], List[str]]]:
         """
-        获取网易云音乐歌单（增强版，包含歌曲ID）
+        分批并发获取网易云歌曲详情，每批失败时按指数退避重试，按完成顺序逐批产出结果。
+        :param song_ids: 歌曲ID列表
+        :param headers: 请求头
+        :return: 异步迭代 (歌曲ID -> 曲目信息, 该批重试后仍失败的歌曲ID列表)
+        """
+        client = http_clients.get('netease')
+        song_details_url = "https://music.163.com/api/v3/song/detail"
+        semaphore = asyncio.Semaphore(NETEASE_DETAIL_CONCURRENCY)
+
+        async def _fetch_batch(batch_ids: List[str]) -> Tuple[Dict[str, Dict], List[str]]:
+            try:
+                async with semaphore:
+                    async for attempt in AsyncRetrying(
+                        stop=stop_after_attempt(NETEASE_DETAIL_RETRY_ATTEMPTS),
+                        wait=wait_exponential(multiplier=1, min=1, max=8),
+                        reraise=True
+                    ):
+                        with attempt:
+                            payload = {'c': json.dumps([{'id': tid} for tid in batch_ids])}
+                            response = await client.post(song_details_url, headers=headers, data=payload, timeout=15.0)
+                            response.raise_for_status()
+                            data = response.json()
+                            if data.get('code') != 200:
+                                raise Exception(f"接口返回错误 (code: {data.get('code')})")
+                            songs = data.get('songs') or []
+            except Exception as e:
+                logger.warning(f"获取歌曲详情失败 (batch starting at id {batch_ids[0]}，共 {len(batch_ids)} 首): {e}")
+                return {}, list(batch_ids)
+            details = {}
+            for track_detail in songs:
+                track = PlaylistService._netease_track_to_dict(track_detail)
+                details[track['song_id']] = track
+            return details, []
+
+        batches = [song_ids[i:i + NETEASE_DETAIL_BATCH_SIZE] for i in range(0, len(song_ids), NETEASE_DETAIL_BATCH_SIZE)]
+        tasks = [asyncio.ensure_future(_fetch_batch(batch)) for batch in batches]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # 消费方提前停止迭代时，取消尚未完成的批次
+            for task in tasks:
+                task.cancel()
+
+    @staticmethod
+    async def fetch_netease_song_details(song_ids: List[str], headers: Dict[str, str]) -> Tuple[Dict[str, Dict], List[str]]:
+        """
+        获取全部网易云歌曲详情。
+        :param song_ids: 歌曲ID列表
+        :param headers: 请求头
+        :return: (歌曲ID -> 曲目信息, 重试后仍失败的歌曲ID列表)
+        """
+        details: Dict[str, Dict] = {}
+        failed_song_ids: List[str] = []
+        async for batch_details, batch_failed in PlaylistService.iter_netease_song_details(song_ids, headers):
+            details.update(batch_details)
+            failed_song_ids.extend(batch_failed)
+        return details, failed_song_ids
+
+    @staticmethod
+    async def stream_netease_playlist(playlist_id: str) -> AsyncIterator[Dict]:
+        """
+        逐批获取网易云音乐歌单。目录中已有的歌曲最先产出，其余歌曲在每批详情返回后立即产出。
         :param playlist_id: 歌单ID
-        :return: 包含歌单标题和曲目的字典，曲目包含歌曲ID
+        :return: 异步迭代歌单片段，格式见 stream_playlist
         """
         # 使用更可靠的v6 API端点，以获取完整的歌单信息
         playlist_url = f"https://music.163.com/api/v6/playlist/detail?id={playlist_id}"
@@ -66,77 +209,91 @@ class PlaylistService:
             'Cookie': 'appver=2.0.2; os=pc;'
         }
         
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.get(playlist_url, headers=headers, timeout=10.0)
-                response.raise_for_status()
-                data = response.json()
-                
-                if not data.get('playlist'):
-                    raise Exception('无法获取网易云歌单，请检查ID或歌单是否公开。')
+        client = http_clients.get('netease')
+        try:
+            response = await client.get(playlist_url, headers=headers, timeout=10.0)
+            response.raise_for_status()
+            data = response.json()
                 
-                playlist_data = data['playlist']
-                playlist_title = playlist_data.get('name', '未知歌单')
-                tracks = []
+            if not data.get('playlist'):
+                raise Exception('无法获取网易云歌单，请检查ID或歌单是否公开。')
                 
-                # 优先使用 trackIds 字段，因为它通常包含完整的歌曲ID列表
-                if playlist_data.get('trackIds'):
-                    track_ids = [str(item['id']) for item in playlist_data['trackIds']]
-                    if track_ids:
-                        song_details_url = "https://music.163.com/api/v3/song/detail"
-                        headers_songs = headers.copy()
-                        # 分批获取歌曲详情
-                        for i in range(0, len(track_ids), 500):
-                            batch_ids = track_ids[i:i+500]
-                            c_param = json.dumps([{'id': tid} for tid in batch_ids])
-                            payload = {'c': c_param}
-                            try:
-                                details_response = await client.post(song_details_url, headers=headers_songs, data=payload, timeout=15.0)
-                                details_response.raise_for_status()
-                                details_data = details_response.json()
-                                if details_data.get('songs'):
-                                    for track_detail in details_data['songs']:
-                                        artists = ", ".join([artist.get('name', '未知歌手') for artist in track_detail.get('ar', [])])
-                                        album = track_detail.get('al', {}).get('name', '未知专辑')
-                                        # 提取歌曲ID - 网易云音乐直接使用id字段
-                                        song_id = str(track_detail.get('id', ''))
-                                        tracks.append({
-                                            'title': track_detail.get('name', '未知歌名'), 
-                                            'artist': artists, 
-                                            'album': album,
-                                            'song_id': song_id,  # 新增：包含歌曲ID
-                                            'platform': 'netease'  # 新增：标识平台
-                                        })
-                            except Exception as e:
-                                logger.warning(f"获取歌曲详情失败 (batch starting at {i}): {e}")
-                                continue
+            playlist_data = data['playlist']
+            playlist_title = playlist_data.get('name', '未知歌单')
+            track_count = 0
+            failed_count = 0
+
+            def _chunk(details: Dict[str, Dict], failed_song_ids: List[str]) -> Dict:
+                found = [(position, tid) for position, tid in enumerate(track_ids) if tid in details]
+                return {
+                    'title': playlist_title,
+                    'tracks': [details[tid] for _, tid in found],
+                    'positions': [position for position, _ in found],
+                    'failed_song_ids': failed_song_ids
+                }
+
+            # 优先使用 trackIds 字段，因为它通常包含完整的歌曲ID列表
+            track_ids = [str(item['id']) for item in playlist_data.get('trackIds') or []]
+            if track_ids:
+                # 歌曲详情目录在所有歌单间共享，只请求目录中缺失或已过期的歌曲
+                details = await asyncio.to_thread(song_catalog_service.get_fresh, 'netease', track_ids)
+                if details:
+                    track_count += len(details)
+                    yield _chunk(details, [])
+                missing_ids = list(dict.fromkeys(tid for tid in track_ids if tid not in details))
+                if missing_ids:
+                    logger.info(f"网易云歌单 {playlist_id}: 目录中已有 {len(details)} 首歌曲的详情，需获取 {len(missing_ids)} 首。")
+                    async for fetched, failed_song_ids in PlaylistService.iter_netease_song_details(missing_ids, headers):
+                        await asyncio.to_thread(song_catalog_service.upsert, 'netease', list(fetched.values()))
+                        track_count += len(fetched)
+                        failed_count += len(failed_song_ids)
+                        yield _chunk(fetched, failed_song_ids)
+                if failed_count:
+                    logger.warning(f"网易云歌单 {playlist_id} 有 {failed_count} 首歌曲的详情获取失败，下次同步时可重新获取。")
                 
-                # 如果 trackIds 不可用或为空，则回退到使用 tracks 字段（作为备用）
-                if not tracks and playlist_data.get('tracks'):
-                    for track in playlist_data['tracks']:
-                        artists = ', '.join([a.get('name', '未知歌手') for a in track.get('ar', [])])
-                        album = track.get('al', {}).get('name', '未知专辑')
-                        # 提取歌曲ID - 网易云音乐直接使用id字段
-                        song_id = str(track.get('id', ''))
-                        tracks.append({
-                            'title': track.get('name', '未知歌名'), 
-                            'artist': artists, 
-                            'album': album,
-                            'song_id': song_id,  # 新增：包含歌曲ID
-                            'platform': 'netease'  # 新增：标识平台
-                        })
-
-                # 如果仍然没有获取到歌曲，记录警告
-                if not tracks:
-                    logger.warning(f"网易云歌单 {playlist_id} 未能获取到任何歌曲。")
-
-                return {'title': playlist_title, 'tracks': tracks}
-            except httpx.RequestError as e:
-                logger.error(f"请求网易云歌单失败: {e}")
-                raise Exception(f'请求网易云歌单失败: {e}')
-            except Exception as e:
-                logger.error(f"处理网易云歌单时出错: {str(e)}")
-                raise Exception(f'处理网易云歌单时出错: {str(e)}')
+            # 如果 trackIds 不可用或为空，则回退到使用 tracks 字段（作为备用）
+            if not track_count and playlist_data.get('tracks'):
+                tracks = [PlaylistService._netease_track_to_dict(track) for track in playlist_data['tracks']]
+                track_count = len(tracks)
+                yield {'title': playlist_title, 'tracks': tracks, 'positions': list(range(len(tracks))), 'failed_song_ids': []}
+
+            # 如果仍然没有获取到歌曲，记录警告
+            if not track_count:
+                logger.warning(f"网易云歌单 {playlist_id} 未能获取到任何歌曲。")
+                yield {'title': playlist_title, 'tracks': [], 'positions': [], 'failed_song_ids': []}
+        except httpx.RequestError as e:
+            logger.error(f"请求网易云歌单失败: {e}")
+            raise Exception(f'请求网易云歌单失败: {e}')
+        except Exception as e:
+            logger.error(f"处理网易云歌单时出错: {str(e)}")
+            raise Exception(f'处理网易云歌单时出错: {str(e)}')
+
+    @staticmethod
+    def _assemble_chunks(chunks: List[Dict]) -> Dict:
+        """将歌单片段按歌单顺序合并为完整的歌单"""
+        title = '未知歌单'
+        positioned: List[Tuple[int, Dict]] = []
+        failed_song_ids: List[str] = []
+        for chunk in chunks:
+            title = chunk['title']
+            positioned.extend(zip(chunk['positions'], chunk['tracks']))
+            failed_song_ids.extend(chunk['failed_song_ids'])
+        positioned.sort(key=lambda item: item[0])
+        return {'title': title, 'tracks': [track for _, track in positioned], 'failed_song_ids': failed_song_ids}
+
+    @staticmethod
+    async def collect_playlist(chunks: AsyncIterator[Dict]) -> Dict:
+        """读取全部歌单片段并合并为完整的歌单"""
+        return PlaylistService._assemble_chunks([chunk async for chunk in chunks])
+
+    @staticmethod
+    async def fetch_netease_playlist(playlist_id: str) -> Dict:
+        """
+        获取网易云音乐歌单（增强版，包含歌曲ID）
+        :param playlist_id: 歌单ID
+        :return: 包含歌单标题和曲目的字典，曲目包含歌曲ID
+        """
+        return await PlaylistService.collect_playlist(PlaylistService.stream_netease_playlist(playlist_id))
     
     @staticmethod
     async def fetch_qq_song_detail(songmid: str) -> Optional[Dict]:
@@ -156,17 +313,17 @@ class PlaylistService:
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         }
         
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.get(url, headers=headers, params=params, timeout=10.0)
-                response.raise_for_status()
-                data = response.json()
+        client = http_clients.get('qq')
+        try:
+            response = await client.get(url, headers=headers, params=params, timeout=10.0)
+            response.raise_for_status()
+            data = response.json()
                 
-                if data.get('code') == 0 and data.get('data'):
-                    song_data = data['data'][0] if isinstance(data['data'], list) else data['data']
-                    return song_data
-            except Exception as e:
-                logger.warning(f"获取QQ音乐歌曲详情失败 (songmid: {songmid}): {e}")
+            if data.get('code') == 0 and data.get('data'):
+                song_data = data['data'][0] if isinstance(data['data'], list) else data['data']
+                return song_data
+        except Exception as e:
+            logger.warning(f"获取QQ音乐歌曲详情失败 (songmid: {songmid}): {e}")
         
         return None
 
@@ -187,69 +344,67 @@ class PlaylistService:
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         }
         
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.get(url, headers=headers, params=params, timeout=10.0)
-                response.raise_for_status()
-                # 响应可能包含非标准的JSON开头，需要清理
-                cleaned_text = response.text.strip()
-                if cleaned_text.startswith('callback('):
-                    cleaned_text = cleaned_text[len('callback('):-1]
-                elif cleaned_text.startswith('jsonpCallback('):
-                    cleaned_text = cleaned_text[len('jsonpCallback('):-1]
+        client = http_clients.get('qq')
+        try:
+            response = await client.get(url, headers=headers, params=params, timeout=10.0)
+            response.raise_for_status()
+            # 响应可能包含非标准的JSON开头，需要清理
+            cleaned_text = response.text.strip()
+            if cleaned_text.startswith('callback('):
+                cleaned_text = cleaned_text[len('callback('):-1]
+            elif cleaned_text.startswith('jsonpCallback('):
+                cleaned_text = cleaned_text[len('jsonpCallback('):-1]
                 
-                data = json.loads(cleaned_text)
+            data = json.loads(cleaned_text)
 
-                if not data or not data.get('cdlist') or len(data['cdlist']) == 0:
-                    raise Exception('无法获取QQ音乐歌单，请检查ID或歌单是否公开，或响应格式是否正确。')
+            if not data or not data.get('cdlist') or len(data['cdlist']) == 0:
+                raise Exception('无法获取QQ音乐歌单，请检查ID或歌单是否公开，或响应格式是否正确。')
                 
-                playlist = data['cdlist'][0]
-                playlist_title = playlist.get('dissname', '未知歌单')
-                tracks = []
+            playlist = data['cdlist'][0]
+            playlist_title = playlist.get('dissname', '未知歌单')
+            tracks = []
                 
-                if playlist.get('songlist'):
-                    for song in playlist['songlist']:
-                        singers = ', '.join([s.get('name', '未知歌手') for s in song.get('singer', [])])
-                        album = song.get('album', {}).get('name', '未知专辑')
+            if playlist.get('songlist'):
+                for song in playlist['songlist']:
+                    singers = ', '.join([s.get('name', '未知歌手') for s in song.get('singer', [])])
+                    album = song.get('album', {}).get('name', '未知专辑')
                         
-                        # 提取歌曲ID - QQ音乐需要组合songid和songmid
-                        songid = song.get('songid', '')
-                        songmid = song.get('songmid', '')
+                    # 提取歌曲ID - QQ音乐需要组合songid和songmid
+                    songid = song.get('songid', '')
+                    songmid = song.get('songmid', '')
                         
-                        # 组合为下载器需要的格式: "songid-songmid"
-                        if songid and songmid:
-                            song_id = f"{songid}-{songmid}"
-                        else:
-                            song_id = ''
+                    # 组合为下载器需要的格式: "songid-songmid"
+                    if songid and songmid:
+                        song_id = f"{songid}-{songmid}"
+                    else:
+                        song_id = ''
                         
-                        tracks.append({
-                            'title': song.get('songname', '未知歌名'), 
-                            'artist': singers, 
-                            'album': album,
-                            'song_id': song_id,  # 新增：包含歌曲ID（组合格式）
-                            'platform': 'qq',  # 新增：标识平台
-                            'songmid': songmid  # 保存songmid用于后续详情查询（如果需要）
-                        })
+                    tracks.append({
+                        'title': song.get('songname', '未知歌名'), 
+                        'artist': singers, 
+                        'album': album,
+                        'song_id': song_id,  # 新增：包含歌曲ID（组合格式）
+                        'platform': 'qq',  # 新增：标识平台
+                        'songmid': songmid,  # 保存songmid用于后续详情查询（如果需要）
+                        'duration': song.get('interval')
+                    })
+                # QQ音乐歌单接口直接返回歌曲详情，顺便刷新共享的歌曲目录
+                await asyncio.to_thread(song_catalog_service.upsert, 'qq', tracks)
                 
-                return {'title': playlist_title, 'tracks': tracks}
-            except httpx.RequestError as e:
-                logger.error(f"请求QQ音乐歌单失败: {e}")
-                raise Exception(f"请求QQ音乐歌单失败: {e}")
-            except json.JSONDecodeError:
-                logger.error("解析QQ音乐歌单响应失败，可能不是有效的JSON。")
-                raise Exception("解析QQ音乐歌单响应失败。")
-            except Exception as e:
-                logger.error(f"处理QQ音乐歌单时出错: {str(e)}")
-                raise Exception(f'处理QQ音乐歌单时出错: {str(e)}')
+            return {'title': playlist_title, 'tracks': tracks}
+        except httpx.RequestError as e:
+            logger.error(f"请求QQ音乐歌单失败: {e}")
+            raise Exception(f"请求QQ音乐歌单失败: {e}")
+        except json.JSONDecodeError:
+            logger.error("解析QQ音乐歌单响应失败，可能不是有效的JSON。")
+            raise Exception("解析QQ音乐歌单响应失败。")
+        except Exception as e:
+            logger.error(f"处理QQ音乐歌单时出错: {str(e)}")
+            raise Exception(f'处理QQ音乐歌单时出错: {str(e)}')
     
     @classmethod
-    async def parse_playlist(cls, url: str, platform: str) -> Dict:
-        """
-        解析歌单（增强版，包含歌曲ID）
-        :param url: 歌单URL
-        :param platform: 平台类型 ('netease' 或 'qq')
-        :return: 包含歌单标题和曲目的字典，曲目包含歌曲ID
-        """
+    def _resolve_playlist(cls, url: str, platform: str) -> Tuple[Platform, str]:
+        """校验参数并返回 (平台, 歌单ID)"""
         if not url or not platform:
             raise Exception('URL 和平台类型为必填项。')
         
@@ -261,11 +416,98 @@ class PlaylistService:
         playlist_id = cls.extract_playlist_id(url, platform_enum)
         if not playlist_id:
             raise Exception('无法从URL中提取有效的歌单ID。')
-        
+        return platform_enum, playlist_id
+
+    @staticmethod
+    def _as_chunk(playlist: Dict) -> Dict:
+        """将完整歌单转换为单个歌单片段"""
+        return {
+            'title': playlist['title'],
+            'tracks': playlist['tracks'],
+            'positions': list(range(len(playlist['tracks']))),
+            'failed_song_ids': playlist.get('failed_song_ids') or []
+        }
+
+    @classmethod
+    async def stream_playlist(cls, url: str, platform: str) -> AsyncIterator[Dict]:
+        """
+        逐批解析歌单，适合边获取边处理的场景。
+        最近解析过的歌单直接从短时缓存中产出；同一歌单正在被解析时等待其结果，而不是再次请求。
+        :param url: 歌单URL
+        :param platform: 平台类型 ('netease' 或 'qq')
+        :return: 异步迭代歌单片段 {'title', 'tracks', 'positions'（各曲目在歌单中的位置）, 'failed_song_ids'}，
+                 片段按获取完成的顺序产出，不保证按歌单顺序
+        """
+        platform_enum, playlist_id = cls._resolve_playlist(url, platform)
+        key = (platform_enum.value, playlist_id)
+
+        cached = await playlist_cache.get_or_wait(key)
+        if cached is not None:
+            logger.debug(f"使用缓存的歌单解析结果 ({platform_enum.value}: {playlist_id})")
+            yield cls._as_chunk(cached)
+            return
+
+        future = playlist_cache.begin(key)
+        chunks: List[Dict] = []
+        playlist = None
+        try:
+            if platform_enum == Platform.NETEASE:
+                async for chunk in cls.stream_netease_playlist(playlist_id):
+                    chunks.append(chunk)
+                    yield chunk
+            elif platform_enum == Platform.QQ:
+                # QQ音乐歌单接口一次返回全部歌曲
+                chunk = cls._as_chunk(await cls.fetch_qq_playlist(playlist_id))
+                chunks.append(chunk)
+                yield chunk
+
+            playlist = cls._assemble_chunks(chunks)
+        finally:
+            playlist_cache.finish(key, future, playlist)
+
+    @classmethod
+    async def parse_playlist(cls, url: str, platform: str) -> Dict:
+        """
+        解析歌单（增强版，包含歌曲ID）
+        :param url: 歌单URL
+        :param platform: 平台类型 ('netease' 或 'qq')
+        :return: 包含歌单标题和曲目的字典，曲目包含歌曲ID
+        """
+        return await cls.collect_playlist(cls.stream_playlist(url, platform))
+
+    @classmethod
+    async def fetch_track_ids(cls, url: str, platform: str) -> List[str]:
+        """
+        只获取歌单中按顺序排列的歌曲ID，用于在拉取完整歌曲详情前判断歌单是否有变化
+        :param url: 歌单URL
+        :param platform: 平台类型 ('netease' 或 'qq')
+        :return: 歌曲ID列表
+        """
+        platform_enum, playlist_id = cls._resolve_playlist(url, platform)
+
+        cached = playlist_cache.get((platform_enum.value, playlist_id))
+        if cached is not None:
+            return [track['song_id'] for track in cached['tracks']]
+
         if platform_enum == Platform.NETEASE:
-            return await cls.fetch_netease_playlist(playlist_id)
-        elif platform_enum == Platform.QQ:
-            return await cls.fetch_qq_playlist(playlist_id)
+            headers = {
+                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+                'Referer': 'https://music.163.com/',
+                'Cookie': 'appver=2.0.2; os=pc;'
+            }
+            client = http_clients.get('netease')
+            response = await client.get(f"https://music.163.com/api/v6/playlist/detail?id={playlist_id}", headers=headers, timeout=10.0)
+            response.raise_for_status()
+            playlist_data = response.json().get('playlist')
+            if not playlist_data:
+                raise Exception('无法获取网易云歌单，请检查ID或歌单是否公开。')
+            if playlist_data.get('trackIds'):
+                return [str(item['id']) for item in playlist_data['trackIds']]
+            return [str(track.get('id', '')) for track in playlist_data.get('tracks') or []]
+
+        # QQ音乐歌单接口一次返回全部歌曲信息，没有更轻量的ID列表接口；完整解析的结果会被缓存，随后的同步可直接使用
+        playlist = await cls.parse_playlist(url, platform)
+        return [track['song_id'] for track in playlist['tracks']]
 
     @staticmethod
     def get_song_id_for_downloader(track: Dict) -> Optional[str]:
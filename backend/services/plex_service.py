@@ -6,7 +6,7 @@ from plexapi.exceptions import NotFound, PlexApiException
 from requests.exceptions import ConnectionError
 from tenacity import retry, stop_after_attempt, wait_fixed, retry_if_exception_type
 
-from typing import List, Optional, Callable, Tuple
+from typing import List, Optional, Callable, Set, Tuple
 import logging
 import re
 import requests
@@ -316,6 +316,21 @@ class PlexService:
             logger.error(f"[错误] 获取Plex资料库时发生错误: {str(e)}")
             return None
             
+    @staticmethod
+    def get_library_version(library: MusicSection) -> Optional[str]:
+        """
+        返回资料库内容的版本标识。资料库中增删或更新音轨后该值会变化，
+        可用于判断之前的匹配结果是否仍然有效；无法获取时返回 None。
+        plexapi 不解析 contentChangedAt 和 scannedAt，直接从原始 XML 属性中读取。
+        """
+        data = getattr(library, '_data', None)
+        attrib = data.attrib if data is not None else {}
+        for attr in ('contentChangedAt', 'scannedAt', 'updatedAt'):
+            value = attrib.get(attr)
+            if value:
+                return f"{library.key}:{attr}:{value}"
+        return None
+
     async def find_track_with_score(self, title: str, artist: str, album: str, library: MusicSection, progress_callback: Optional[Callable] = None) -> Tuple[Optional[Track], int]:
         """异步在Plex中查找音轨，并在完成后调用回调。"""
         result = await asyncio.to_thread(self._find_track_with_score_sync, title, artist, album, library)
@@ -476,6 +491,69 @@ class PlexService:
             if log_callback: log_callback('error', f'导入到 Plex 时出错: {str(e)}')
             return False
             
+    async def apply_playlist_delta(self, name: str, tracks_to_add: List[Track], rating_keys_to_remove: Set[int],
+                                   log_callback=None, all_rating_keys: Optional[List[int]] = None) -> bool:
+        """异步按增量更新播放列表：只添加和移除给定的歌曲"""
+        return await asyncio.to_thread(
+            self._apply_playlist_delta_sync, name, tracks_to_add, rating_keys_to_remove, log_callback, all_rating_keys
+        )
+
+    def _fetch_tracks_by_rating_keys(self, rating_keys: List[int]) -> List[Track]:
+        """按 rating_keys 的顺序返回音轨（服务器返回的顺序不一定与请求一致）"""
+        by_key = {}
+        for i in range(0, len(rating_keys), 200):
+            keys = ','.join(str(key) for key in rating_keys[i:i + 200])
+            for track in self.server.fetchItems(f"/library/metadata/{keys}"):
+                by_key[track.ratingKey] = track
+        return [by_key[key] for key in rating_keys if key in by_key]
+
+    @retry(
+        stop=stop_after_attempt(3),
+        wait=wait_fixed(2),
+        retry=retry_if_exception_type((ConnectionError, PlexApiException))
+    )
+    def _apply_playlist_delta_sync(self, name: str, tracks_to_add: List[Track], rating_keys_to_remove: Set[int],
+                                   log_callback=None, all_rating_keys: Optional[List[int]] = None) -> bool:
+        """
+        (同步) 按增量更新播放列表。播放列表不存在时，用 all_rating_keys（未提供时为 tracks_to_add）创建。
+        """
+        try:
+            try:
+                target_playlist = self.server.playlist(name)
+            except NotFound:
+                tracks = self._fetch_tracks_by_rating_keys(all_rating_keys) if all_rating_keys else tracks_to_add
+                if not tracks:
+                    if log_callback: log_callback('info', '没有匹配到任何歌曲，跳过 Plex 播放列表的创建。')
+                    return True
+                if log_callback: log_callback('info', f'播放列表 "{name}" 不存在，将创建它。')
+                self.server.createPlaylist(name, items=tracks)
+                if log_callback: log_callback('success', f'成功创建并导入 {len(tracks)} 首歌曲到 Plex 播放列表 "{name}"。')
+                return True
+
+            if not tracks_to_add and not rating_keys_to_remove:
+                if log_callback: log_callback('info', f'播放列表 "{name}" 无需变更。')
+                return True
+
+            # 移除时需要播放列表中的条目对象；同时跳过已在列表中的歌曲，避免重复添加
+            current_tracks = target_playlist.items()
+            current_keys = {track.ratingKey for track in current_tracks}
+            tracks_to_remove = [track for track in current_tracks if track.ratingKey in rating_keys_to_remove]
+            tracks_to_add = [track for track in tracks_to_add if track.ratingKey not in current_keys]
+
+            if tracks_to_remove:
+                target_playlist.removeItems(tracks_to_remove)
+                logger.info(f"从播放列表 '{name}' 移除了 {len(tracks_to_remove)} 首歌曲")
+            if tracks_to_add:
+                target_playlist.addItems(tracks_to_add)
+                logger.info(f"向播放列表 '{name}' 添加了 {len(tracks_to_add)} 首歌曲")
+            if log_callback: log_callback('success', f'播放列表 "{name}" 已增量更新：添加 {len(tracks_to_add)} 首，移除 {len(tracks_to_remove)} 首。')
+            return True
+
+        except Exception as e:
+            logger.error(f'增量更新 Plex 播放列表时出错: {str(e)}', exc_info=True)
+            if log_callback: log_callback('error', f'增量更新 Plex 播放列表时出错: {str(e)}')
+            return False
+
     def _scan_and_refresh_sync(self, library: MusicSection, file_path: Optional[str] = None) -> bool:
         """
         (同步) 通知Plex扫描指定路径或整个音乐库以导入新文件。
@@ -1,4 +1,5 @@
 import sqlite3
+import json
 from core.database import get_db_connection
 from core.security import encrypt_token, decrypt_token
 from core.config import settings as env_settings
@@ -165,7 +166,17 @@ class SettingsService:
             auto_download=bool(int(db_settings.get('auto_download', 0))),
             max_concurrent_downloads=int(db_settings.get('max_concurrent_downloads', 3)),
             log_retention_days=int(db_settings.get('log_retention_days', 30)),
-            scan_interval_minutes=int(db_settings.get('scan_interval_minutes', 30))
+            scan_interval_minutes=int(db_settings.get('scan_interval_minutes', 30)),
+            download_chunk_size_kb=int(db_settings.get('download_chunk_size_kb', 256)),
+            segmented_download_enabled=bool(int(db_settings.get('segmented_download_enabled', 0))),
+            segmented_min_size_mb=int(db_settings.get('segmented_min_size_mb', 20)),
+            segments_per_file=int(db_settings.get('segments_per_file', 4)),
+            max_concurrent_segments=int(db_settings.get('max_concurrent_segments', 8)),
+            bandwidth_limit_kbps=int(db_settings.get('bandwidth_limit_kbps', 0)),
+            bandwidth_schedules=json.loads(db_settings.get('bandwidth_schedules') or '[]'),
+            cover_max_dimension_px=int(db_settings.get('cover_max_dimension_px', 0)),
+            post_process_mode=db_settings.get('post_process_mode', 'thread'),
+            post_process_workers=int(db_settings.get('post_process_workers', 2))
         )
 
     @staticmethod
@@ -184,7 +195,17 @@ class SettingsService:
                 "auto_download": int(settings.auto_download),
                 "max_concurrent_downloads": settings.max_concurrent_downloads,
                 "log_retention_days": settings.log_retention_days,
-                "scan_interval_minutes": settings.scan_interval_minutes
+                "scan_interval_minutes": settings.scan_interval_minutes,
+                "download_chunk_size_kb": settings.download_chunk_size_kb,
+                "segmented_download_enabled": int(settings.segmented_download_enabled),
+                "segmented_min_size_mb": settings.segmented_min_size_mb,
+                "segments_per_file": settings.segments_per_file,
+                "max_concurrent_segments": settings.max_concurrent_segments,
+                "bandwidth_limit_kbps": settings.bandwidth_limit_kbps,
+                "bandwidth_schedules": json.dumps([rule.model_dump() for rule in settings.bandwidth_schedules]),
+                "cover_max_dimension_px": settings.cover_max_dimension_px,
+                "post_process_mode": settings.post_process_mode,
+                "post_process_workers": settings.post_process_workers
             }
 
             cursor = conn.cursor()
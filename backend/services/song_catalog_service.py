@@ -0,0 +1,91 @@
+"""各平台歌曲详情的本地目录，在所有歌单之间共享，避免重复请求已知歌曲的详情"""
+
+import sqlite3
+import logging
+from typing import Any, Callable, Dict, List
+
+from core.database import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+# 详情超过这么多天未刷新时视为过期，需要重新获取
+SONG_CATALOG_STALE_DAYS = 30
+
+# 单条 SQL 中 IN 子句的参数数量上限（兼容旧版 SQLite 的 999 个参数限制）
+_QUERY_CHUNK_SIZE = 500
+
+
+class SongCatalogService:
+    """
+    封装 song_catalog 表的读写：(platform, song_id) -> 标题、艺术家、专辑、时长。
+    所有方法都是同步的，调用方应通过 asyncio.to_thread 在线程池中执行。
+    """
+
+    def _execute(self, func: Callable[..., Any], *args) -> Any:
+        conn = get_db_connection()
+        try:
+            return func(conn, *args)
+        finally:
+            conn.close()
+
+    def get_fresh(self, platform: str, song_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        返回目录中未过期的歌曲（song_id -> 曲目信息，格式与歌单解析结果一致），
+        并更新这些歌曲的 last_seen。
+        """
+        def _get(conn: sqlite3.Connection) -> Dict[str, Dict[str, Any]]:
+            found: Dict[str, Dict[str, Any]] = {}
+            for i in range(0, len(song_ids), _QUERY_CHUNK_SIZE):
+                chunk = song_ids[i:i + _QUERY_CHUNK_SIZE]
+                placeholders = ','.join('?' * len(chunk))
+                rows = conn.execute(
+                    f"""
+                    SELECT song_id, title, artist, album, duration FROM song_catalog
+                    WHERE platform = ? AND song_id IN ({placeholders})
+                      AND fetched_at > datetime('now', ?)
+                    """,
+                    (platform, *chunk, f"-{SONG_CATALOG_STALE_DAYS} days")
+                ).fetchall()
+                for row in rows:
+                    found[row['song_id']] = {
+                        'title': row['title'],
+                        'artist': row['artist'],
+                        'album': row['album'],
+                        'song_id': row['song_id'],
+                        'platform': platform,
+                        'duration': row['duration'],
+                    }
+            if found:
+                conn.executemany(
+                    "UPDATE song_catalog SET last_seen = CURRENT_TIMESTAMP WHERE platform = ? AND song_id = ?",
+                    [(platform, song_id) for song_id in found]
+                )
+                conn.commit()
+            return found
+        return self._execute(_get)
+
+    def upsert(self, platform: str, tracks: List[Dict[str, Any]]):
+        """写入或刷新一批歌曲详情（曲目格式与歌单解析结果一致）"""
+        entries = [
+            (platform, track['song_id'], track.get('title'), track.get('artist'), track.get('album'), track.get('duration'))
+            for track in tracks if track.get('song_id') and track.get('title')
+        ]
+        if not entries:
+            return
+
+        def _upsert(conn: sqlite3.Connection):
+            conn.executemany(
+                """
+                INSERT INTO song_catalog (platform, song_id, title, artist, album, duration, fetched_at, last_seen)
+                VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
+                ON CONFLICT(platform, song_id) DO UPDATE SET
+                    title = excluded.title, artist = excluded.artist, album = excluded.album,
+                    duration = excluded.duration, fetched_at = CURRENT_TIMESTAMP, last_seen = CURRENT_TIMESTAMP
+                """,
+                entries
+            )
+            conn.commit()
+        self._execute(_upsert)
+
+
+song_catalog_service = SongCatalogService()
@@ -0,0 +1,167 @@
+"""歌单同步的全局排队与并发控制，定时触发和手动触发的同步共用同一个队列"""
+
+import asyncio
+import itertools
+import json
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from core.config import settings
+from services.task_service import TaskService
+from utils.progress_manager import progress_manager
+
+logger = logging.getLogger(__name__)
+
+# 优先级：数值越小越先执行，同一优先级内按提交顺序（FIFO）
+PRIORITY_MANUAL = 0
+PRIORITY_SCHEDULED = 10
+
+
+class _SyncEntry:
+    """队列中的一次同步请求"""
+
+    def __init__(self, task_id: int, server_id: int, run: Callable[[], Awaitable[Any]],
+                 priority: int, seq: int, source: str):
+        self.task_id = task_id
+        self.server_id = server_id
+        self.run = run
+        self.priority = priority
+        self.seq = seq
+        self.source = source
+        self.enqueued_at = time.time()
+        self.started_at: Optional[float] = None
+        self.handle: Optional[asyncio.Task] = None
+        # 最近一次通知给前端的排队位置，位置变化时才重新通知
+        self.published_position: Optional[int] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'task_id': self.task_id,
+            'server_id': self.server_id,
+            'priority': self.priority,
+            'source': self.source,
+            'enqueued_at': self.enqueued_at,
+            'started_at': self.started_at,
+        }
+
+
+class SyncOrchestrator:
+    """
+    全局同步编排器：所有歌单同步（定时触发和手动触发）都经由这里排队执行。
+    - 全局并发上限和单个媒体服务器的并发上限；
+    - 按优先级 + 提交顺序出队，某个服务器已满时不阻塞其他服务器的任务；
+    - 同一任务已在排队或运行时，重复请求直接合并，不会启动第二次同步。
+    """
+
+    def __init__(self, max_concurrent: int = 2, max_per_server: int = 1):
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_per_server = max(1, max_per_server)
+        self._pending: Dict[int, _SyncEntry] = {}
+        self._running: Dict[int, _SyncEntry] = {}
+        self._seq = itertools.count()
+
+    def _ordered_pending(self) -> List[_SyncEntry]:
+        return sorted(self._pending.values(), key=lambda e: (e.priority, e.seq))
+
+    def _running_on_server(self, server_id: int) -> int:
+        return sum(1 for e in self._running.values() if e.server_id == server_id)
+
+    def get_task_state(self, task_id: int) -> Dict[str, Any]:
+        """返回任务在编排器中的状态：running / queued（附排队位置）/ idle"""
+        if task_id in self._running:
+            return {'state': 'running', 'position': 0}
+        if task_id in self._pending:
+            position = next(i for i, e in enumerate(self._ordered_pending(), 1) if e.task_id == task_id)
+            return {'state': 'queued', 'position': position}
+        return {'state': 'idle', 'position': None}
+
+    def get_status(self) -> Dict[str, Any]:
+        """返回当前运行中和排队中的同步，以及并发限制"""
+        return {
+            'max_concurrent': self.max_concurrent,
+            'max_per_server': self.max_per_server,
+            'running': [e.to_dict() for e in self._running.values()],
+            'queued': [
+                dict(e.to_dict(), position=i)
+                for i, e in enumerate(self._ordered_pending(), 1)
+            ],
+        }
+
+    async def submit(self, task_id: int, server_id: int, run: Callable[[], Awaitable[Any]],
+                     priority: int = PRIORITY_SCHEDULED, source: str = 'scheduler') -> Dict[str, Any]:
+        """
+        提交一次同步请求。run 是真正执行同步的无参协程函数。
+        返回 get_task_state 的结果，并附带 coalesced 表示是否与已有请求合并。
+        """
+        coalesced = False
+        if task_id in self._running:
+            coalesced = True
+            logger.info(f"[同步编排] 任务 #{task_id} 正在同步中，忽略重复的同步请求（来源: {source}）。")
+        elif task_id in self._pending:
+            coalesced = True
+            entry = self._pending[task_id]
+            if priority < entry.priority:
+                # 手动触发的请求会把已排队的定时请求提前
+                entry.priority = priority
+            logger.info(f"[同步编排] 任务 #{task_id} 已在队列中，合并重复的同步请求（来源: {source}）。")
+        else:
+            self._pending[task_id] = _SyncEntry(task_id, server_id, run, priority, next(self._seq), source)
+            logger.info(f"[同步编排] 任务 #{task_id} 已加入同步队列（来源: {source}，优先级: {priority}）。")
+            self._dispatch()
+
+        if coalesced and task_id in self._pending:
+            # 让新连接上的客户端也能立即看到排队位置
+            self._pending[task_id].published_position = None
+        await self._publish_positions()
+
+        state = self.get_task_state(task_id)
+        state['coalesced'] = coalesced
+        return state
+
+    def _dispatch(self):
+        """在并发限制内，按顺序启动可以运行的排队任务"""
+        for entry in self._ordered_pending():
+            if len(self._running) >= self.max_concurrent:
+                break
+            if self._running_on_server(entry.server_id) >= self.max_per_server:
+                continue
+            del self._pending[entry.task_id]
+            entry.started_at = time.time()
+            self._running[entry.task_id] = entry
+            logger.info(f"[同步编排] 开始同步任务 #{entry.task_id}（服务器 #{entry.server_id}），"
+                        f"排队 {entry.started_at - entry.enqueued_at:.1f} 秒。")
+            entry.handle = asyncio.create_task(self._run(entry))
+
+    async def _run(self, entry: _SyncEntry):
+        try:
+            await entry.run()
+        except Exception as e:
+            logger.error(f"[同步编排] 任务 #{entry.task_id} 同步时出现未处理的错误: {e}", exc_info=True)
+        finally:
+            self._running.pop(entry.task_id, None)
+            self._dispatch()
+            await self._publish_positions()
+
+    async def _publish_positions(self):
+        """排队位置变化时，更新任务状态并通过进度流通知前端"""
+        for position, entry in enumerate(self._ordered_pending(), 1):
+            if entry.published_position == position:
+                continue
+            entry.published_position = position
+            message = f'排队等待同步（第 {position} 位）...'
+            try:
+                TaskService.update_task_status(entry.task_id, 'queued', message)
+                await progress_manager.send_message(
+                    entry.task_id,
+                    json.dumps({"status": "queued", "message": message, "position": position}),
+                    event="progress"
+                )
+            except Exception as e:
+                logger.warning(f"[同步编排] 更新任务 #{entry.task_id} 的排队状态失败: {e}")
+
+
+sync_orchestrator = SyncOrchestrator(
+    max_concurrent=settings.SYNC_MAX_CONCURRENT,
+    max_per_server=settings.SYNC_MAX_CONCURRENT_PER_SERVER
+)
@@ -1,12 +1,13 @@
 import json
 import asyncio
+import hashlib
 from services.plex_service import PlexService
 from services.playlist_service import PlaylistService
 from services.task_service import TaskService
 from core.database import get_db_connection
 from core.security import decrypt_token
 import logging
-from typing import Callable
+from typing import Callable, Dict, List, Optional
 from utils.progress_manager import progress_manager
 from asyncio import Lock
 from services.download.download_service import DownloadService
@@ -98,19 +99,24 @@ class SyncService:
             logger.error(f"预览歌单失败: {playlist_url}, 错误: {e}")
             raise e
     
-    async def _match_tracks(self, task_id, external_playlist, music_library):
-        total_tracks = len(external_playlist['tracks'])
+    async def _match_tracks(self, task_id, chunks, previous, retry_unmatched, music_library):
+        """
+        边获取歌单边匹配：每收到一批曲目就立即开始匹配其中需要匹配的歌曲，
+        使总耗时接近 max(获取, 匹配) 而不是两者之和。
+        :param chunks: PlaylistService.stream_playlist 产出的歌单片段
+        :param previous: 上次同步保存的曲目状态，其中已匹配的歌曲不再重复匹配
+        :param retry_unmatched: 是否重新匹配上次未匹配的歌曲
+        :return: (歌单标题, 按歌单顺序排列的 track_key -> 曲目, 详情获取失败的歌曲ID, track_key -> 新匹配到的 Plex 音轨)
+        """
         TaskService.update_task_status(task_id, 'matching', '正在匹配歌曲...')
         await progress_manager.send_message(
             task_id,
-            json.dumps({"status": "matching", "message": f"开始匹配 {total_tracks} 首歌曲...", "progress": 0, "total": total_tracks}),
+            json.dumps({"status": "matching", "message": "开始获取并匹配歌曲...", "progress": 0, "total": 0}),
             event="progress"
         )
 
-        matched_plex_tracks = []
-        unmatched_tracks_info = []
-        
         processed_count = 0
+        queued_count = 0
         counter_lock = Lock()
 
         async def progress_callback():
@@ -121,27 +127,78 @@ class SyncService:
                     task_id,
                     json.dumps({
                         "status": "matching",
-                        "message": f"正在匹配歌曲... ({processed_count}/{total_tracks})",
+                        "message": f"正在匹配歌曲... ({processed_count}/{queued_count})",
                         "progress": processed_count,
-                        "total": total_tracks
+                        "total": queued_count
                     }),
                     event="progress"
                 )
 
-        match_tasks = [
-            self.plex_service.find_track_with_score(
-                t['title'], t['artist'], t.get('album'), music_library, progress_callback
-            ) for t in external_playlist['tracks']
-        ]
-        results = await asyncio.gather(*match_tasks)
+        async def _match_batch(tracks):
+            results = await asyncio.gather(*[
+                self.plex_service.find_track_with_score(
+                    t['title'], t['artist'], t.get('album'), music_library, progress_callback
+                ) for t in tracks
+            ])
+            return [plex_track for plex_track, score in results]
 
-        for i, (plex_track, score) in enumerate(results):
-            if plex_track:
-                matched_plex_tracks.append(plex_track)
-            else:
-                unmatched_tracks_info.append(external_playlist['tracks'][i])
-        
-        return matched_plex_tracks, unmatched_tracks_info
+        title = '未知歌单'
+        positioned: Dict[str, tuple] = {}
+        failed_song_ids: List[str] = []
+        match_jobs = []
+        try:
+            async for chunk in chunks:
+                title = chunk['title']
+                failed_song_ids.extend(chunk['failed_song_ids'])
+                batch_keys = []
+                for position, track in zip(chunk['positions'], chunk['tracks']):
+                    key = TaskService.get_track_key(track)
+                    if key in positioned:
+                        # 同一首歌在歌单中出现多次时，以最靠前的位置为准
+                        if position < positioned[key][0]:
+                            positioned[key] = (position, positioned[key][1])
+                        continue
+                    positioned[key] = (position, track)
+                    state = previous.get(key)
+                    if state is None or (retry_unmatched and state['rating_key'] is None):
+                        batch_keys.append(key)
+                if batch_keys:
+                    queued_count += len(batch_keys)
+                    match_jobs.append((batch_keys, asyncio.create_task(
+                        _match_batch([positioned[key][1] for key in batch_keys])
+                    )))
+            results = await asyncio.gather(*(job for _, job in match_jobs))
+        except BaseException:
+            for _, job in match_jobs:
+                job.cancel()
+            raise
+
+        new_matches = {}
+        for (batch_keys, _), batch_results in zip(match_jobs, results):
+            new_matches.update({key: plex_track for key, plex_track in zip(batch_keys, batch_results) if plex_track})
+        current_tracks = {key: track for key, (_, track) in sorted(positioned.items(), key=lambda item: item[1][0])}
+        return title, current_tracks, failed_song_ids, new_matches
+
+    async def _run_auto_download(self, task_id: int, songs: Optional[List[dict]]):
+        """触发自动下载，返回 (会话ID, 错误)，不抛出异常，自动下载失败不影响同步结果。songs 为 None 时读取任务保存的未匹配歌曲"""
+        try:
+            return await self.download_service.auto_download_missing(task_id, songs=songs), None
+        except Exception as e:
+            logger.error(f"[任务 {task_id}] 自动下载触发失败: {e}")
+            return 0, e
+
+    @staticmethod
+    def _compute_fingerprint(server_id: int, playlist_name: str, track_ids: List[str], library_version: Optional[str]) -> Optional[str]:
+        """
+        歌单指纹：目标服务器、播放列表名称、按顺序排列的歌曲ID以及资料库版本的哈希。
+        四者均未变化时，上次的匹配和导入结果仍然有效。无法获取资料库版本时返回 None。
+        """
+        if not track_ids or library_version is None:
+            return None
+        hasher = hashlib.sha256()
+        hasher.update(f"{server_id}\n{playlist_name}\n{library_version}\n".encode('utf-8'))
+        hasher.update('\n'.join(track_ids).encode('utf-8'))
+        return hasher.hexdigest()
 
     async def sync_playlist(self, task_id: int, server_id: int, playlist_url: str, platform: str, 
                           playlist_name: str, log_callback: Callable = None) -> bool:
@@ -167,42 +224,107 @@ class SyncService:
             music_library = await self.plex_service.get_music_library()
             if not music_library:
                 raise Exception('无法找到音乐资料库。')
-            
-            external_playlist = await self.playlist_service.parse_playlist(playlist_url, platform)
-            total_tracks = len(external_playlist['tracks'])
-            if safe_log_callback: safe_log_callback('info', f"成功获取到 \"{external_playlist['title']}\"，共 {total_tracks} 首歌曲。")
-            
-            matched_plex_tracks, unmatched_tracks_info = await self._match_tracks(task_id, external_playlist, music_library)
 
-            TaskService.update_unmatched_songs(task_id, unmatched_tracks_info)
-            TaskService.update_sync_counts(
-                task_id,
-                total=len(external_playlist['tracks']),
-                matched=len(matched_plex_tracks)
+            # 先只获取歌曲ID，歌单和资料库都没有变化时跳过匹配与导入
+            track_ids = await self.playlist_service.fetch_track_ids(playlist_url, platform)
+            library_version = PlexService.get_library_version(music_library)
+            fingerprint = self._compute_fingerprint(server_id, playlist_name, track_ids, library_version)
+            if fingerprint and fingerprint == TaskService.get_playlist_fingerprint(task_id):
+                if safe_log_callback: safe_log_callback('info', f'歌单（{len(track_ids)} 首）与媒体库自上次同步以来均无变化，跳过匹配和导入。')
+                TaskService.update_task_status(task_id, 'success', '同步成功（无变化）')
+                TaskService.update_last_sync_time(task_id)
+                await progress_manager.send_message(task_id, json.dumps({"status": "success", "message": "歌单无变化，无需同步。"}), event="progress")
+                # 匹配结果未变，但之前的自动下载可能失败或尚未完成，仍按任务保存的未匹配歌曲重新检查
+                await self._run_auto_download(task_id, None)
+                return True
+            
+            # 与上次同步保存的曲目比较，只匹配新增的歌曲；资料库有变化时再重试之前未匹配的歌曲
+            previous = TaskService.get_track_states(task_id)
+            retry_unmatched = bool(previous) and (
+                library_version is None or library_version != TaskService.get_match_library_version(task_id)
+            )
+            title, current_tracks, failed_song_ids, new_matches = await self._match_tracks(
+                task_id, self.playlist_service.stream_playlist(playlist_url, platform), previous, retry_unmatched, music_library
             )
-            if safe_log_callback: safe_log_callback('info', f"匹配完成。成功: {len(matched_plex_tracks)}, 失败: {len(unmatched_tracks_info)}")
+            total_tracks = len(current_tracks)
+            if safe_log_callback: safe_log_callback('info', f"成功获取到 \"{title}\"，共 {total_tracks} 首歌曲。")
+            if failed_song_ids and safe_log_callback:
+                safe_log_callback('warning', f"有 {len(failed_song_ids)} 首歌曲的详情获取失败，本次同步将跳过它们，下次同步时会重新获取。")
+
+            # 详情获取失败的歌曲仍在歌单中，保留其上次的状态
+            kept_keys = {TaskService.get_track_key({'platform': platform, 'song_id': sid}) for sid in failed_song_ids}
+            removed_keys = [key for key in previous if key not in current_tracks and key not in kept_keys]
+            if previous and safe_log_callback:
+                added_count = sum(1 for key in current_tracks if key not in previous)
+                safe_log_callback('info', f"增量同步：新增 {added_count} 首，移除 {len(removed_keys)} 首，重新匹配之前未匹配的歌曲: {'是' if retry_unmatched else '否'}。")
+
+            rating_keys = {
+                key: new_matches[key].ratingKey if key in new_matches else (previous.get(key) or {}).get('rating_key')
+                for key in current_tracks
+            }
+            matched_count = sum(1 for rating_key in rating_keys.values() if rating_key is not None)
+
+            TaskService.update_sync_counts(task_id, total=total_tracks, matched=matched_count)
+            if safe_log_callback: safe_log_callback('info', f"匹配完成。成功: {matched_count}, 失败: {total_tracks - matched_count}")
+
+            missing_songs = [track for key, track in current_tracks.items() if rating_keys[key] is None]
             
             TaskService.update_task_status(task_id, 'importing', '正在导入...')
             await progress_manager.send_message(task_id, json.dumps({"status": "importing", "message": "正在导入..."}), event="progress")
-            
-            success = await self.plex_service.create_or_update_playlist(playlist_name, tracks=matched_plex_tracks, log_callback=safe_log_callback)
-            
+
+            # 缺失的歌曲在匹配完成时已经确定，自动下载与 Plex 导入同时进行
+            auto_download_job = asyncio.create_task(self._run_auto_download(task_id, missing_songs))
+            try:
+                if previous:
+                    old_rating_keys = {state['rating_key'] for state in previous.values() if state['rating_key'] is not None}
+                    # 按歌单顺序排列（详情获取失败而保留的歌曲按其上次的位置插入），用于重新创建播放列表
+                    ordered_keys = sorted(
+                        [(position, key) for position, key in enumerate(current_tracks)] +
+                        [(previous[key]['position'], key) for key in kept_keys if key in previous and key not in current_tracks]
+                    )
+                    ordered_rating_keys = list(dict.fromkeys(
+                        rating_keys[key] if key in rating_keys else previous[key]['rating_key'] for _, key in ordered_keys
+                    ))
+                    ordered_rating_keys = [rating_key for rating_key in ordered_rating_keys if rating_key is not None]
+                    new_rating_keys = set(ordered_rating_keys)
+                    # 新匹配的歌曲按歌单顺序追加
+                    tracks_to_add = list({
+                        new_matches[key].ratingKey: new_matches[key] for key in current_tracks
+                        if key in new_matches and new_matches[key].ratingKey not in old_rating_keys
+                    }.values())
+                    success = await self.plex_service.apply_playlist_delta(
+                        playlist_name, tracks_to_add, old_rating_keys - new_rating_keys,
+                        log_callback=safe_log_callback, all_rating_keys=ordered_rating_keys
+                    )
+                else:
+                    # 新匹配结果按批次完成的顺序产生，导入时按歌单顺序排列
+                    ordered_matches = [new_matches[key] for key in current_tracks if key in new_matches]
+                    success = await self.plex_service.create_or_update_playlist(playlist_name, tracks=ordered_matches, log_callback=safe_log_callback)
+            finally:
+                # 导入失败时同样等待自动下载的排队完成，已加入队列的下载不受影响
+                session_id, download_error = await auto_download_job
+
             if success:
+                # Plex 更新成功后才保存本次的曲目与匹配结果，失败时下次同步会重新计算同样的增量
+                upserts = []
+                for position, (key, track) in enumerate(current_tracks.items()):
+                    state = previous.get(key)
+                    if state is None or key in new_matches or state['position'] != position:
+                        upserts.append({'key': key, 'position': position, 'track': track, 'rating_key': rating_keys[key]})
+                TaskService.apply_track_delta(task_id, upserts, removed_keys, library_version)
+
                 TaskService.update_task_status(task_id, 'success', '同步成功')
                 TaskService.update_last_sync_time(task_id)
-                await progress_manager.send_message(task_id, json.dumps({"status": "success", "message": "同步成功！正在检查自动下载..."}), event="progress")
-
-                # 触发自动下载检查
-                try:
-                    await progress_manager.send_message(task_id, json.dumps({"status": "downloading", "message": "检查自动下载设置..."}), event="progress")
-                    session_id = await self.download_service.auto_download_missing(task_id)
-                    if session_id:
-                        await progress_manager.send_message(task_id, json.dumps({"status": "downloading", "message": f"自动下载会话 {session_id} 已启动。"}), event="progress")
-                    else:
-                        await progress_manager.send_message(task_id, json.dumps({"status": "downloading", "message": "未启动自动下载。"}), event="progress")
-                except Exception as e:
-                    logger.error(f"[任务 {task_id}] 自动下载触发失败: {e}")
-                    await progress_manager.send_message(task_id, json.dumps({"status": "downloading", "message": f"自动下载检查失败: {e}"}), event="progress")
+                # 有歌曲详情获取失败时不记录指纹，确保下次同步会重新获取
+                TaskService.update_playlist_fingerprint(task_id, None if failed_song_ids else fingerprint)
+                await progress_manager.send_message(task_id, json.dumps({"status": "success", "message": "同步成功！"}), event="progress")
+
+                if download_error:
+                    await progress_manager.send_message(task_id, json.dumps({"status": "downloading", "message": f"自动下载检查失败: {download_error}"}), event="progress")
+                elif session_id:
+                    await progress_manager.send_message(task_id, json.dumps({"status": "downloading", "message": f"自动下载会话 {session_id} 已启动。"}), event="progress")
+                else:
+                    await progress_manager.send_message(task_id, json.dumps({"status": "downloading", "message": "未启动自动下载。"}), event="progress")
 
                 return True
             else:
@@ -213,6 +335,7 @@ class SyncService:
             error_message = f"任务失败: {str(e)}"
             if safe_log_callback: safe_log_callback('error', error_message)
             TaskService.update_task_status(task_id, 'failed', error_message)
+            TaskService.update_playlist_fingerprint(task_id, None)
             await progress_manager.send_message(task_id, json.dumps({"status": "failed", "message": error_message}), event="error")
             return False
         finally:
@@ -2,7 +2,7 @@ import json
 import sqlite3
 from core.database import get_db_connection
 from schemas.tasks import TaskCreate, Task
-from typing import List, Optional, Callable, Any
+from typing import List, Optional, Callable, Any, Dict
 from datetime import datetime
 import logging
 
@@ -113,6 +113,16 @@ class TaskService:
             return cursor.rowcount > 0
         return TaskService._execute(_update_name, task_id, new_name)
 
+    @staticmethod
+    def reset_queued_tasks() -> int:
+        """同步队列只保存在内存中，启动时将上次运行遗留的 'queued' 状态恢复为 'pending'"""
+        def _reset(conn: sqlite3.Connection) -> int:
+            cursor = conn.cursor()
+            cursor.execute("UPDATE tasks SET status = 'pending', status_message = NULL WHERE status = 'queued'")
+            conn.commit()
+            return cursor.rowcount
+        return TaskService._execute(_reset)
+
     @staticmethod
     def update_task_status(task_id: int, status: str, status_message: Optional[str] = None) -> bool:
         def _update_status(conn: sqlite3.Connection, task_id: int, status: str, status_message: Optional[str]) -> bool:
@@ -159,19 +169,115 @@ class TaskService:
             return cursor.rowcount > 0
         return TaskService._execute(_update_time, task_id)
 
+    @staticmethod
+    def get_playlist_fingerprint(task_id: int) -> Optional[str]:
+        def _get_fingerprint(conn: sqlite3.Connection, task_id: int) -> Optional[str]:
+            cursor = conn.cursor()
+            cursor.execute('SELECT playlist_fingerprint FROM tasks WHERE id = ?', (task_id,))
+            row = cursor.fetchone()
+            return row['playlist_fingerprint'] if row else None
+        return TaskService._execute(_get_fingerprint, task_id)
+
+    @staticmethod
+    def update_playlist_fingerprint(task_id: int, fingerprint: Optional[str]) -> bool:
+        def _update_fingerprint(conn: sqlite3.Connection, task_id: int, fingerprint: Optional[str]) -> bool:
+            cursor = conn.cursor()
+            cursor.execute('UPDATE tasks SET playlist_fingerprint = ? WHERE id = ?', (fingerprint, task_id))
+            conn.commit()
+            return cursor.rowcount > 0
+        return TaskService._execute(_update_fingerprint, task_id, fingerprint)
+
+    @staticmethod
+    def get_track_key(track: dict) -> str:
+        """曲目在任务中的唯一标识：优先使用平台歌曲ID，没有时退回到标题和艺术家"""
+        if track.get('song_id'):
+            return f"{track.get('platform', '')}:{track['song_id']}"
+        return f"{track.get('title', '')}|{track.get('artist', '')}"
+
+    @staticmethod
+    def get_track_states(task_id: int) -> Dict[str, dict]:
+        """获取任务上次同步保存的曲目及匹配结果：track_key -> {position, track, rating_key}"""
+        def _get_states(conn: sqlite3.Connection, task_id: int) -> Dict[str, dict]:
+            cursor = conn.cursor()
+            cursor.execute('SELECT track_key, position, track_json, rating_key FROM task_tracks WHERE task_id = ?', (task_id,))
+            return {
+                row['track_key']: {
+                    'position': row['position'],
+                    'track': json.loads(row['track_json']),
+                    'rating_key': row['rating_key']
+                }
+                for row in cursor.fetchall()
+            }
+        return TaskService._execute(_get_states, task_id)
+
+    @staticmethod
+    def get_match_library_version(task_id: int) -> Optional[str]:
+        def _get_version(conn: sqlite3.Connection, task_id: int) -> Optional[str]:
+            cursor = conn.cursor()
+            cursor.execute('SELECT match_library_version FROM tasks WHERE id = ?', (task_id,))
+            row = cursor.fetchone()
+            return row['match_library_version'] if row else None
+        return TaskService._execute(_get_version, task_id)
+
+    @staticmethod
+    def apply_track_delta(task_id: int, upserts: List[dict], removed_keys: List[str], library_version: Optional[str]) -> bool:
+        """
+        在一个事务中按增量更新任务的曲目及匹配结果。
+        :param upserts: 新增或有变化的曲目，每项包含 key、position、track、rating_key（未匹配为 None）
+        :param removed_keys: 已从歌单中移除的曲目标识
+        :param library_version: 本次匹配所依据的资料库版本
+        """
+        def _apply(conn: sqlite3.Connection, task_id: int) -> bool:
+            cursor = conn.cursor()
+            cursor.executemany(
+                'DELETE FROM task_tracks WHERE task_id = ? AND track_key = ?',
+                [(task_id, key) for key in removed_keys]
+            )
+            cursor.executemany(
+                '''
+                INSERT INTO task_tracks (task_id, track_key, position, track_json, rating_key)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(task_id, track_key) DO UPDATE SET
+                    position = excluded.position, track_json = excluded.track_json, rating_key = excluded.rating_key
+                ''',
+                [(task_id, item['key'], item['position'], json.dumps(item['track']), item['rating_key']) for item in upserts]
+            )
+            # 未匹配歌曲改由 task_tracks 维护，清除旧的整段 JSON
+            cursor.execute(
+                'UPDATE tasks SET match_library_version = ?, unmatched_songs = NULL WHERE id = ?',
+                (library_version, task_id)
+            )
+            conn.commit()
+            return True
+        return TaskService._execute(_apply, task_id)
+
     @staticmethod
     def delete_task(task_id: int) -> bool:
         def _delete(conn: sqlite3.Connection, task_id: int) -> bool:
             cursor = conn.cursor()
+            cursor.execute('DELETE FROM task_tracks WHERE task_id = ?', (task_id,))
             cursor.execute('DELETE FROM tasks WHERE id = ?', (task_id,))
             conn.commit()
             return cursor.rowcount > 0
         return TaskService._execute(_delete, task_id)
 
+    @staticmethod
+    def _has_track_states(cursor: sqlite3.Cursor, task_id: int) -> bool:
+        cursor.execute('SELECT 1 FROM task_tracks WHERE task_id = ? LIMIT 1', (task_id,))
+        return cursor.fetchone() is not None
+
     @staticmethod
     def get_unmatched_songs_for_task(task_id: int, db: Optional[sqlite3.Connection] = None) -> List[dict]:
         def _get_unmatched(conn: sqlite3.Connection, task_id: int) -> List[dict]:
             cursor = conn.cursor()
+            if TaskService._has_track_states(cursor, task_id):
+                cursor.execute(
+                    'SELECT track_json FROM task_tracks WHERE task_id = ? AND rating_key IS NULL ORDER BY position',
+                    (task_id,)
+                )
+                return [json.loads(row['track_json']) for row in cursor.fetchall()]
+
+            # 尚未进行过增量同步的任务，读取旧的整段 JSON
             cursor.execute('SELECT unmatched_songs FROM tasks WHERE id = ?', (task_id,))
             row = cursor.fetchone()
             if not row or not row['unmatched_songs']:
@@ -198,6 +304,25 @@ class TaskService:
         def _remove_matched(conn: sqlite3.Connection, task_id: int, matched_songs: List[dict]) -> bool:
             try:
                 cursor = conn.cursor()
+
+                if TaskService._has_track_states(cursor, task_id):
+                    # 直接记录匹配到的 Plex 音轨，只更新对应的曲目行
+                    updated_count = 0
+                    for song in matched_songs:
+                        if song.get('rating_key') is None:
+                            continue
+                        cursor.execute(
+                            'UPDATE task_tracks SET rating_key = ? WHERE task_id = ? AND track_key = ? AND rating_key IS NULL',
+                            (song['rating_key'], task_id, TaskService.get_track_key(song))
+                        )
+                        updated_count += cursor.rowcount
+                    cursor.execute(
+                        'UPDATE tasks SET matched_songs = COALESCE(matched_songs, 0) + ? WHERE id = ?',
+                        (updated_count, task_id)
+                    )
+                    conn.commit()
+                    logger.info(f"Task {task_id}: Marked {updated_count} songs as matched")
+                    return True
                 
                 # 1. 获取当前的未匹配歌曲列表
                 cursor.execute('SELECT unmatched_songs, matched_songs FROM tasks WHERE id = ?', (task_id,))
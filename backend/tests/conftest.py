@@ -0,0 +1,5 @@
+import os
+
+# core.config 在导入时就会读取这两个必填配置，测试中提供占位值
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
+os.environ.setdefault("APP_PASSWORD", "test-password")
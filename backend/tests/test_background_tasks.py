@@ -0,0 +1,40 @@
+import asyncio
+import gc
+import logging
+
+from utils.background_tasks import BackgroundTasks
+
+
+def test_background_task_is_kept_until_done_and_failure_logged(caplog):
+    async def fail():
+        await asyncio.sleep(0)
+        raise RuntimeError("boom")
+
+    async def scenario():
+        tasks = BackgroundTasks()
+        tasks.run(fail(), '测试任务')
+        gc.collect()
+        assert len(tasks) == 1
+        await tasks.wait()
+        await asyncio.sleep(0)
+        return len(tasks)
+
+    with caplog.at_level(logging.ERROR, logger='utils.background_tasks'):
+        remaining = asyncio.run(scenario())
+
+    assert remaining == 0
+    assert "后台任务 '测试任务' 失败: boom" in caplog.text
+
+
+def test_cancelled_background_task_is_not_logged(caplog):
+    async def scenario():
+        tasks = BackgroundTasks()
+        task = tasks.track(asyncio.create_task(asyncio.sleep(10)), '长任务')
+        task.cancel()
+        await tasks.wait()
+        await asyncio.sleep(0)
+        return len(tasks)
+
+    with caplog.at_level(logging.ERROR, logger='utils.background_tasks'):
+        assert asyncio.run(scenario()) == 0
+    assert caplog.text == ''
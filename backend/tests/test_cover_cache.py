@@ -0,0 +1,75 @@
+import asyncio
+import logging
+
+import httpx
+
+from services.download.cover_cache import CoverCache
+
+log = logging.getLogger(__name__)
+
+COVER_URL = "https://img.example/album.jpg"
+COVER_BYTES = b"\xff\xd8cover-bytes"
+
+
+def slow_cover_server(calls, release: asyncio.Event):
+    async def handler(request):
+        calls.append(str(request.url))
+        await release.wait()
+        return httpx.Response(200, content=COVER_BYTES)
+    return handler
+
+
+def test_concurrent_requests_share_one_download(tmp_path):
+    async def scenario():
+        calls = []
+        release = asyncio.Event()
+        client = httpx.AsyncClient(transport=httpx.MockTransport(slow_cover_server(calls, release)))
+        cache = CoverCache(cache_dir=str(tmp_path))
+
+        waiters = [asyncio.create_task(cache.get(COVER_URL, client, log)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        release.set()
+        results = await asyncio.gather(*waiters)
+
+        # 之后的请求直接命中磁盘缓存
+        cached = await cache.get(COVER_URL, client, log)
+        return calls, results, cached, cache
+
+    calls, results, cached, cache = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert results == [COVER_BYTES] * 3
+    assert cached == COVER_BYTES
+    assert cache._inflight == {}
+
+
+def test_cancelling_first_waiter_does_not_settle_shared_result(tmp_path):
+    async def scenario():
+        calls = []
+        release = asyncio.Event()
+        client = httpx.AsyncClient(transport=httpx.MockTransport(slow_cover_server(calls, release)))
+        cache = CoverCache(cache_dir=str(tmp_path))
+
+        first = asyncio.create_task(cache.get(COVER_URL, client, log))
+        await asyncio.sleep(0.01)
+        second = asyncio.create_task(cache.get(COVER_URL, client, log))
+        await asyncio.sleep(0.01)
+
+        # 第一首歌的下载失败，其封面任务被取消
+        first.cancel()
+        await asyncio.sleep(0.01)
+        release.set()
+        return calls, first, await second
+
+    calls, first, second_result = asyncio.run(scenario())
+    assert first.cancelled()
+    assert second_result == COVER_BYTES
+    assert len(calls) == 1
+
+
+def test_failed_download_returns_none_to_all_waiters(tmp_path):
+    async def scenario():
+        client = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(404)))
+        cache = CoverCache(cache_dir=str(tmp_path))
+        return await asyncio.gather(*(cache.get(COVER_URL, client, log) for _ in range(2)))
+
+    assert asyncio.run(scenario()) == [None, None]
@@ -0,0 +1,84 @@
+import asyncio
+import logging
+
+import pytest
+import tenacity
+from tenacity import wait_none
+
+from schemas.download import DownloadQueueItem
+from services.download.download_exceptions import SongUnavailableError
+from services.download.downloader_core import DownloaderCore
+
+log = logging.getLogger(__name__)
+
+
+class FakeDownloader:
+    """按平台返回预设的搜索结果，并记录调用次数"""
+
+    def __init__(self, responses):
+        self.responses = responses
+        self.calls = []
+
+    async def search_platform(self, platform, text, page=1, size=10):
+        self.calls.append(platform)
+        response = self.responses[platform]
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+def make_core(responses):
+    core = DownloaderCore()
+    core.downloader = FakeDownloader(responses)
+    return core
+
+
+def make_item():
+    return DownloadQueueItem(id=1, session_id=1, title="晴天", artist="周杰伦", platform="qq")
+
+
+def find_song_id(core, item):
+    # 测试中不等待重试间隔
+    return asyncio.run(DownloaderCore._find_song_id.retry_with(wait=wait_none())(core, item, log))
+
+
+def test_returns_best_candidate_from_preferred_platform():
+    core = make_core({
+        "tencent": {"code": 200, "data": [{"song": "晴天", "singer": "周杰伦", "mid": "abc"}]},
+        "netease": {"code": 200, "data": []},
+    })
+    song_id, platform, candidates = find_song_id(core, make_item())
+    assert (song_id, platform) == ("abc", "tencent")
+    assert candidates[0]["score"] > 70
+
+
+def test_not_found_everywhere_raises_unavailable_without_retrying():
+    core = make_core({
+        "tencent": {"code": 200, "data": [{"song": "完全不同", "singer": "别人", "mid": "x"}]},
+        "netease": {"code": 200, "data": []},
+    })
+    with pytest.raises(SongUnavailableError):
+        find_song_id(core, make_item())
+    assert sorted(core.downloader.calls) == ["netease", "tencent"]
+
+
+def test_outage_is_not_reported_as_unavailable():
+    # search_platform 会把接口错误转换为非 200 的空结果
+    core = make_core({
+        "tencent": {"code": 503, "message": "Service Unavailable", "data": []},
+        "netease": {"code": 200, "data": []},
+    })
+    with pytest.raises(tenacity.RetryError) as exc_info:
+        find_song_id(core, make_item())
+    assert not isinstance(exc_info.value.last_attempt.exception(), SongUnavailableError)
+    assert core.downloader.calls.count("tencent") == 3
+
+
+def test_search_exception_is_treated_as_failure():
+    core = make_core({
+        "tencent": RuntimeError("connection reset"),
+        "netease": {"code": 200, "data": []},
+    })
+    with pytest.raises(tenacity.RetryError) as exc_info:
+        find_song_id(core, make_item())
+    assert not isinstance(exc_info.value.last_attempt.exception(), SongUnavailableError)
@@ -0,0 +1,66 @@
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import httpx
+import pytest
+
+from core.http_client import CachingDNSTransport
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = b"pong"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def local_server():
+    server = HTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server.server_address[1]
+    server.shutdown()
+
+
+def make_transport():
+    limits = httpx.Limits(max_connections=4, max_keepalive_connections=0)
+    return CachingDNSTransport(limits, http2=False, retries=0, dns_ttl=60)
+
+
+def test_repeated_requests_resolve_host_once(local_server):
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        original = loop.getaddrinfo
+        lookups = []
+
+        async def counting_getaddrinfo(host, *args, **kwargs):
+            lookups.append(host)
+            return await original(host, *args, **kwargs)
+
+        loop.getaddrinfo = counting_getaddrinfo
+        async with httpx.AsyncClient(transport=make_transport()) as client:
+            # 不保留空闲连接，每次请求都会新建连接
+            first = await client.get(f"http://localhost:{local_server}/ping")
+            second = await client.get(f"http://localhost:{local_server}/ping")
+        return first.text, second.text, lookups
+
+    first, second, lookups = asyncio.run(scenario())
+    assert (first, second) == ("pong", "pong")
+    assert lookups == ["localhost"]
+
+
+def test_connection_errors_are_mapped_to_httpx_exceptions(local_server):
+    async def scenario():
+        async with httpx.AsyncClient(transport=make_transport()) as client:
+            # 端口 1 上没有服务
+            await client.get("http://127.0.0.1:1/")
+
+    with pytest.raises(httpx.ConnectError):
+        asyncio.run(scenario())
@@ -0,0 +1,55 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from services.download import download_service as download_module
+from services.download.download_service import DownloadService
+
+
+class FakePlex:
+    def __init__(self, locations):
+        self.library = SimpleNamespace(locations=locations)
+        self.scans = []
+
+    async def get_music_library(self):
+        return self.library
+
+    async def scan_and_refresh(self, library, file_path=None):
+        self.scans.append(file_path)
+        return True
+
+
+@pytest.fixture
+def rescan(monkeypatch):
+    monkeypatch.setattr(download_module.app_settings, 'PLEX_DOWNLOAD_PATH', None)
+
+    def run(locations, file_paths, download_root='/app/Downloads'):
+        plex = FakePlex(locations)
+        settings_service = SimpleNamespace(get_download_settings=lambda: SimpleNamespace(download_path=download_root))
+        monkeypatch.setattr(download_module.AutoPlaylistService, 'get_instance',
+                            staticmethod(lambda: SimpleNamespace(plex_service=plex)))
+        asyncio.run(DownloadService(settings_service)._request_plex_rescan(file_paths))
+        return plex.scans
+
+    return run
+
+
+def test_rescan_maps_download_root_to_library_folder(rescan):
+    scans = rescan(
+        ['/data/music', '/data/Downloads'],
+        ['/app/Downloads/歌手A/专辑/01.flac', '/app/Downloads/歌手A/专辑/02.flac', '/app/Downloads/歌手B/03.mp3'],
+    )
+
+    assert scans == ['/data/Downloads/歌手A/专辑', '/data/Downloads/歌手B']
+
+
+def test_rescan_uses_configured_plex_path(rescan, monkeypatch):
+    monkeypatch.setattr(download_module.app_settings, 'PLEX_DOWNLOAD_PATH', 'D:\\Music\\Downloads')
+
+    assert rescan(['D:\\Music'], ['/app/Downloads/歌手A/01.flac']) == ['D:\\Music\\Downloads\\歌手A']
+
+
+def test_rescan_falls_back_to_full_library_scan(rescan):
+    assert rescan(['/data/music'], ['/app/Downloads/歌手A/01.flac']) == [None]
+    assert rescan(['/data/Downloads'], ['/elsewhere/01.flac']) == [None]
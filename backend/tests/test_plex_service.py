@@ -0,0 +1,22 @@
+from xml.etree import ElementTree
+
+from plexapi.library import MusicSection
+
+from services.plex_service import PlexService
+
+
+def section(**attrs):
+    attrib = ' '.join(f'{name}="{value}"' for name, value in attrs.items())
+    return MusicSection(None, ElementTree.fromstring(f'<Directory key="3" type="artist" title="音乐" {attrib} />'))
+
+
+def test_library_version_prefers_content_changed_at():
+    library = section(contentChangedAt='9001', scannedAt='1700000100', updatedAt='1700000000')
+
+    assert PlexService.get_library_version(library) == '3:contentChangedAt:9001'
+
+
+def test_library_version_falls_back_to_scanned_then_updated():
+    assert PlexService.get_library_version(section(scannedAt='1700000100', updatedAt='1700000000')) == '3:scannedAt:1700000100'
+    assert PlexService.get_library_version(section(updatedAt='1700000000')) == '3:updatedAt:1700000000'
+    assert PlexService.get_library_version(section()) is None
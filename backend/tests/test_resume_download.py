@@ -0,0 +1,139 @@
+import asyncio
+import logging
+
+import httpx
+import pytest
+
+from schemas.download import DownloadQueueItem
+from services.download import downloader_core as core_module
+from services.download.downloader_core import MusicDownloader
+
+log = logging.getLogger(__name__)
+
+CONTENT = bytes(range(256)) * (3 * 1024 * 16)  # 约 3 MB，高于文件大小阈值
+ETAG = '"v1"'
+
+
+class FakePartialStore:
+    """替代 download_db_service 中记录断点续传状态的方法"""
+
+    def __init__(self, state=None):
+        self.state = state
+        self.cleared = False
+
+    def get_partial_download(self, item_id):
+        return self.state
+
+    def save_partial_download(self, item_id, partial_path, bytes_received, total_bytes, resume_validator):
+        self.state = {
+            'partial_path': partial_path,
+            'bytes_received': bytes_received,
+            'resume_validator': resume_validator,
+        }
+
+    def clear_partial_download(self, item_id):
+        self.state = None
+        self.cleared = True
+
+
+def range_server(requests, honor_range=True, status_for_range=None):
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        range_header = request.headers.get('range')
+        if range_header and status_for_range:
+            return httpx.Response(status_for_range)
+        if range_header and honor_range and request.headers.get('if-range') == ETAG:
+            start = int(range_header.split('=')[1].rstrip('-'))
+            return httpx.Response(
+                206,
+                content=CONTENT[start:],
+                headers={
+                    'content-range': f"bytes {start}-{len(CONTENT) - 1}/{len(CONTENT)}",
+                    'etag': ETAG,
+                    'accept-ranges': 'bytes',
+                },
+            )
+        return httpx.Response(200, content=CONTENT, headers={'etag': ETAG, 'accept-ranges': 'bytes'})
+    return handler
+
+
+@pytest.fixture
+def downloader(monkeypatch):
+    def _make(handler, store):
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        monkeypatch.setattr(MusicDownloader, 'http_client', property(lambda self: client))
+        for name in ('get_partial_download', 'save_partial_download', 'clear_partial_download'):
+            monkeypatch.setattr(core_module.download_db_service, name, getattr(store, name))
+        return MusicDownloader()
+    return _make
+
+
+def make_item():
+    return DownloadQueueItem(id=7, session_id=1, title="晴天", artist="周杰伦")
+
+
+def write_partial(part_path, received):
+    part_path.write_bytes(CONTENT[:received])
+    return FakePartialStore({'partial_path': str(part_path), 'bytes_received': received, 'resume_validator': ETAG})
+
+
+def test_resumes_from_recorded_offset(tmp_path, downloader):
+    part_path = tmp_path / "song.raw.part"
+    store = write_partial(part_path, 1_000_000)
+    requests = []
+    md = downloader(range_server(requests), store)
+
+    size = asyncio.run(md._stream_to_part_file(make_item(), "https://cdn.example/song", part_path, log))
+
+    assert size == len(CONTENT)
+    assert part_path.read_bytes() == CONTENT
+    assert len(requests) == 1
+    assert requests[0].headers['range'] == "bytes=1000000-"
+    assert requests[0].headers['if-range'] == ETAG
+
+
+def test_restarts_when_server_ignores_range(tmp_path, downloader):
+    part_path = tmp_path / "song.raw.part"
+    # 临时文件内容与服务器上的新版本不同，服务器返回 200 时必须整体覆盖
+    part_path.write_bytes(b"\xff" * 500_000)
+    store = FakePartialStore({'partial_path': str(part_path), 'bytes_received': 500_000, 'resume_validator': ETAG})
+    requests = []
+    md = downloader(range_server(requests, honor_range=False), store)
+
+    size = asyncio.run(md._stream_to_part_file(make_item(), "https://cdn.example/song", part_path, log))
+
+    assert size == len(CONTENT)
+    assert part_path.read_bytes() == CONTENT
+
+
+def test_restarts_after_416(tmp_path, downloader):
+    part_path = tmp_path / "song.raw.part"
+    store = write_partial(part_path, 1_000_000)
+    requests = []
+    md = downloader(range_server(requests, status_for_range=416), store)
+
+    size = asyncio.run(md._stream_to_part_file(make_item(), "https://cdn.example/song", part_path, log))
+
+    assert size == len(CONTENT)
+    assert part_path.read_bytes() == CONTENT
+    assert [r.headers.get('range') for r in requests] == ["bytes=1000000-", None]
+
+
+def test_interrupted_transfer_keeps_progress(tmp_path, downloader):
+    part_path = tmp_path / "song.raw.part"
+    store = FakePartialStore()
+
+    def handler(request):
+        class Broken(httpx.AsyncByteStream):
+            async def __aiter__(self):
+                yield CONTENT[:2 * 1024 * 1024]
+                raise httpx.ReadError("connection reset")
+        return httpx.Response(200, stream=Broken(), headers={
+            'etag': ETAG, 'accept-ranges': 'bytes', 'content-length': str(len(CONTENT))})
+
+    md = downloader(handler, store)
+    with pytest.raises(core_module.APIError):
+        asyncio.run(md._stream_to_part_file(make_item(), "https://cdn.example/song", part_path, log))
+
+    assert store.state['bytes_received'] == part_path.stat().st_size > 0
+    assert store.state['resume_validator'] == ETAG
@@ -0,0 +1,61 @@
+import asyncio
+from types import SimpleNamespace
+
+from utils import scheduler as scheduler_module
+from utils.scheduler import TaskScheduler
+
+
+def test_scheduled_syncs_use_separate_sync_services(monkeypatch):
+    tasks = {
+        1: SimpleNamespace(id=1, server_id=1, playlist_url='u1', platform='netease', name='歌单1'),
+        2: SimpleNamespace(id=2, server_id=2, playlist_url='u2', platform='netease', name='歌单2'),
+    }
+    download_service = object()
+    instances = []
+
+    class FakeSyncService:
+        def __init__(self, download_service=None):
+            self.download_service = download_service
+            self.server_id = None
+            instances.append(self)
+
+        async def sync_playlist(self, task_id, server_id, **kwargs):
+            # 模拟 sync_playlist 把服务器连接保存在实例上，再让出事件循环
+            self.server_id = server_id
+            await asyncio.sleep(0.01)
+            assert self.server_id == server_id
+
+    async def submit(task_id, server_id, run, priority, source):
+        return asyncio.ensure_future(run())
+
+    monkeypatch.setattr(scheduler_module, 'SyncService', FakeSyncService)
+    monkeypatch.setattr(scheduler_module.TaskService, 'get_task_by_id', staticmethod(tasks.get))
+    monkeypatch.setattr(scheduler_module.sync_orchestrator, 'submit', submit)
+
+    async def scenario():
+        scheduler = TaskScheduler(FakeSyncService(download_service=download_service))
+        runs = [asyncio.ensure_future(scheduler.run_sync_task(task_id)) for task_id in tasks]
+        await asyncio.gather(*runs)
+        await asyncio.sleep(0.05)
+
+    asyncio.run(scenario())
+
+    shared, *per_run = instances
+    assert shared.server_id is None
+    assert len(per_run) == 2
+    assert sorted(s.server_id for s in per_run) == [1, 2]
+    assert all(s.download_service is download_service for s in per_run)
+
+
+def test_spread_offset_is_stable_and_within_window():
+    offsets = [TaskScheduler._spread_offset(task_id, 60) for task_id in range(1, 201)]
+
+    assert offsets == [TaskScheduler._spread_offset(task_id, 60) for task_id in range(1, 201)]
+    assert all(0 <= offset < 60 for offset in offsets)
+    # 不同任务分散到窗口内的多个时间点，而不是集中在同一分钟
+    assert len(set(offsets)) > 30
+
+
+def test_spread_offset_disabled_for_small_windows():
+    assert TaskScheduler._spread_offset(7, 0) == 0
+    assert TaskScheduler._spread_offset(7, 1) == 0
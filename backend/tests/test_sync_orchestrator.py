@@ -0,0 +1,116 @@
+import asyncio
+
+import pytest
+
+from services import sync_orchestrator as orchestrator_module
+from services.sync_orchestrator import PRIORITY_MANUAL, PRIORITY_SCHEDULED, SyncOrchestrator
+from services.task_service import TaskService
+
+
+@pytest.fixture(autouse=True)
+def quiet_status(monkeypatch):
+    """排队状态只记录在内存中，不写数据库也不推送进度"""
+    statuses = []
+
+    async def send_message(*args, **kwargs):
+        pass
+
+    monkeypatch.setattr(TaskService, 'update_task_status',
+                        staticmethod(lambda task_id, status, status_message=None: statuses.append((task_id, status, status_message))))
+    monkeypatch.setattr(orchestrator_module.progress_manager, 'send_message', send_message)
+    return statuses
+
+
+class Runs:
+    """记录同步的开始顺序，每次同步一直运行到被 release"""
+
+    def __init__(self):
+        self.started = []
+        self.calls = {}
+        self.gates = {}
+
+    def make(self, task_id):
+        async def run():
+            self.started.append(task_id)
+            self.calls[task_id] = self.calls.get(task_id, 0) + 1
+            gate = self.gates.setdefault(task_id, asyncio.Event())
+            await gate.wait()
+        return run
+
+    def release(self, task_id):
+        self.gates.setdefault(task_id, asyncio.Event()).set()
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_duplicate_requests_are_coalesced():
+    async def scenario():
+        orchestrator = SyncOrchestrator(max_concurrent=1, max_per_server=1)
+        runs = Runs()
+        first = await orchestrator.submit(1, 1, runs.make(1))
+        await settle()
+        running_again = await orchestrator.submit(1, 1, runs.make(1), source='manual')
+        queued = await orchestrator.submit(2, 1, runs.make(2))
+        queued_again = await orchestrator.submit(2, 1, runs.make(2))
+        runs.release(1)
+        runs.release(2)
+        await settle()
+        return first, running_again, queued, queued_again, runs
+
+    first, running_again, queued, queued_again, runs = asyncio.run(scenario())
+
+    assert first == {'state': 'running', 'position': 0, 'coalesced': False}
+    assert running_again == {'state': 'running', 'position': 0, 'coalesced': True}
+    assert queued == {'state': 'queued', 'position': 1, 'coalesced': False}
+    assert queued_again == {'state': 'queued', 'position': 1, 'coalesced': True}
+    assert runs.calls == {1: 1, 2: 1}
+
+
+def test_per_server_limit_does_not_block_other_servers():
+    async def scenario():
+        orchestrator = SyncOrchestrator(max_concurrent=2, max_per_server=1)
+        runs = Runs()
+        await orchestrator.submit(1, 1, runs.make(1))
+        await orchestrator.submit(2, 1, runs.make(2))
+        await orchestrator.submit(3, 2, runs.make(3))
+        await settle()
+        started_before = list(runs.started)
+        waiting = orchestrator.get_task_state(2)
+        runs.release(1)
+        await settle()
+        started_after = list(runs.started)
+        runs.release(2)
+        runs.release(3)
+        await settle()
+        return started_before, waiting, started_after, orchestrator.get_status()
+
+    started_before, waiting, started_after, status = asyncio.run(scenario())
+
+    assert started_before == [1, 3]
+    assert waiting == {'state': 'queued', 'position': 1}
+    assert started_after == [1, 3, 2]
+    assert status['running'] == [] and status['queued'] == []
+
+
+def test_global_limit_and_manual_priority(quiet_status):
+    async def scenario():
+        orchestrator = SyncOrchestrator(max_concurrent=1, max_per_server=1)
+        runs = Runs()
+        await orchestrator.submit(1, 1, runs.make(1))
+        await orchestrator.submit(2, 2, runs.make(2), priority=PRIORITY_SCHEDULED)
+        await orchestrator.submit(3, 3, runs.make(3), priority=PRIORITY_SCHEDULED)
+        bumped = await orchestrator.submit(3, 3, runs.make(3), priority=PRIORITY_MANUAL, source='manual')
+        for task_id in (1, 3, 2):
+            await settle()
+            runs.release(task_id)
+        await settle()
+        return bumped, runs.started
+
+    bumped, started = asyncio.run(scenario())
+
+    assert bumped == {'state': 'queued', 'position': 1, 'coalesced': True}
+    assert started == [1, 3, 2]
+    assert (2, 'queued', '排队等待同步（第 2 位）...') in quiet_status
@@ -0,0 +1,192 @@
+import asyncio
+
+import pytest
+
+from services import sync_service as sync_module
+from services.sync_service import SyncService
+from services.task_service import TaskService
+
+PLATFORM = 'netease'
+
+
+def track(n):
+    return {'title': f"歌曲{n}", 'artist': f"歌手{n}", 'album': None, 'song_id': str(n), 'platform': PLATFORM}
+
+
+class FakePlexTrack:
+    def __init__(self, rating_key):
+        self.ratingKey = rating_key
+
+    def __repr__(self):
+        return f"Track({self.ratingKey})"
+
+
+class FakePlex:
+    """按歌曲ID返回匹配结果；歌曲ID越小匹配越慢，使完成顺序与歌单顺序不同"""
+
+    def __init__(self, unmatched=(), import_ok=True):
+        self.unmatched = set(unmatched)
+        self.import_ok = import_ok
+        self.created = None
+        self.delta = None
+
+    async def get_music_library(self):
+        return object()
+
+    async def find_track_with_score(self, title, artist, album, library, progress_callback=None):
+        n = int(title[2:])
+        await asyncio.sleep(0.001 * (10 - n))
+        if progress_callback:
+            await progress_callback()
+        if n in self.unmatched:
+            return None, 0
+        return FakePlexTrack(100 + n), 100
+
+    async def create_or_update_playlist(self, name, tracks, log_callback=None):
+        await asyncio.sleep(0)
+        self.created = [t.ratingKey for t in tracks]
+        # 导入进行中时自动下载应已开始
+        self.downloads_during_import = list(self.downloads.calls)
+        return self.import_ok
+
+    async def apply_playlist_delta(self, name, tracks_to_add, rating_keys_to_remove, log_callback=None, all_rating_keys=None):
+        self.delta = {
+            'add': [t.ratingKey for t in tracks_to_add],
+            'remove': set(rating_keys_to_remove),
+            'all': list(all_rating_keys or []),
+        }
+        return self.import_ok
+
+
+class FakePlaylistService:
+    """分两个片段产出歌单：先是目录命中的曲目（位置不连续），再是详情批次"""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    async def fetch_track_ids(self, url, platform):
+        ordered = sorted((position, t) for chunk in self.chunks for position, t in chunk)
+        return [t['song_id'] for _, t in ordered]
+
+    async def stream_playlist(self, url, platform):
+        for chunk in self.chunks:
+            yield {
+                'title': '测试歌单',
+                'tracks': [t for _, t in chunk],
+                'positions': [p for p, _ in chunk],
+                'failed_song_ids': [],
+            }
+
+
+class FakeDownloadService:
+    def __init__(self):
+        self.calls = []
+
+    async def auto_download_missing(self, task_id, songs=None):
+        self.calls.append(None if songs is None else [s['song_id'] for s in songs])
+        return 42
+
+
+@pytest.fixture
+def task_store(monkeypatch):
+    """用内存中的状态替代 TaskService 的数据库读写"""
+    store = {'states': {}, 'fingerprint': None, 'library_version': None, 'statuses': []}
+
+    def apply_track_delta(task_id, upserts, removed_keys, library_version):
+        for key in removed_keys:
+            store['states'].pop(key, None)
+        for entry in upserts:
+            store['states'][entry['key']] = {
+                'position': entry['position'], 'track': entry['track'], 'rating_key': entry['rating_key']
+            }
+        store['library_version'] = library_version
+
+    fakes = {
+        'update_task_status': lambda task_id, status, message=None: store['statuses'].append(status),
+        'update_last_sync_time': lambda task_id: None,
+        'update_sync_counts': lambda task_id, total, matched: None,
+        'get_playlist_fingerprint': lambda task_id: store['fingerprint'],
+        'update_playlist_fingerprint': lambda task_id, fingerprint: store.update(fingerprint=fingerprint),
+        'get_track_states': lambda task_id: dict(store['states']),
+        'get_match_library_version': lambda task_id: store['library_version'],
+        'apply_track_delta': apply_track_delta,
+    }
+    for name, fake in fakes.items():
+        monkeypatch.setattr(TaskService, name, staticmethod(fake))
+
+    async def send_message(*args, **kwargs):
+        pass
+
+    monkeypatch.setattr(sync_module.progress_manager, 'send_message', send_message)
+    monkeypatch.setattr(sync_module.PlexService, 'get_library_version', staticmethod(lambda library: 'lib-v1'))
+    return store
+
+
+def run_sync(plex, chunks):
+    download_service = FakeDownloadService()
+    service = SyncService(download_service=download_service)
+    service.playlist_service = FakePlaylistService(chunks)
+    plex.downloads = download_service
+
+    async def init_plex(server_id):
+        service.plex_service = plex
+
+    service._initialize_plex_service = init_plex
+    ok = asyncio.run(service.sync_playlist(1, 1, 'https://music.example/playlist', PLATFORM, '测试歌单'))
+    return ok, download_service
+
+
+def test_first_sync_creates_playlist_in_source_order(task_store):
+    plex = FakePlex(unmatched={2})
+    chunks = [
+        [(3, track(3)), (1, track(1))],
+        [(0, track(0)), (2, track(2)), (4, track(4))],
+    ]
+    ok, downloads = run_sync(plex, chunks)
+
+    assert ok
+    assert plex.created == [100, 101, 103, 104]
+    assert [key for key, _ in sorted(task_store['states'].items(), key=lambda kv: kv[1]['position'])] == [
+        f"{PLATFORM}:{n}" for n in range(5)
+    ]
+    assert downloads.calls == [['2']]
+    assert plex.downloads_during_import == [['2']]
+
+
+def test_failed_import_keeps_started_auto_download(task_store):
+    plex = FakePlex(unmatched={1}, import_ok=False)
+    ok, downloads = run_sync(plex, [[(0, track(0)), (1, track(1))]])
+
+    assert not ok
+    assert downloads.calls == [['1']]
+    assert task_store['statuses'][-1] == 'failed'
+    assert task_store['states'] == {}
+
+
+def test_incremental_sync_adds_new_tracks_in_source_order(task_store):
+    run_sync(FakePlex(), [[(0, track(0)), (1, track(1)), (2, track(2))]])
+
+    plex = FakePlex()
+    chunks = [
+        [(4, track(4)), (0, track(0))],
+        [(1, track(1)), (3, track(3)), (5, track(5))],
+    ]
+    ok, _ = run_sync(plex, chunks)
+
+    assert ok
+    assert plex.created is None
+    assert plex.delta == {'add': [103, 104, 105], 'remove': {102}, 'all': [100, 101, 103, 104, 105]}
+
+
+def test_unchanged_playlist_still_rechecks_auto_download(task_store):
+    chunks = [[(0, track(0)), (1, track(1))]]
+    run_sync(FakePlex(unmatched={1}), chunks)
+
+    plex = FakePlex(unmatched={1})
+    ok, downloads = run_sync(plex, chunks)
+
+    assert ok
+    assert plex.created is None and plex.delta is None
+    assert task_store['statuses'][-1] == 'success'
+    # 无变化时由下载服务读取任务保存的未匹配歌曲
+    assert downloads.calls == [None]
@@ -0,0 +1,41 @@
+"""后台任务集合：保留任务引用直至完成，并记录未处理的异常"""
+
+import asyncio
+import logging
+from typing import Coroutine, Set
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundTasks:
+    """
+    事件循环只弱引用任务，不等待结果的后台任务需要保留引用，否则可能在运行中被回收；
+    同时其异常没有人读取，需在完成时记录下来。
+    """
+
+    def __init__(self):
+        self._tasks: Set[asyncio.Task] = set()
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    def run(self, coro: Coroutine, description: str) -> asyncio.Task:
+        """在后台运行协程"""
+        return self.track(asyncio.create_task(coro), description)
+
+    def track(self, task: asyncio.Task, description: str) -> asyncio.Task:
+        """接管一个已创建的任务，直至其完成"""
+        self._tasks.add(task)
+
+        def _on_done(done: asyncio.Task):
+            self._tasks.discard(done)
+            if not done.cancelled() and done.exception() is not None:
+                logger.error(f"后台任务 '{description}' 失败: {done.exception()}", exc_info=done.exception())
+
+        task.add_done_callback(_on_done)
+        return task
+
+    async def wait(self):
+        """等待当前所有后台任务结束（用于关闭时）"""
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
@@ -2,11 +2,14 @@ from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
 from apscheduler.triggers.interval import IntervalTrigger
 from datetime import datetime, timedelta
+import hashlib
 import logging
+from core.config import settings as app_settings
 from services.task_service import TaskService
 from services.sync_service import SyncService
 from services.log_service import LogService
 from services.settings_service import SettingsService
+from services.sync_orchestrator import sync_orchestrator, PRIORITY_SCHEDULED
 from core.logging_config import download_log_manager
 from croniter import croniter
 import os
@@ -112,125 +115,151 @@ class TaskScheduler:
     
     async def run_sync_task(self, task_id: int):
         """
-        运行同步任务
+        将同步任务提交到全局同步编排器，由其负责并发限制、排队和去重
         :param task_id: 任务ID
         """
-        logger.info(f"[调度器] 任务 #{task_id} 符合运行条件，即将开始同步。")
+        logger.info(f"[调度器] 任务 #{task_id} 符合运行条件，提交到同步队列。")
         
         # 获取任务详情
         task = TaskService.get_task_by_id(task_id)
         if not task:
             logger.error(f"[调度器] 无法找到任务 #{task_id}")
             return
-        
-        # 将任务状态更新为“排队中”
-        TaskService.update_task_status(task_id, 'queued', '任务已加入队列，等待同步...')
-        logger.info(f"[调度器] 任务 #{task_id} 状态更新为 'queued'。")
 
         # 定义日志回调函数
         def log_callback(level: str, message: str):
             LogService.log_activity(task_id, level, message)
         
-        # 执行同步
+        async def _run():
+            try:
+                # 在队列中等待期间任务可能已被修改，开始执行前重新读取
+                current = TaskService.get_task_by_id(task_id)
+                if not current:
+                    logger.warning(f"[调度器] 任务 #{task_id} 在排队期间已被删除，跳过同步。")
+                    return
+                # 每次同步使用独立的 SyncService，避免并发同步不同服务器时互相覆盖其中的 Plex 连接
+                sync_service = SyncService(download_service=self.sync_service.download_service)
+                await sync_service.sync_playlist(
+                    task_id=current.id,
+                    server_id=current.server_id,
+                    playlist_url=current.playlist_url,
+                    platform=current.platform,
+                    playlist_name=current.name,
+                    log_callback=log_callback
+                )
+            except Exception as e:
+                logger.error(f"[调度器] 任务 #{task_id} 同步失败: {str(e)}")
+                LogService.log_activity(task_id, 'error', f'调度器同步失败: {str(e)}')
+
+        await sync_orchestrator.submit(task.id, task.server_id, _run, priority=PRIORITY_SCHEDULED, source='scheduler')
+    
+    @staticmethod
+    def _spread_offset(task_id: int, window_minutes: int) -> int:
+        """
+        根据任务ID计算固定的分钟偏移量（0 ~ window_minutes-1），
+        同一任务每次重启都落在同一时间点，不同任务则均匀分散在窗口内
+        """
+        if window_minutes <= 1:
+            return 0
+        digest = hashlib.sha256(str(task_id).encode('utf-8')).digest()
+        return int.from_bytes(digest[:4], 'big') % window_minutes
+
+    @staticmethod
+    def _cron_trigger(expression: str) -> CronTrigger:
+        """将 crontab 表达式转换为触发器，并附加配置的随机抖动"""
+        minute, hour, day, month, day_of_week = expression.split()
+        jitter = app_settings.SCHEDULE_CRON_JITTER_SECONDS or None
+        return CronTrigger(
+            minute=minute, hour=hour, day=day, month=month, day_of_week=day_of_week,
+            jitter=jitter
+        )
+
+    def _schedule_task(self, task):
+        """
+        根据任务的调度计划添加作业。
+        预设计划（每小时/每日/每周/每月）会按任务ID在 SCHEDULE_SPREAD_WINDOW_MINUTES
+        窗口内错开执行，避免所有任务在同一时刻同时访问 Plex 和歌单平台。
+        """
+        sync_schedule = task.cron_schedule
+        if not sync_schedule or sync_schedule.lower() in ['关闭', 'off']:
+            return
+
+        job_id_sync = f'task_sync_{task.id}'
+        job_id_check = f'task_check_{task.id}'
+        schedule = sync_schedule.lower()
+        window = max(0, app_settings.SCHEDULE_SPREAD_WINDOW_MINUTES)
+
+        # 检查是否为预定义的调度计划
+        if schedule in ['每小时', 'hourly']:
+            # 每小时执行，分钟数在窗口内错开（最多错开一小时）
+            offset = self._spread_offset(task.id, min(window, 60))
+            self.scheduler.add_job(
+                self.run_sync_task,
+                'cron',
+                hour='*',
+                minute=offset,
+                id=job_id_sync,
+                args=[task.id],
+                replace_existing=True
+            )
+            return
+
+        if schedule in ['每日', 'daily', '每周', 'weekly', '每月', 'monthly']:
+            # 从凌晨2点开始在窗口内错开，窗口不跨过当天午夜
+            offset = self._spread_offset(task.id, min(window, 22 * 60))
+            hour, minute = 2 + offset // 60, offset % 60
+            if schedule in ['每日', 'daily']:
+                # 每天执行
+                trigger_args = {}
+            elif schedule in ['每周', 'weekly']:
+                # 每周日执行
+                trigger_args = {'day_of_week': 0}
+            else:
+                # 每月1号执行
+                trigger_args = {'day': 1}
+            self.scheduler.add_job(
+                self.run_sync_task,
+                'cron',
+                hour=hour,
+                minute=minute,
+                id=job_id_sync,
+                args=[task.id],
+                replace_existing=True,
+                **trigger_args
+            )
+            if offset:
+                logger.info(f"[调度器] 任务 #{task.id} 的预设计划 \"{sync_schedule}\" 错开至 {hour:02d}:{minute:02d} 执行。")
+            return
+
+        # 尝试解析为cron表达式
         try:
-            # 伪代码/未来规划:
-            # - 在一个更复杂的系统中, SyncService 实例可能需要根据
-            #   task.server_id 动态创建或获取, 例如:
-            #   sync_service = ServiceFactory.get_service(task.server_type)
-            # - 但在当前架构下, SyncService 内部处理了多服务器逻辑, 所以保持不变。
-            
-            await self.sync_service.sync_playlist(
-                task_id=task.id,
-                server_id=task.server_id,
-                playlist_url=task.playlist_url,
-                platform=task.platform,
-                playlist_name=task.name,
-                log_callback=log_callback
+            # 添加cron作业（验证表达式是否有效）
+            self.scheduler.add_job(
+                self.run_sync_task,
+                self._cron_trigger(sync_schedule),
+                id=job_id_sync,
+                args=[task.id],
+                replace_existing=True
             )
         except Exception as e:
-            logger.error(f"[调度器] 任务 #{task_id} 同步失败: {str(e)}")
-            LogService.log_activity(task_id, 'error', f'调度器同步失败: {str(e)}')
-    
+            logger.error(f"[调度器] 任务 #{task.id} 的调度表达式 \"{sync_schedule}\" 无效: {str(e)}")
+            # 如果cron表达式无效，则使用每分钟检查的方式
+            self.scheduler.add_job(
+                self.check_and_run_task,
+                'interval',
+                minutes=1,
+                id=job_id_check,
+                args=[task.id],
+                replace_existing=True
+            )
+
     def add_scheduled_jobs(self):
         """添加所有已调度的任务"""
         try:
             tasks = TaskService.get_all_tasks()
             for task in tasks:
                 if task.status not in ['syncing', 'queued']:
-                    sync_schedule = task.cron_schedule
-                    if not sync_schedule or sync_schedule.lower() in ['关闭', 'off']:
-                        continue
-                    
-                    # 检查是否为预定义的调度计划
-                    if sync_schedule.lower() in ['每小时', 'hourly']:
-                        # 每小时执行
-                        self.scheduler.add_job(
-                            self.run_sync_task,
-                            'cron',
-                            hour='*',
-                            id=f'task_sync_{task.id}',
-                            args=[task.id],
-                            replace_existing=True
-                        )
-                    elif sync_schedule.lower() in ['每日', 'daily']:
-                        # 每天凌晨2点执行
-                        self.scheduler.add_job(
-                            self.run_sync_task,
-                            'cron',
-                            hour=2,
-                            minute=0,
-                            id=f'task_sync_{task.id}',
-                            args=[task.id],
-                            replace_existing=True
-                        )
-                    elif sync_schedule.lower() in ['每周', 'weekly']:
-                        # 每周日凌晨2点执行
-                        self.scheduler.add_job(
-                            self.run_sync_task,
-                            'cron',
-                            day_of_week=0,
-                            hour=2,
-                            minute=0,
-                            id=f'task_sync_{task.id}',
-                            args=[task.id],
-                            replace_existing=True
-                        )
-                    elif sync_schedule.lower() in ['每月', 'monthly']:
-                        # 每月1号凌晨2点执行
-                        self.scheduler.add_job(
-                            self.run_sync_task,
-                            'cron',
-                            day=1,
-                            hour=2,
-                            minute=0,
-                            id=f'task_sync_{task.id}',
-                            args=[task.id],
-                            replace_existing=True
-                        )
-                    else:
-                        # 尝试解析为cron表达式
-                        try:
-                            # 验证cron表达式是否有效
-                            CronTrigger.from_crontab(sync_schedule)
-                            # 添加cron作业
-                            self.scheduler.add_job(
-                                self.run_sync_task,
-                                CronTrigger.from_crontab(sync_schedule),
-                                id=f'task_sync_{task.id}',
-                                args=[task.id],
-                                replace_existing=True
-                            )
-                        except Exception as e:
-                            logger.error(f"[调度器] 任务 #{task.id} 的调度表达式 \"{sync_schedule}\" 无效: {str(e)}")
-                            # 如果cron表达式无效，则使用每小时检查的方式
-                            self.scheduler.add_job(
-                                self.check_and_run_task,
-                                'interval',
-                                minutes=1,
-                                id=f'task_check_{task.id}',
-                                args=[task.id],
-                                replace_existing=True
-                            )
+                    self._schedule_task(task)
         except Exception as e:
             logger.error(f"[调度器] 添加调度任务时出错: {str(e)}")
     
@@ -268,89 +297,16 @@ class TaskScheduler:
             # 添加新的作业
             task = TaskService.get_task_by_id(task_id)
             if task and task.status not in ['syncing', 'queued']:
-                sync_schedule = task.cron_schedule
-                if not sync_schedule or sync_schedule.lower() in ['关闭', 'off']:
-                    return
-                
-                job_id_sync = f'task_sync_{task.id}'
-                job_id_check = f'task_check_{task.id}'
-
-                # 检查是否为预定义的调度计划
-                if sync_schedule.lower() in ['每小时', 'hourly']:
-                    # 每小时执行
-                    self.scheduler.add_job(
-                        self.run_sync_task,
-                        'cron',
-                        hour='*',
-                        id=job_id_sync,
-                        args=[task.id],
-                        replace_existing=True
-                    )
-                elif sync_schedule.lower() in ['每日', 'daily']:
-                    # 每天凌晨2点执行
-                    self.scheduler.add_job(
-                        self.run_sync_task,
-                        'cron',
-                        hour=2,
-                        minute=0,
-                        id=job_id_sync,
-                        args=[task.id],
-                        replace_existing=True
-                    )
-                elif sync_schedule.lower() in ['每周', 'weekly']:
-                    # 每周日凌晨2点执行
-                    self.scheduler.add_job(
-                        self.run_sync_task,
-                        'cron',
-                        day_of_week=0,
-                        hour=2,
-                        minute=0,
-                        id=job_id_sync,
-                        args=[task.id],
-                        replace_existing=True
-                    )
-                elif sync_schedule.lower() in ['每月', 'monthly']:
-                    # 每月1号凌晨2点执行
-                    self.scheduler.add_job(
-                        self.run_sync_task,
-                        'cron',
-                        day=1,
-                        hour=2,
-                        minute=0,
-                        id=job_id_sync,
-                        args=[task.id],
-                        replace_existing=True
-                    )
-                else:
-                    # 尝试解析为cron表达式
-                    try:
-                        # 验证cron表达式是否有效
-                        CronTrigger.from_crontab(sync_schedule)
-                        # 添加cron作业
-                        self.scheduler.add_job(
-                            self.run_sync_task,
-                            CronTrigger.from_crontab(sync_schedule),
-                            id=job_id_sync,
-                            args=[task.id],
-                            replace_existing=True
-                        )
-                    except Exception as e:
-                        logger.error(f"[调度器] 任务 #{task.id} 的调度表达式 \"{sync_schedule}\" 无效: {str(e)}")
-                        # 如果cron表达式无效，则使用每小时检查的方式
-                        self.scheduler.add_job(
-                            self.check_and_run_task,
-                            'interval',
-                            minutes=1,
-                            id=job_id_check,
-                            args=[task.id],
-                            replace_existing=True
-                        )
+                self._schedule_task(task)
         except Exception as e:
             logger.error(f"[调度器] 重新加载任务 #{task_id} 的调度时出错: {str(e)}")
     
     def start(self):
         """启动调度器"""
         logger.info("[调度器] 启动任务调度器...")
+        reset_count = TaskService.reset_queued_tasks()
+        if reset_count:
+            logger.info(f"[调度器] 已重置 {reset_count} 个上次运行遗留在队列中的任务状态。")
         self.add_scheduled_jobs()
         
         # 添加每日的日志清理任务